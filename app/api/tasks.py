@@ -0,0 +1,48 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'BACKGROUND_TASK_WORKERS', 2),
+                thread_name_prefix='background-task'
+            )
+        return _executor
+
+
+def _run(func, args, kwargs, close_connection):
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception("Background task %s failed", getattr(func, '__name__', func))
+    finally:
+        if close_connection:
+            connection.close()
+
+
+def run_in_background(func, *args, **kwargs):
+    """
+    Run a function off the request thread once the current transaction commits.
+
+    Tasks run in a small in-process thread pool. Set BACKGROUND_TASKS_EAGER
+    to run them inline instead (used by the test suite).
+    """
+    def submit():
+        if getattr(settings, 'BACKGROUND_TASKS_EAGER', False):
+            _run(func, args, kwargs, close_connection=False)
+        else:
+            _get_executor().submit(_run, func, args, kwargs, True)
+
+    transaction.on_commit(submit)
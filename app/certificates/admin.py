@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Certificate, CertificateTemplate
+from .models import Certificate, CertificateTemplate, CertificateVerification
 
 
 @admin.register(Certificate)
@@ -58,3 +58,14 @@ class CertificateTemplateAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         })
     )
+
+
+@admin.register(CertificateVerification)
+class CertificateVerificationAdmin(admin.ModelAdmin):
+    list_display = ('verification_code', 'student_name', 'course_title', 'issued_date', 'is_valid')
+    list_filter = ('is_valid',)
+    search_fields = ('verification_code', 'certificate_id', 'student_name', 'course_title')
+    readonly_fields = (
+        'source', 'certificate_id', 'verification_code', 'student_name', 'course_title',
+        'instructor_name', 'completion_date', 'issued_date', 'final_score', 'is_valid'
+    )
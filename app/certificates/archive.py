@@ -0,0 +1,123 @@
+import csv
+import logging
+import tempfile
+import time
+import zipfile
+
+from django.utils.text import get_valid_filename
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 64 * 1024
+BATCH_SIZE = 200
+
+MANIFEST_COLUMNS = [
+    'filename', 'certificate_id', 'verification_code', 'student_username',
+    'student_name', 'completion_date', 'issued_date', 'final_score', 'status',
+]
+
+
+class _StreamBuffer:
+    """
+    Write-only file object the ZIP writer appends to and the generator drains.
+
+    It has no tell() or seek(), so zipfile writes in streaming mode (local
+    headers followed by data descriptors) and never rewinds.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def archive_filename(certificate):
+    name = get_valid_filename(certificate.student.username) or 'student'
+    return f"certificates/{name}_{certificate.certificate_id}.pdf"
+
+
+def _open_pdf(certificate, template):
+    """Open a certificate's stored PDF, rendering it first if it is missing"""
+    from .utils import CertificateGenerator
+
+    pdf_file = certificate.pdf_file
+    if pdf_file and pdf_file.storage.exists(pdf_file.name):
+        return pdf_file.open('rb'), 'stored'
+
+    CertificateGenerator(certificate, template).save_certificate()
+    return certificate.pdf_file.open('rb'), 'rendered'
+
+
+def iter_course_certificate_archive(course):
+    """
+    Yield a ZIP archive of a course's certificate PDFs plus a CSV manifest.
+
+    The archive is produced piece by piece as it is read: certificates are
+    loaded in batches and each PDF is copied in small chunks, so memory use
+    doesn't grow with the number of certificates. Certificates without a
+    PDF are rendered on the way. PDFs are stored uncompressed since they
+    are compressed already.
+    """
+    from .models import Certificate
+    from .utils import get_default_template
+
+    template = get_default_template()
+    buffer = _StreamBuffer()
+    # Spills to disk past 1 MB so large courses don't keep the manifest in memory
+    manifest = tempfile.SpooledTemporaryFile(max_size=1024 * 1024, mode='w+', newline='', encoding='utf-8')
+    writer = csv.writer(manifest)
+    writer.writerow(MANIFEST_COLUMNS)
+
+    certificates = Certificate.objects.filter(
+        course=course,
+        is_verified=True
+    ).select_related('student', 'course__instructor').order_by('pk')
+
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_STORED) as archive:
+        for certificate in certificates.iterator(chunk_size=BATCH_SIZE):
+            filename = archive_filename(certificate)
+            try:
+                source, pdf_status = _open_pdf(certificate, template)
+            except Exception:
+                logger.exception("Failed to render certificate %s for export", certificate.certificate_id)
+                filename, pdf_status = '', 'failed'
+            else:
+                with source, archive.open(filename, mode='w', force_zip64=True) as target:
+                    for chunk in iter(lambda: source.read(READ_SIZE), b''):
+                        target.write(chunk)
+                        yield buffer.drain()
+                yield buffer.drain()
+
+            student = certificate.student
+            writer.writerow([
+                filename,
+                certificate.certificate_id,
+                certificate.verification_code,
+                student.username,
+                student.get_full_name() or student.username,
+                certificate.completion_date.isoformat(),
+                certificate.issued_date.isoformat(),
+                certificate.final_score,
+                pdf_status,
+            ])
+
+        manifest.seek(0)
+        manifest_info = zipfile.ZipInfo('manifest.csv', date_time=time.localtime()[:6])
+        manifest_info.compress_type = zipfile.ZIP_DEFLATED
+        with manifest, archive.open(manifest_info, mode='w') as target:
+            for chunk in iter(lambda: manifest.read(READ_SIZE), ''):
+                target.write(chunk.encode('utf-8'))
+                yield buffer.drain()
+
+    # Central directory, written when the archive closes
+    yield buffer.drain()
@@ -0,0 +1,169 @@
+import logging
+import time
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Fields whose changes alter what an issued certificate prints
+USER_NAME_FIELDS = ('first_name', 'last_name', 'username')
+COURSE_NAME_FIELDS = ('title',)
+
+RECORD_BATCH_SIZE = 2000
+
+
+def affected_certificates(kind, object_id):
+    """Issued certificates that print the changed object's name"""
+    from .models import Certificate
+
+    lookup = {
+        'student': {'student_id': object_id},
+        'instructor': {'course__instructor_id': object_id},
+        'course': {'course_id': object_id},
+    }[kind]
+    return Certificate.objects.filter(is_verified=True, **lookup)
+
+
+def record_certificate_changes(kind, object_id):
+    """
+    Mark every certificate affected by a name change as needing a re-render.
+
+    Rows are keyed by certificate, so repeated edits before the worker gets
+    to them collapse into one pending re-render. Every edit bumps the row's
+    version, so a render already in flight with the old names leaves the
+    row queued. Returns how many certificates were affected.
+    """
+    from .models import PendingCertificateRender
+
+    certificate_ids = list(
+        affected_certificates(kind, object_id).values_list('pk', flat=True)
+    )
+    for start in range(0, len(certificate_ids), RECORD_BATCH_SIZE):
+        batch = certificate_ids[start:start + RECORD_BATCH_SIZE]
+        PendingCertificateRender.objects.bulk_create(
+            [PendingCertificateRender(certificate_id=certificate_id, reason=kind) for certificate_id in batch],
+            ignore_conflicts=True
+        )
+        PendingCertificateRender.objects.filter(certificate_id__in=batch).update(
+            reason=kind,
+            version=F('version') + 1,
+            attempts=0
+        )
+    return len(certificate_ids)
+
+
+def queue_certificate_changes(kind, object_id):
+    """Record affected certificates off the request thread once the save commits"""
+    from api.tasks import run_in_background
+
+    run_in_background(record_certificate_changes, kind, object_id)
+
+
+def changed_fields(sender, instance, fields, update_fields=None):
+    """
+    Names of the given fields whose saved value differs from the database.
+
+    Returns an empty tuple for new rows and for partial saves that don't
+    touch any of the fields.
+    """
+    if instance._state.adding or instance.pk is None:
+        return ()
+    if update_fields is not None:
+        fields = [name for name in fields if name in update_fields]
+        if not fields:
+            return ()
+
+    previous = sender._default_manager.filter(pk=instance.pk).values(*fields).first()
+    if previous is None:
+        return ()
+    return tuple(name for name in fields if previous[name] != getattr(instance, name))
+
+
+def process_pending_renders(limit=None, rate_per_minute=None):
+    """
+    Re-render certificates with pending name changes, oldest first.
+
+    Re-rendering is paced to rate_per_minute (CERTIFICATE_RERENDER_RATE by
+    default) so a rename of a large course doesn't monopolize the workers.
+    PDFs whose printed names turn out unchanged, and certificates that
+    have no PDF yet, are skipped. The verification record is updated to the
+    new names either way. A row is only removed if no newer change bumped
+    its version while it was being processed. A failed
+    re-render is re-queued behind the rows waiting now, for the next run,
+    until it has failed CERTIFICATE_RERENDER_MAX_ATTEMPTS times.
+    Returns (rendered, skipped, failed) counts.
+    """
+    from .models import Certificate, CertificateVerification, PendingCertificateRender
+    from .utils import ensure_certificate_pdf, get_default_template
+    from .verification import forget_verification
+
+    if rate_per_minute is None:
+        rate_per_minute = getattr(settings, 'CERTIFICATE_RERENDER_RATE', 600)
+    interval = 60.0 / rate_per_minute if rate_per_minute else 0
+    max_attempts = getattr(settings, 'CERTIFICATE_RERENDER_MAX_ATTEMPTS', 5)
+    # Rows re-queued during this run wait for the next one instead of failing in a loop
+    started_at = timezone.now()
+
+    template = get_default_template()
+    rendered = skipped = failed = 0
+    processed = 0
+
+    while limit is None or processed < limit:
+        batch_size = 50 if limit is None else min(50, limit - processed)
+        pending = list(
+            PendingCertificateRender.objects.filter(
+                created_at__lte=started_at
+            ).order_by('created_at', 'pk')[:batch_size]
+        )
+        if not pending:
+            break
+
+        certificates = Certificate.objects.select_related(
+            'student', 'course__instructor'
+        ).in_bulk([row.certificate_id for row in pending])
+
+        for row in pending:
+            started = time.monotonic()
+            certificate = certificates.get(row.certificate_id)
+            try:
+                if certificate is not None and certificate.pdf_file and ensure_certificate_pdf(
+                    certificate, template
+                ):
+                    rendered += 1
+                else:
+                    skipped += 1
+                if certificate is not None:
+                    fields = CertificateVerification.fields_for(certificate)
+                    CertificateVerification.objects.filter(source=certificate).update(
+                        student_name=fields['student_name'],
+                        course_title=fields['course_title'],
+                        instructor_name=fields['instructor_name']
+                    )
+                    forget_verification(certificate.certificate_id, certificate.verification_code)
+            except Exception:
+                failed += 1
+                logger.exception("Failed to re-render certificate %s", row.certificate_id)
+                if row.attempts + 1 < max_attempts:
+                    PendingCertificateRender.objects.filter(pk=row.pk).update(
+                        attempts=F('attempts') + 1,
+                        created_at=timezone.now()
+                    )
+                else:
+                    # Give up; the download path still re-renders stale PDFs lazily
+                    logger.error(
+                        "Giving up re-rendering certificate %s after %s attempts",
+                        row.certificate_id, max_attempts
+                    )
+                    PendingCertificateRender.objects.filter(pk=row.pk, version=row.version).delete()
+            else:
+                # A change recorded meanwhile bumped the version; render again with the new names
+                PendingCertificateRender.objects.filter(pk=row.pk, version=row.version).delete()
+            processed += 1
+
+            elapsed = time.monotonic() - started
+            if interval > elapsed:
+                time.sleep(interval - elapsed)
+
+    return rendered, skipped, failed
@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+# Crockford base32: no I, L, O or U, so codes survive being read aloud or retyped
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+TYPO_MAP = str.maketrans({'O': '0', 'I': '1', 'L': '1'})
+
+KEY_SALT = 'certificates.verification_code'
+ID_MIN_LENGTH = 3
+SIGNATURE_LENGTH = 8
+MAX_CODE_LENGTH = 50
+
+# Codes issued before signing were 10 random uppercase letters/digits
+LEGACY_CODE_LENGTH = 10
+
+
+def _encode(number, min_length=1):
+    chars = []
+    while number:
+        number, remainder = divmod(number, 32)
+        chars.append(ALPHABET[remainder])
+    return ''.join(reversed(chars)).rjust(min_length, '0')
+
+
+def _decode(text):
+    number = 0
+    for char in text:
+        number = number * 32 + ALPHABET.index(char)
+    return number
+
+
+def _signature(certificate_pk):
+    secret = getattr(settings, 'CERTIFICATE_VERIFICATION_SECRET', None) or settings.SECRET_KEY
+    digest = salted_hmac(KEY_SALT, str(certificate_pk), secret=secret, algorithm='sha256').digest()
+    # First 40 bits of the MAC, as 8 base32 characters
+    return _encode(int.from_bytes(digest[:5], 'big'), SIGNATURE_LENGTH)
+
+
+def make_verification_code(certificate_pk):
+    """
+    Build the verification code for a certificate primary key.
+
+    The code is the base32 id followed by a truncated HMAC of it, grouped
+    for readability, e.g. `00K-7KX2-M9QA`.
+    """
+    signature = _signature(certificate_pk)
+    return f"{_encode(certificate_pk, ID_MIN_LENGTH)}-{signature[:4]}-{signature[4:]}"
+
+
+def parse_verification_code(code):
+    """
+    Return the certificate primary key a code was issued for, or None.
+
+    Only the HMAC is checked, so forged and mistyped codes are rejected
+    without touching the database. Case, spacing, hyphens and the
+    usual O/0 and I/L/1 confusions are tolerated.
+    """
+    if not code or len(code) > MAX_CODE_LENGTH:
+        return None
+
+    normalized = code.upper().replace('-', '').replace(' ', '').translate(TYPO_MAP)
+    if len(normalized) < ID_MIN_LENGTH + SIGNATURE_LENGTH:
+        return None
+    if any(char not in ALPHABET for char in normalized):
+        return None
+
+    certificate_pk = _decode(normalized[:-SIGNATURE_LENGTH])
+    if not certificate_pk:
+        return None
+    if not constant_time_compare(normalized[-SIGNATURE_LENGTH:], _signature(certificate_pk)):
+        return None
+    return certificate_pk
+
+
+def is_legacy_verification_code(code):
+    """Whether a code has the shape of the unsigned codes issued before signing"""
+    return (
+        bool(code)
+        and len(code) == LEGACY_CODE_LENGTH
+        and all(char.isascii() and (char.isupper() or char.isdigit()) for char in code)
+    )
@@ -0,0 +1,116 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('pending', 'rendering')
+
+
+def reap_stale_jobs(jobs=None):
+    """
+    Fail render jobs that stopped making progress.
+
+    A job whose worker died, e.g. because the process restarted, stays
+    pending or rendering forever and would be handed out again by
+    queue_certificate_job. Jobs not updated for CERTIFICATE_JOB_STALE_SECONDS
+    are marked failed so a new one can start. Returns the number failed.
+    """
+    from .models import CertificateJob
+
+    if jobs is None:
+        jobs = CertificateJob.objects.all()
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=getattr(settings, 'CERTIFICATE_JOB_STALE_SECONDS', 300))
+    return jobs.filter(status__in=ACTIVE_STATUSES, updated_at__lt=cutoff).update(
+        status='failed',
+        error='Certificate rendering timed out, please try again',
+        finished_at=now,
+        updated_at=now
+    )
+
+
+def issue_certificate(enrollment):
+    """
+    Create the certificate for a completed enrollment and queue its PDF.
+
+    The certificate row (and its verification record) is written right away;
+    rendering happens in the background. Returns (certificate, job), where
+    job is None if the certificate already has a PDF.
+    """
+    from .models import Certificate
+
+    certificate, _ = Certificate.objects.get_or_create(
+        enrollment=enrollment,
+        defaults={
+            'student_id': enrollment.student_id,
+            'course_id': enrollment.course_id,
+            'completion_date': enrollment.completed_at,
+            'final_score': enrollment.progress_percentage,
+        }
+    )
+    if certificate.pdf_file:
+        return certificate, None
+    return certificate, queue_certificate_job(certificate)
+
+
+def queue_certificate_job(certificate):
+    """Return the certificate's active render job, or start a new one"""
+    from api.tasks import run_in_background
+    from .models import CertificateJob
+
+    reap_stale_jobs(CertificateJob.objects.filter(certificate=certificate))
+    with transaction.atomic():
+        job = CertificateJob.objects.select_for_update().filter(
+            certificate=certificate,
+            status__in=ACTIVE_STATUSES
+        ).first()
+        if job is not None:
+            return job
+        job = CertificateJob.objects.create(certificate=certificate)
+        run_in_background(run_certificate_job, job.pk)
+    return job
+
+
+def _set_progress(job, **fields):
+    for name, value in fields.items():
+        setattr(job, name, value)
+    job.save(update_fields=list(fields) + ['updated_at'])
+
+
+def run_certificate_job(job_id):
+    """Render a queued certificate PDF, recording progress on the job"""
+    from .models import Certificate, CertificateJob
+    from .utils import CertificateGenerator, get_default_template
+
+    # Claim the job so a duplicate submission can't render it twice
+    claimed = CertificateJob.objects.filter(pk=job_id, status='pending').update(
+        status='rendering',
+        progress=10,
+        updated_at=timezone.now()
+    )
+    if not claimed:
+        return
+    job = CertificateJob.objects.get(pk=job_id)
+
+    try:
+        certificate = Certificate.objects.select_related(
+            'student', 'course__instructor'
+        ).get(pk=job.certificate_id)
+        generator = CertificateGenerator(certificate, get_default_template())
+        _set_progress(job, progress=40)
+        generator.save_certificate()
+    except Exception:
+        logger.exception("Failed to render certificate %s", job.certificate_id)
+        _set_progress(
+            job,
+            status='failed',
+            error='Certificate rendering failed, please try again',
+            finished_at=timezone.now()
+        )
+        return
+
+    _set_progress(job, status='complete', progress=100, finished_at=timezone.now())
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from certificates.archive import iter_course_certificate_archive
+from courses.models import Course
+
+
+class Command(BaseCommand):
+    help = "Write a ZIP of a course's certificate PDFs and a CSV manifest"
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_id', type=int)
+        parser.add_argument('path', help='Where to write the ZIP archive')
+
+    def handle(self, *args, **options):
+        try:
+            course = Course.objects.get(id=options['course_id'])
+        except Course.DoesNotExist:
+            raise CommandError(f"Course {options['course_id']} does not exist")
+
+        size = 0
+        try:
+            with open(options['path'], 'wb') as archive:
+                for chunk in iter_course_certificate_archive(course):
+                    archive.write(chunk)
+                    size += len(chunk)
+        except OSError as e:
+            raise CommandError(f"Could not write {options['path']}: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {options['path']} ({size} bytes)"
+        ))
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+from certificates.changes import process_pending_renders
+
+
+class Command(BaseCommand):
+    help = "Re-render certificate PDFs queued by student, instructor or course name changes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process the pending queue and exit instead of polling'
+        )
+        parser.add_argument(
+            '--rate',
+            type=int,
+            default=None,
+            help='Maximum re-renders per minute (default CERTIFICATE_RERENDER_RATE)'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=30,
+            help='Seconds to wait between polls when the queue is empty'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            rendered, skipped, failed = process_pending_renders(rate_per_minute=options['rate'])
+            if rendered or skipped or failed:
+                self.stdout.write(
+                    f"Re-rendered {rendered} certificate(s), {skipped} unchanged, {failed} failed"
+                )
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS("Certificate render queue drained"))
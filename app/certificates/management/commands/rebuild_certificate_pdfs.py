@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from certificates.models import Certificate
+from certificates.utils import rebuild_certificate_pdfs
+
+
+class Command(BaseCommand):
+    help = "Re-render certificate PDFs that are stale for the current default template"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--course',
+            type=int,
+            action='append',
+            dest='courses',
+            help='Only rebuild certificates for this course id (repeatable)'
+        )
+        parser.add_argument(
+            '--check-names',
+            action='store_true',
+            help='Also re-render PDFs whose student, course or instructor name changed'
+        )
+
+    def handle(self, *args, **options):
+        certificates = Certificate.objects.filter(is_verified=True)
+        if options['courses']:
+            certificates = certificates.filter(course_id__in=options['courses'])
+
+        rendered, failed = rebuild_certificate_pdfs(certificates, check_names=options['check_names'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered {rendered} certificate PDF(s), {failed} failed"
+        ))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from certificates.models import Certificate
+from certificates.verification import rebuild_verification_records
+
+
+class Command(BaseCommand):
+    help = "Rebuild the public verification records from certificates"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--course',
+            type=int,
+            action='append',
+            dest='courses',
+            help='Only rebuild certificates for this course id (repeatable)'
+        )
+
+    def handle(self, *args, **options):
+        certificates = Certificate.objects.all()
+        if options['courses']:
+            certificates = certificates.filter(course_id__in=options['courses'])
+
+        created, updated = rebuild_verification_records(certificates)
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {created} and updated {updated} verification record(s)"
+        ))
@@ -0,0 +1,57 @@
+# Generated by Django 5.0.4 on 2026-10-19 07:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def _full_name(user):
+    return f"{user.first_name} {user.last_name}".strip() or user.username
+
+
+def backfill_verifications(apps, schema_editor):
+    Certificate = apps.get_model('certificates', 'Certificate')
+    CertificateVerification = apps.get_model('certificates', 'CertificateVerification')
+
+    certificates = Certificate.objects.select_related('student', 'course__instructor')
+    CertificateVerification.objects.bulk_create([
+        CertificateVerification(
+            source=certificate,
+            certificate_id=certificate.certificate_id,
+            verification_code=certificate.verification_code,
+            student_name=_full_name(certificate.student),
+            course_title=certificate.course.title,
+            instructor_name=_full_name(certificate.course.instructor),
+            completion_date=certificate.completion_date,
+            issued_date=certificate.issued_date,
+            final_score=certificate.final_score,
+            is_valid=certificate.is_verified,
+        )
+        for certificate in certificates.iterator()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('certificates', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CertificateVerification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('certificate_id', models.UUIDField(unique=True)),
+                ('verification_code', models.CharField(max_length=50, unique=True)),
+                ('student_name', models.CharField(max_length=255)),
+                ('course_title', models.CharField(max_length=200)),
+                ('instructor_name', models.CharField(max_length=255)),
+                ('completion_date', models.DateTimeField()),
+                ('issued_date', models.DateTimeField()),
+                ('final_score', models.PositiveIntegerField()),
+                ('is_valid', models.BooleanField(default=True)),
+                ('source', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='verification', to='certificates.certificate')),
+            ],
+        ),
+        migrations.RunPython(backfill_verifications, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.4 on 2026-10-19 07:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('certificates', '0002_certificateverification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certificate',
+            name='render_digest',
+            field=models.CharField(blank=True, editable=False, help_text='Hash of the names printed on the cached PDF', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='certificate',
+            name='rendered_template',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='certificates.certificatetemplate'),
+        ),
+        migrations.AddField(
+            model_name='certificate',
+            name='rendered_template_version',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='certificatetemplate',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.4 on 2026-10-19 07:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('certificates', '0004_certificatejob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingCertificateRender',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('certificate', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='pending_render', to='certificates.certificate')),
+            ],
+            options={
+                'ordering': ['created_at'],
+            },
+        ),
+    ]
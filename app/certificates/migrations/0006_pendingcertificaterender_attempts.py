@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-19 08:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('certificates', '0005_pendingcertificaterender'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pendingcertificaterender',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-19 09:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('certificates', '0006_pendingcertificaterender_attempts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pendingcertificaterender',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
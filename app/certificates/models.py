@@ -1,12 +1,67 @@
 from django.db import models
 from django.conf import settings
+from django.db import transaction
 from courses.models import Course, Enrollment
+from .codes import make_verification_code
 import uuid
 
 
+# Certificate fields copied into CertificateVerification
+VERIFICATION_SOURCE_FIELDS = {'verification_code', 'completion_date', 'issued_date', 'final_score'}
+
+
+class CertificateQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        """
+        Update certificates, carrying the change to their verification records.
+
+        Bulk and admin-style revocations go through QuerySet.update() and
+        never call save(), so the read model is synced here for them.
+        """
+        from .verification import rebuild_verification_records
+
+        refresh = VERIFICATION_SOURCE_FIELDS.intersection(kwargs)
+        if not refresh and 'is_verified' not in kwargs:
+            return super().update(**kwargs)
+
+        with transaction.atomic():
+            # Resolve the rows first: the filter may be on an updated field
+            pks = list(self.values_list('pk', flat=True))
+            updated = super().update(**kwargs)
+            for start in range(0, len(pks), 500):
+                certificates = Certificate.objects.filter(pk__in=pks[start:start + 500])
+                if refresh:
+                    rebuild_verification_records(certificates, create_missing=False)
+                else:
+                    sync_verifications(certificates)
+        return updated
+
+
+def sync_verifications(certificates):
+    """Set is_valid on the records of the given certificates from is_verified"""
+    from .verification import forget_verification
+
+    changed = 0
+    for is_verified in (True, False):
+        rows = list(certificates.filter(is_verified=is_verified).exclude(
+            verification__is_valid=is_verified
+        ).filter(verification__isnull=False).values_list('pk', 'certificate_id', 'verification_code'))
+        if not rows:
+            continue
+        CertificateVerification.objects.filter(
+            source_id__in=[pk for pk, _, _ in rows]
+        ).update(is_valid=is_verified)
+        for _, certificate_id, verification_code in rows:
+            forget_verification(certificate_id, verification_code)
+        changed += len(rows)
+    return changed
+
+
 class Certificate(models.Model):
     """Certificate model for course completion"""
 
+    objects = CertificateQuerySet.as_manager()
+
     # Unique certificate identifier
     certificate_id = models.UUIDField(
         default=uuid.uuid4,
@@ -45,6 +100,23 @@ class Certificate(models.Model):
         null=True
     )
 
+    # What the cached PDF was rendered from, to know when it is stale
+    rendered_template = models.ForeignKey(
+        'CertificateTemplate',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='+'
+    )
+    rendered_template_version = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    render_digest = models.CharField(
+        max_length=64,
+        blank=True,
+        editable=False,
+        help_text="Hash of the names printed on the cached PDF"
+    )
+
     # Verification
     is_verified = models.BooleanField(default=True)
     verification_code = models.CharField(
@@ -65,22 +137,38 @@ class Certificate(models.Model):
         return f"Certificate for {self.student.get_full_name()} - {self.course.title}"
 
     def save(self, *args, **kwargs):
-        if not self.verification_code:
+        if self.verification_code or not self._state.adding:
+            adding = self._state.adding
+            if not self.verification_code:
+                self.verification_code = self.generate_verification_code()
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                if adding:
+                    CertificateVerification.record(self)
+                else:
+                    self.sync_verification(kwargs.get('update_fields'))
+            return
+
+        # The signed code embeds the primary key, so it is set right after the
+        # insert; the certificate UUID keeps the unique column distinct until then
+        with transaction.atomic():
+            self.verification_code = self.certificate_id.hex
+            super().save(*args, **kwargs)
             self.verification_code = self.generate_verification_code()
-        super().save(*args, **kwargs)
+            Certificate.objects.filter(pk=self.pk).update(
+                verification_code=self.verification_code
+            )
+            CertificateVerification.record(self)
+
+    def sync_verification(self, update_fields=None):
+        """Carry revocation to the verification record"""
+        if update_fields is not None and 'is_verified' not in update_fields:
+            return
+        sync_verifications(Certificate.objects.filter(pk=self.pk))
 
     def generate_verification_code(self):
-        """Generate a unique verification code"""
-        import random
-        import string
-
-        while True:
-            code = ''.join(random.choices(
-                string.ascii_uppercase + string.digits,
-                k=10
-            ))
-            if not Certificate.objects.filter(verification_code=code).exists():
-                return code
+        """Generate the HMAC-signed verification code for this certificate"""
+        return make_verification_code(self.pk)
 
     @property
     def certificate_url(self):
@@ -91,6 +179,116 @@ class Certificate(models.Model):
         })
 
 
+class CertificateJob(models.Model):
+    """Background rendering of a certificate's PDF, polled by the client"""
+
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('rendering', 'Rendering'),
+        ('complete', 'Complete'),
+        ('failed', 'Failed'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    certificate = models.ForeignKey(
+        Certificate,
+        on_delete=models.CASCADE,
+        related_name='jobs'
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    progress = models.PositiveSmallIntegerField(default=0)
+    error = models.CharField(max_length=255, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.certificate_id} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('complete', 'failed')
+
+
+class PendingCertificateRender(models.Model):
+    """Certificate whose printed names changed and whose PDF awaits a re-render"""
+
+    certificate = models.OneToOneField(
+        Certificate,
+        on_delete=models.CASCADE,
+        related_name='pending_render'
+    )
+    reason = models.CharField(max_length=20)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    # Failed re-renders so far; the row is re-queued until CERTIFICATE_RERENDER_MAX_ATTEMPTS
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    # Bumped by every name change, so a render started before it doesn't dequeue the row
+    version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"{self.certificate_id} ({self.reason})"
+
+
+class CertificateVerification(models.Model):
+    """
+    Flat copy of what public verification shows, written once at issuance.
+
+    Public lookups read this single row by certificate_id or verification_code
+    instead of joining the certificate, student, course and instructor.
+    Only is_valid changes afterwards, when a certificate is revoked.
+    """
+
+    # Named source because certificate_id is the public UUID below
+    source = models.OneToOneField(
+        Certificate,
+        on_delete=models.CASCADE,
+        related_name='verification'
+    )
+    certificate_id = models.UUIDField(unique=True)
+    verification_code = models.CharField(max_length=50, unique=True)
+
+    student_name = models.CharField(max_length=255)
+    course_title = models.CharField(max_length=200)
+    instructor_name = models.CharField(max_length=255)
+    completion_date = models.DateTimeField()
+    issued_date = models.DateTimeField()
+    final_score = models.PositiveIntegerField()
+
+    is_valid = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f"{self.verification_code} - {self.student_name}"
+
+    @classmethod
+    def fields_for(cls, certificate):
+        student = certificate.student
+        instructor = certificate.course.instructor
+        return {
+            'certificate_id': certificate.certificate_id,
+            'verification_code': certificate.verification_code,
+            'student_name': student.get_full_name() or student.username,
+            'course_title': certificate.course.title,
+            'instructor_name': instructor.get_full_name() or instructor.username,
+            'completion_date': certificate.completion_date,
+            'issued_date': certificate.issued_date,
+            'final_score': certificate.final_score,
+            'is_valid': certificate.is_verified,
+        }
+
+    @classmethod
+    def record(cls, certificate):
+        return cls.objects.create(source=certificate, **cls.fields_for(certificate))
+
+
 class CertificateTemplate(models.Model):
     """Template for certificate design"""
 
@@ -134,6 +332,9 @@ class CertificateTemplate(models.Model):
     is_active = models.BooleanField(default=True)
     is_default = models.BooleanField(default=False)
 
+    # Bumped whenever a field that affects rendering changes
+    version = models.PositiveIntegerField(default=1, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -143,8 +344,36 @@ class CertificateTemplate(models.Model):
     def __str__(self):
         return self.name
 
+    RENDER_FIELDS = (
+        'background_color', 'text_color', 'border_color', 'logo',
+        'background_image', 'title_font_size', 'body_font_size',
+    )
+
     def save(self, *args, **kwargs):
+        from .utils import queue_certificate_pdf_rebuild
+
+        previous = None
+        if self.pk:
+            previous = CertificateTemplate.objects.filter(pk=self.pk).values(
+                'is_default', 'is_active', *self.RENDER_FIELDS
+            ).first()
+
+        changed = previous is not None and any(
+            previous[name] != getattr(getattr(self, name), 'name', getattr(self, name))
+            for name in self.RENDER_FIELDS
+        )
+        if changed:
+            self.version += 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = list(kwargs['update_fields']) + ['version']
+
         # Ensure only one default template
         if self.is_default:
-            CertificateTemplate.objects.filter(is_default=True).update(is_default=False)
+            CertificateTemplate.objects.filter(is_default=True).exclude(pk=self.pk).update(is_default=False)
         super().save(*args, **kwargs)
+
+        # Certificates rendered with another template or version are rebuilt in
+        # the background; downloads re-render any stale PDF they hit first
+        was_current = previous is not None and previous['is_default'] and previous['is_active']
+        if self.is_default and self.is_active and (changed or not was_current):
+            queue_certificate_pdf_rebuild()
@@ -0,0 +1,55 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Newline-delimited JSON: one object per line"""
+
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        return ''.join(render_line(row) for row in rows).encode(self.charset)
+
+
+def render_line(row):
+    return json.dumps(row, cls=JSONEncoder, ensure_ascii=False) + '\n'
+
+
+class ZipArchiveRenderer(BaseRenderer):
+    """Lets clients ask for application/zip; archives are streamed by the view"""
+
+    media_type = 'application/zip'
+    format = 'zip'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Only reached for error responses
+        if data is None:
+            return b''
+        return json.dumps(data, cls=JSONEncoder).encode('utf-8')
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Server-sent events; views stream the body themselves"""
+
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Only reached for error responses, sent as a single event
+        if data is None:
+            return b''
+        return render_event('error', data).encode(self.charset)
+
+
+def render_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, cls=JSONEncoder)}\n\n"
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import Certificate, CertificateTemplate
+from django.urls import reverse
+from .models import Certificate, CertificateJob, CertificateTemplate
 from users.serializers import UserProfileSerializer
 from courses.serializers import CourseListSerializer
 
@@ -67,6 +68,33 @@ class CertificateVerificationSerializer(serializers.Serializer):
         return attrs
 
 
+class BulkCertificateVerificationSerializer(serializers.Serializer):
+    """Serializer for bulk certificate verification requests"""
+    certificate_ids = serializers.ListField(
+        child=serializers.CharField(max_length=50),
+        required=False,
+        default=list
+    )
+    verification_codes = serializers.ListField(
+        child=serializers.CharField(max_length=50),
+        required=False,
+        default=list
+    )
+
+    def validate(self, attrs):
+        total = len(attrs['certificate_ids']) + len(attrs['verification_codes'])
+        if not total:
+            raise serializers.ValidationError(
+                "Provide certificate_ids or verification_codes"
+            )
+        max_items = self.context.get('max_items')
+        if max_items and total > max_items:
+            raise serializers.ValidationError(
+                f"At most {max_items} certificates can be verified per request"
+            )
+        return attrs
+
+
 class CertificateVerificationResultSerializer(serializers.Serializer):
     """Serializer for certificate verification results"""
     valid = serializers.BooleanField()
@@ -76,3 +104,32 @@ class CertificateVerificationResultSerializer(serializers.Serializer):
     completion_date = serializers.DateTimeField(required=False)
     final_score = serializers.IntegerField(required=False)
     issued_date = serializers.DateTimeField(required=False)
+
+
+class CertificateJobSerializer(serializers.ModelSerializer):
+    """Serializer for certificate rendering jobs"""
+    certificate_id = serializers.UUIDField(source='certificate.certificate_id', read_only=True)
+    status_url = serializers.SerializerMethodField()
+    events_url = serializers.SerializerMethodField()
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CertificateJob
+        fields = [
+            'id', 'certificate_id', 'status', 'progress', 'error',
+            'status_url', 'events_url', 'download_url',
+            'created_at', 'updated_at', 'finished_at'
+        ]
+
+    def get_status_url(self, obj):
+        return reverse('certificates:certificate_job', kwargs={'job_id': obj.pk})
+
+    def get_events_url(self, obj):
+        return reverse('certificates:certificate_job_events', kwargs={'job_id': obj.pk})
+
+    def get_download_url(self, obj):
+        if obj.status != 'complete':
+            return None
+        return reverse('certificates:download_certificate', kwargs={
+            'certificate_id': obj.certificate.certificate_id
+        })
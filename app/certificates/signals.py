@@ -1,17 +1,63 @@
-from django.db.models.signals import post_save
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
-from courses.models import Enrollment
-from .utils import generate_certificate_for_enrollment
+from courses.models import Course, Enrollment
+from .changes import COURSE_NAME_FIELDS, USER_NAME_FIELDS, changed_fields, queue_certificate_changes
+from .models import Certificate
+from .jobs import issue_certificate
+from .verification import forget_verification
 
 
 @receiver(post_save, sender=Enrollment)
-def auto_generate_certificate(sender, instance, created, **kwargs):
+def auto_generate_certificate(sender, instance, created, update_fields=None, **kwargs):
     """Automatically generate certificate when course is completed"""
+    # Partial saves that don't touch completion state can't newly complete a course
+    if update_fields is not None and not {'progress_percentage', 'completed_at'} & set(update_fields):
+        return
+
     if not created and instance.progress_percentage == 100 and instance.completed_at:
         # Check if certificate doesn't already exist
         if not hasattr(instance, 'certificate'):
             try:
-                generate_certificate_for_enrollment(instance)
+                # Renders in the background so the completing request isn't held up
+                issue_certificate(instance)
             except Exception as e:
                 # Log the error but don't raise it to avoid breaking the enrollment save
                 print(f"Failed to generate certificate for enrollment {instance.id}: {str(e)}")
+
+
+@receiver(post_delete, sender=Certificate)
+def forget_deleted_certificate(sender, instance, **kwargs):
+    """Stop serving a deleted certificate from the verification cache"""
+    forget_verification(instance.certificate_id, instance.verification_code)
+
+
+@receiver(pre_save, sender=get_user_model())
+def detect_user_name_change(sender, instance, update_fields=None, raw=False, **kwargs):
+    instance._certificate_name_changed = not raw and bool(
+        changed_fields(sender, instance, USER_NAME_FIELDS, update_fields)
+    )
+
+
+@receiver(post_save, sender=get_user_model())
+def fan_out_user_name_change(sender, instance, **kwargs):
+    """Queue re-renders of certificates printing a renamed student or instructor"""
+    if getattr(instance, '_certificate_name_changed', False):
+        instance._certificate_name_changed = False
+        queue_certificate_changes('student', instance.pk)
+        queue_certificate_changes('instructor', instance.pk)
+
+
+@receiver(pre_save, sender=Course)
+def detect_course_title_change(sender, instance, update_fields=None, raw=False, **kwargs):
+    instance._certificate_name_changed = not raw and bool(
+        changed_fields(sender, instance, COURSE_NAME_FIELDS, update_fields)
+    )
+
+
+@receiver(post_save, sender=Course)
+def fan_out_course_title_change(sender, instance, **kwargs):
+    """Queue re-renders of certificates for a renamed course"""
+    if getattr(instance, '_certificate_name_changed', False):
+        instance._certificate_name_changed = False
+        queue_certificate_changes('course', instance.pk)
@@ -1,4 +1,16 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import uuid
+import zipfile
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
@@ -7,8 +19,14 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from decimal import Decimal
 from django.utils import timezone
 from courses.models import Course, Enrollment
-from .models import Certificate, CertificateTemplate
+from .codes import make_verification_code, parse_verification_code
+from unittest import mock
+from .changes import process_pending_renders, record_certificate_changes
+from .models import (
+    Certificate, CertificateJob, CertificateTemplate, CertificateVerification, PendingCertificateRender
+)
 from .utils import generate_certificate_for_enrollment, verify_certificate
+from .verification import get_verification_record, verification_cache
 
 User = get_user_model()
 
@@ -93,8 +111,9 @@ class CertificateModelTest(TestCase):
             final_score=95
         )
 
-        self.assertIsNotNone(certificate.verification_code)
-        self.assertEqual(len(certificate.verification_code), 10)
+        self.assertEqual(certificate.verification_code, make_verification_code(certificate.pk))
+        certificate.refresh_from_db()
+        self.assertEqual(parse_verification_code(certificate.verification_code), certificate.pk)
 
 
 class CertificateTemplateTest(TestCase):
@@ -227,3 +246,842 @@ class CertificateUtilsTest(TestCase):
 
         self.assertFalse(result['valid'])
         self.assertIn('Invalid certificate ID format', result['message'])
+
+
+class VerificationCodeTest(APITestCase):
+    """Test HMAC-signed verification codes"""
+
+    def setUp(self):
+        verification_cache.clear()
+        instructor = User.objects.create_user(
+            username='instructor',
+            password='testpass123',
+            first_name='Jane',
+            last_name='Smith'
+        )
+        self.student = User.objects.create_user(
+            username='student',
+            password='testpass123',
+            first_name='John',
+            last_name='Doe'
+        )
+        self.course = Course.objects.create(
+            title='Python Basics',
+            description='Learn Python programming',
+            instructor=instructor,
+            price=Decimal('0.00'),
+            is_free=True,
+            duration_hours=10
+        )
+        enrollment = Enrollment.objects.create(
+            student=self.student,
+            course=self.course,
+            progress_percentage=100,
+            completed_at=timezone.now()
+        )
+        self.certificate = Certificate.objects.create(
+            student=self.student,
+            course=self.course,
+            enrollment=enrollment,
+            completion_date=enrollment.completed_at,
+            final_score=95
+        )
+
+    def test_code_round_trip(self):
+        """Test codes decode to their certificate and tolerate typos in formatting"""
+        code = self.certificate.verification_code
+        self.assertEqual(parse_verification_code(code), self.certificate.pk)
+        self.assertEqual(parse_verification_code(code.lower().replace('-', ' ')), self.certificate.pk)
+        self.assertEqual(parse_verification_code(code.replace('0', 'O')), self.certificate.pk)
+
+    def test_forged_code_rejected_without_queries(self):
+        """Test codes with a bad signature never reach the database"""
+        code = self.certificate.verification_code
+        forged = code[:-1] + ('A' if code[-1] != 'A' else 'B')
+
+        with self.assertNumQueries(0):
+            result = verify_certificate(verification_code=forged)
+            self.assertIsNone(parse_verification_code('not-a-code!'))
+            self.assertIsNone(parse_verification_code('X' * 500))
+
+        self.assertFalse(result['valid'])
+
+    @override_settings(CERTIFICATE_VERIFICATION_SECRET='another-secret')
+    def test_code_bound_to_secret(self):
+        """Test codes signed with another secret don't verify"""
+        self.assertIsNone(parse_verification_code(self.certificate.verification_code))
+
+    def test_verify_signed_code_in_one_query(self):
+        """Test a valid code loads the certificate and its names in a single query"""
+        with self.assertNumQueries(1):
+            result = verify_certificate(verification_code=self.certificate.verification_code)
+            self.assertEqual(result['student_name'], 'John Doe')
+        self.assertTrue(result['valid'])
+
+    def test_legacy_code_still_verifies(self):
+        """Test unsigned codes issued before signing remain valid"""
+        Certificate.objects.filter(pk=self.certificate.pk).update(verification_code='AB12CD34EF')
+
+        result = verify_certificate(verification_code='AB12CD34EF')
+        self.assertTrue(result['valid'])
+        self.assertFalse(verify_certificate(verification_code=self.certificate.verification_code)['valid'])
+
+    def test_verify_endpoint(self):
+        """Test the public verification endpoint accepts signed codes"""
+        response = self.client.post(
+            reverse('certificates:verify_certificate'),
+            {'verification_code': self.certificate.verification_code},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['valid'])
+        self.assertEqual(response.data['course_title'], 'Python Basics')
+
+    def test_public_view_single_query(self):
+        """Test the public certificate view doesn't lazy-load related rows"""
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse('certificates:public_certificate', kwargs={
+                    'certificate_id': self.certificate.certificate_id
+                })
+            )
+        self.assertEqual(response.data['instructor_name'], 'Jane Smith')
+
+
+class BulkVerificationTest(APITestCase):
+    """Test bulk certificate verification"""
+
+    def setUp(self):
+        cache.clear()
+        verification_cache.clear()
+        instructor = User.objects.create_user(username='instructor', first_name='Jane', last_name='Smith')
+        self.course = Course.objects.create(
+            title='Python Basics',
+            description='Learn Python programming',
+            instructor=instructor,
+            price=Decimal('0.00'),
+            is_free=True,
+            duration_hours=10
+        )
+        self.certificates = []
+        for index in range(3):
+            student = User.objects.create_user(username=f'student{index}')
+            enrollment = Enrollment.objects.create(
+                student=student,
+                course=self.course,
+                progress_percentage=100,
+                completed_at=timezone.now()
+            )
+            self.certificates.append(Certificate.objects.create(
+                student=student,
+                course=self.course,
+                enrollment=enrollment,
+                completion_date=enrollment.completed_at,
+                final_score=90
+            ))
+        self.url = reverse('certificates:bulk_verify_certificates')
+
+    def tearDown(self):
+        cache.clear()
+        verification_cache.clear()
+
+    def test_bulk_verify_in_one_query(self):
+        """Test ids and codes resolve with a single query, in input order"""
+        data = {
+            'certificate_ids': [str(self.certificates[0].certificate_id), str(uuid.uuid4()), 'bad-id'],
+            'verification_codes': [self.certificates[1].verification_code, 'FORGED-CODE', self.certificates[2].verification_code]
+        }
+
+        with self.assertNumQueries(1):
+            response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 6)
+        self.assertEqual(response.data['valid_count'], 3)
+        results = response.data['results']
+        self.assertEqual([r['valid'] for r in results], [True, False, False, True, False, True])
+        self.assertEqual(results[0]['instructor_name'], 'Jane Smith')
+        self.assertEqual(results[2]['message'], 'Invalid certificate ID format')
+        self.assertEqual(results[4]['message'], 'Invalid verification code')
+        self.assertEqual(results[3]['verification_code'], self.certificates[1].verification_code)
+
+    def test_revoked_certificate_invalid(self):
+        """Test unverified certificates don't verify in bulk"""
+        Certificate.objects.filter(pk=self.certificates[0].pk).update(is_verified=False)
+        response = self.client.post(
+            self.url,
+            {'verification_codes': [self.certificates[0].verification_code]},
+            format='json'
+        )
+        self.assertFalse(response.data['results'][0]['valid'])
+
+    def test_ndjson_stream(self):
+        """Test NDJSON responses stream one line per item"""
+        codes = [c.verification_code for c in self.certificates]
+        response = self.client.post(
+            self.url,
+            {'verification_codes': codes},
+            format='json',
+            HTTP_ACCEPT='application/x-ndjson'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([row['verification_code'] for row in rows], codes)
+        self.assertTrue(all(row['valid'] for row in rows))
+
+    @override_settings(CERTIFICATE_BULK_VERIFY_MAX_ITEMS=2)
+    def test_item_limit(self):
+        """Test requests above the per-request item limit are rejected"""
+        codes = [c.verification_code for c in self.certificates]
+        response = self.client.post(self.url, {'verification_codes': codes}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_empty_request_rejected(self):
+        """Test a request without ids or codes is rejected"""
+        response = self.client.post(self.url, {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(CERTIFICATE_BULK_VERIFY_RATE='5/min')
+    def test_rate_limited_by_items(self):
+        """Test the rate limit counts items, not requests"""
+        codes = [c.verification_code for c in self.certificates]
+
+        response = self.client.post(self.url, {'verification_codes': codes}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.post(self.url, {'verification_codes': codes}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+
+        response = self.client.post(self.url, {'verification_codes': codes[:2]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+    @override_settings(CERTIFICATE_BULK_VERIFY_RATE='5/min', CERTIFICATE_BULK_VERIFY_MAX_ITEMS=4)
+    def test_rejected_requests_not_charged(self):
+        """Test requests that fail validation don't use up the item budget"""
+        codes = [c.verification_code for c in self.certificates]
+        for _ in range(3):
+            response = self.client.post(self.url, {'verification_codes': codes * 2}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(self.url, {'verification_codes': codes}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+class VerificationReadModelTest(APITestCase):
+    """Test the denormalized verification records and their cache"""
+
+    def setUp(self):
+        verification_cache.clear()
+        instructor = User.objects.create_user(username='instructor', first_name='Jane', last_name='Smith')
+        student = User.objects.create_user(username='student', first_name='John', last_name='Doe')
+        course = Course.objects.create(
+            title='Python Basics',
+            description='Learn Python programming',
+            instructor=instructor,
+            price=Decimal('0.00'),
+            is_free=True,
+            duration_hours=10
+        )
+        enrollment = Enrollment.objects.create(
+            student=student,
+            course=course,
+            progress_percentage=100,
+            completed_at=timezone.now()
+        )
+        self.certificate = Certificate.objects.create(
+            student=student,
+            course=course,
+            enrollment=enrollment,
+            completion_date=enrollment.completed_at,
+            final_score=88
+        )
+        self.url = reverse('certificates:public_certificate', kwargs={
+            'certificate_id': self.certificate.certificate_id
+        })
+
+    def tearDown(self):
+        verification_cache.clear()
+
+    def test_record_written_at_issuance(self):
+        """Test issuing a certificate writes a flat verification record"""
+        record = CertificateVerification.objects.get(source=self.certificate)
+        self.assertEqual(record.certificate_id, self.certificate.certificate_id)
+        self.assertEqual(record.verification_code, self.certificate.verification_code)
+        self.assertEqual(record.student_name, 'John Doe')
+        self.assertEqual(record.instructor_name, 'Jane Smith')
+        self.assertEqual(record.final_score, 88)
+
+    def test_public_view_served_from_cache(self):
+        """Test repeat public lookups don't query the database"""
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['student_name'], 'John Doe')
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+            self.client.post(
+                reverse('certificates:verify_certificate'),
+                {'verification_code': self.certificate.verification_code.lower()},
+                format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_revocation_invalidates_cache(self):
+        """Test revoking a certificate stops it verifying immediately"""
+        self.client.get(self.url)
+
+        self.certificate.is_verified = False
+        self.certificate.save()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(CertificateVerification.objects.get().is_valid)
+
+    def test_queryset_revocation_reaches_read_model(self):
+        """Test revoking with QuerySet.update() stops a cached certificate verifying"""
+        self.client.get(self.url)
+
+        Certificate.objects.filter(course=self.certificate.course).update(is_verified=False)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(CertificateVerification.objects.get().is_valid)
+
+        Certificate.objects.filter(is_verified=False).update(is_verified=True)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+    def test_lru_evicts_oldest(self):
+        """Test the cache keeps only the most recently used entries"""
+        cache = type(verification_cache)(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(len(cache), 2)
+
+    def test_rebuild_command(self):
+        """Test the rebuild command restores missing and stale records"""
+        Certificate.objects.filter(pk=self.certificate.pk).update(is_verified=False)
+        CertificateVerification.objects.all().delete()
+
+        out = StringIO()
+        call_command('rebuild_certificate_verifications', stdout=out)
+
+        self.assertIn('Created 1', out.getvalue())
+        record = get_verification_record(certificate_id=self.certificate.certificate_id)
+        self.assertFalse(record['is_valid'])
+
+
+class CertificatePdfCacheTest(APITestCase):
+    """Test cached certificate PDFs and template-aware regeneration"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+
+        instructor = User.objects.create_user(username='instructor', first_name='Jane', last_name='Smith')
+        self.student = User.objects.create_user(username='student', first_name='John', last_name='Doe')
+        course = Course.objects.create(
+            title='Python Basics',
+            description='Learn Python programming',
+            instructor=instructor,
+            price=Decimal('0.00'),
+            is_free=True,
+            duration_hours=10
+        )
+        enrollment = Enrollment.objects.create(
+            student=self.student,
+            course=course,
+            progress_percentage=100,
+            completed_at=timezone.now()
+        )
+        self.certificate = generate_certificate_for_enrollment(enrollment)
+        self.template = CertificateTemplate.objects.get(is_default=True)
+        self.client.force_authenticate(self.student)
+        self.url = reverse('certificates:download_certificate', kwargs={
+            'certificate_id': self.certificate.certificate_id
+        })
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def refresh(self):
+        self.certificate.refresh_from_db()
+        return self.certificate.pdf_file.name
+
+    def test_rendered_template_recorded(self):
+        """Test issuing records the template and version used"""
+        self.assertEqual(self.certificate.rendered_template, self.template)
+        self.assertEqual(self.certificate.rendered_template_version, 1)
+        self.assertTrue(self.certificate.render_digest)
+
+    def test_download_serves_cached_pdf(self):
+        """Test downloads reuse a current PDF instead of re-rendering"""
+        name = self.refresh()
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+        self.assertEqual(self.refresh(), name)
+
+    def test_name_change_rerenders_on_download(self):
+        """Test a changed student name makes the cached PDF stale"""
+        old_name = self.refresh()
+        self.student.first_name = 'Johnny'
+        self.student.save()
+
+        self.client.get(self.url)
+        new_name = self.refresh()
+        self.assertNotEqual(new_name, old_name)
+        self.assertFalse(self.certificate.pdf_file.storage.exists(old_name))
+
+    def test_template_change_bumps_version(self):
+        """Test only rendering changes bump the template version"""
+        self.template.name = 'Renamed'
+        self.template.save()
+        self.assertEqual(self.template.version, 1)
+
+        self.template.border_color = '#FF0000'
+        self.template.save()
+        self.template.refresh_from_db()
+        self.assertEqual(self.template.version, 2)
+
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_default_switch_queues_background_rebuild(self):
+        """Test making another template the default rebuilds PDFs after commit"""
+        old_name = self.refresh()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            new_template = CertificateTemplate.objects.create(name='Fancy', is_default=True)
+
+        self.assertNotEqual(self.refresh(), old_name)
+        self.assertEqual(self.certificate.rendered_template, new_template)
+
+    def test_rebuild_command(self):
+        """Test the batch command re-renders only stale PDFs"""
+        out = StringIO()
+        call_command('rebuild_certificate_pdfs', stdout=out)
+        self.assertIn('Rendered 0', out.getvalue())
+
+        CertificateTemplate.objects.filter(pk=self.template.pk).update(version=5)
+        call_command('rebuild_certificate_pdfs', stdout=out)
+        self.assertIn('Rendered 1', out.getvalue())
+        self.refresh()
+        self.assertEqual(self.certificate.rendered_template_version, 5)
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class CertificateJobTest(APITestCase):
+    """Test asynchronous certificate issuance"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+
+        instructor = User.objects.create_user(username='instructor')
+        self.student = User.objects.create_user(username='student', first_name='John', last_name='Doe')
+        self.course = Course.objects.create(
+            title='Python Basics',
+            description='Learn Python programming',
+            instructor=instructor,
+            price=Decimal('0.00'),
+            is_free=True,
+            duration_hours=10
+        )
+        Enrollment.objects.create(
+            student=self.student,
+            course=self.course,
+            progress_percentage=100,
+            completed_at=timezone.now()
+        )
+        self.client.force_authenticate(self.student)
+        self.url = reverse('certificates:generate_certificate', kwargs={'course_id': self.course.pk})
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_generate_returns_job_and_renders_in_background(self):
+        """Test POST returns 202 and the PDF is rendered after commit"""
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = self.client.post(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job_id = response.data['job']['id']
+        self.assertEqual(response.data['job']['status'], 'pending')
+        self.assertFalse(Certificate.objects.get().pdf_file)
+
+        for callback in callbacks:
+            callback()
+
+        response = self.client.get(reverse('certificates:certificate_job', kwargs={'job_id': job_id}))
+        self.assertEqual(response.data['status'], 'complete')
+        self.assertEqual(response.data['progress'], 100)
+        self.assertIsNotNone(response.data['download_url'])
+        self.assertTrue(Certificate.objects.get().pdf_file)
+
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_duplicate_requests_share_job(self):
+        """Test a second POST while rendering is pending returns the same job"""
+        with self.captureOnCommitCallbacks(execute=False):
+            first = self.client.post(self.url)
+            second = self.client.post(self.url)
+
+        self.assertEqual(first.data['job']['id'], second.data['job']['id'])
+        self.assertEqual(CertificateJob.objects.count(), 1)
+
+    def test_failed_render_reported_on_job(self):
+        """Test rendering errors fail the job instead of the request"""
+        with mock.patch('certificates.utils.CertificateGenerator.save_certificate', side_effect=RuntimeError('boom')):
+            with self.assertLogs('certificates.jobs', level='ERROR'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    response = self.client.post(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job = CertificateJob.objects.get()
+        self.assertEqual(job.status, 'failed')
+        self.assertNotIn('boom', job.error)
+
+    def test_job_private_to_student(self):
+        """Test other users can't see a student's job"""
+        with self.captureOnCommitCallbacks(execute=False):
+            job_id = self.client.post(self.url).data['job']['id']
+
+        self.client.force_authenticate(User.objects.create_user(username='other'))
+        response = self.client.get(reverse('certificates:certificate_job', kwargs={'job_id': job_id}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_event_stream_reports_completion(self):
+        """Test the SSE stream sends the terminal event and closes"""
+        with self.captureOnCommitCallbacks(execute=True):
+            job_id = self.client.post(self.url).data['job']['id']
+
+        response = self.client.get(
+            reverse('certificates:certificate_job_events', kwargs={'job_id': job_id}),
+            HTTP_ACCEPT='text/event-stream'
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = b''.join(response.streaming_content).decode()
+        self.assertTrue(body.startswith('event: complete\n'))
+        self.assertIn('"progress": 100', body)
+
+    @override_settings(CERTIFICATE_JOB_EVENTS_TIMEOUT=0.05, CERTIFICATE_JOB_EVENTS_POLL_INTERVAL=0.01)
+    def test_event_stream_times_out(self):
+        """Test the SSE stream ends after the timeout while still pending"""
+        with self.captureOnCommitCallbacks(execute=False):
+            job_id = self.client.post(self.url).data['job']['id']
+
+        response = self.client.get(
+            reverse('certificates:certificate_job_events', kwargs={'job_id': job_id})
+        )
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(body.count('event: progress'), 1)
+        self.assertIn('event: timeout', body)
+        self.assertIn('status_url', body.split('event: timeout')[1])
+
+    def test_stale_job_is_failed_and_replaced(self):
+        """Test a job stuck rendering is failed on lookup and a new request starts another"""
+        with self.captureOnCommitCallbacks(execute=False):
+            job_id = self.client.post(self.url).data['job']['id']
+        CertificateJob.objects.filter(pk=job_id).update(
+            status='rendering', updated_at=timezone.now() - timedelta(hours=1)
+        )
+
+        response = self.client.get(reverse('certificates:certificate_job', kwargs={'job_id': job_id}))
+        self.assertEqual(response.data['status'], 'failed')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url)
+        self.assertNotEqual(response.data['job']['id'], job_id)
+        self.assertEqual(CertificateJob.objects.get(pk=response.data['job']['id']).status, 'complete')
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class CertificateNameChangeTest(APITestCase):
+    """Test re-render fan-out when printed names change"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        verification_cache.clear()
+
+        self.instructor = User.objects.create_user(username='instructor', first_name='Jane', last_name='Smith')
+        self.course = Course.objects.create(
+            title='Python Basics',
+            description='Learn Python programming',
+            instructor=self.instructor,
+            price=Decimal('0.00'),
+            is_free=True,
+            duration_hours=10
+        )
+        self.students = []
+        for index in range(3):
+            student = User.objects.create_user(username=f'student{index}', first_name='Student', last_name=str(index))
+            enrollment = Enrollment.objects.create(
+                student=student,
+                course=self.course,
+                progress_percentage=100,
+                completed_at=timezone.now()
+            )
+            generate_certificate_for_enrollment(enrollment)
+            self.students.append(student)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+        verification_cache.clear()
+
+    def test_profile_name_change_queues_student_certificates(self):
+        """Test editing a name through the profile endpoint marks that student's certificate"""
+        self.client.force_authenticate(self.students[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(reverse('users:profile'), {'first_name': 'Renamed'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        pending = PendingCertificateRender.objects.get()
+        self.assertEqual(pending.certificate.student, self.students[0])
+        self.assertEqual(pending.reason, 'student')
+
+    def test_unrelated_change_queues_nothing(self):
+        """Test saves that don't change printed names don't queue re-renders"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.students[0].bio = 'Hello'
+            self.students[0].save()
+            self.course.description = 'Updated'
+            self.course.save()
+
+        self.assertFalse(PendingCertificateRender.objects.exists())
+
+    def test_course_rename_coalesces(self):
+        """Test repeated course renames leave one pending re-render per certificate"""
+        for title in ('Python 101', 'Python 102'):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.course.title = title
+                self.course.save()
+
+        self.assertEqual(PendingCertificateRender.objects.count(), 3)
+
+    def test_process_rerenders_and_updates_verification(self):
+        """Test the worker re-renders stale PDFs and refreshes verification names"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.instructor.last_name = 'Jones'
+            self.instructor.save()
+        certificate = Certificate.objects.get(student=self.students[0])
+        old_pdf = certificate.pdf_file.name
+
+        with mock.patch('certificates.changes.time.sleep') as sleep:
+            rendered, skipped, failed = process_pending_renders(rate_per_minute=60)
+
+        self.assertEqual((rendered, skipped, failed), (3, 0, 0))
+        self.assertTrue(sleep.called)
+        self.assertFalse(PendingCertificateRender.objects.exists())
+        certificate.refresh_from_db()
+        self.assertNotEqual(certificate.pdf_file.name, old_pdf)
+        self.assertEqual(
+            get_verification_record(certificate_id=certificate.certificate_id)['instructor_name'],
+            'Jane Jones'
+        )
+
+    def test_reverted_name_skips_render(self):
+        """Test a name changed and changed back doesn't re-render"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.title = 'Temporary'
+            self.course.save()
+        Course.objects.filter(pk=self.course.pk).update(title='Python Basics')
+
+        rendered, skipped, failed = process_pending_renders(rate_per_minute=0)
+        self.assertEqual((rendered, skipped), (0, 3))
+
+    def test_change_during_render_stays_queued(self):
+        """Test a name change recorded while its certificate renders isn't lost"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.students[0].last_name = 'First'
+            self.students[0].save()
+
+        from .utils import ensure_certificate_pdf
+
+        def render_while_renamed(certificate, template=None):
+            with self.captureOnCommitCallbacks(execute=True):
+                User.objects.filter(pk=self.students[0].pk).update(last_name='Second')
+                record_certificate_changes('student', self.students[0].pk)
+            return ensure_certificate_pdf(certificate, template)
+
+        with mock.patch('certificates.utils.ensure_certificate_pdf', side_effect=render_while_renamed):
+            self.assertEqual(process_pending_renders(limit=1, rate_per_minute=0), (1, 0, 0))
+        self.assertEqual(PendingCertificateRender.objects.get().version, 2)
+
+        process_pending_renders(rate_per_minute=0)
+        self.assertFalse(PendingCertificateRender.objects.exists())
+        certificate = Certificate.objects.get(student=self.students[0])
+        self.assertEqual(
+            get_verification_record(certificate_id=certificate.certificate_id)['student_name'],
+            'Student Second'
+        )
+
+    def test_certificate_without_pdf_updates_verification(self):
+        """Test a certificate with no PDF yet still gets its verification names refreshed"""
+        certificate = Certificate.objects.get(student=self.students[0])
+        Certificate.objects.filter(pk=certificate.pk).update(pdf_file='')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.students[0].first_name = 'Renamed'
+            self.students[0].save()
+
+        self.assertEqual(process_pending_renders(rate_per_minute=0), (0, 1, 0))
+        certificate.refresh_from_db()
+        self.assertFalse(certificate.pdf_file)
+        self.assertEqual(
+            get_verification_record(certificate_id=certificate.certificate_id)['student_name'],
+            'Renamed 0'
+        )
+
+    @override_settings(CERTIFICATE_RERENDER_MAX_ATTEMPTS=2)
+    def test_failed_render_is_requeued(self):
+        """Test a failed re-render stays queued for the next run until it runs out of attempts"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.students[0].last_name = 'Changed'
+            self.students[0].save()
+
+        with mock.patch('certificates.utils.ensure_certificate_pdf', side_effect=RuntimeError('boom')):
+            self.assertEqual(process_pending_renders(rate_per_minute=0), (0, 0, 1))
+            self.assertEqual(PendingCertificateRender.objects.get().attempts, 1)
+
+            self.assertEqual(process_pending_renders(rate_per_minute=0), (0, 0, 1))
+            self.assertFalse(PendingCertificateRender.objects.exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.students[0].last_name = 'Again'
+            self.students[0].save()
+        with mock.patch('certificates.utils.ensure_certificate_pdf', side_effect=RuntimeError('boom')):
+            process_pending_renders(rate_per_minute=0)
+        self.assertEqual(process_pending_renders(rate_per_minute=0), (1, 0, 0))
+        self.assertFalse(PendingCertificateRender.objects.exists())
+
+    def test_process_command(self):
+        """Test the worker command drains the queue once"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.students[1].last_name = 'Changed'
+            self.students[1].save()
+
+        out = StringIO()
+        call_command('process_certificate_renders', once=True, rate=0, stdout=out)
+        self.assertIn('Re-rendered 1', out.getvalue())
+
+
+class CertificateArchiveExportTest(APITestCase):
+    """Test streaming a course's certificates as a ZIP archive"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+
+        self.instructor = User.objects.create_user(
+            username='instructor', first_name='Jane', last_name='Smith', user_type='instructor'
+        )
+        self.course = Course.objects.create(
+            title='Python Basics',
+            description='Learn Python programming',
+            instructor=self.instructor,
+            price=Decimal('0.00'),
+            is_free=True,
+            duration_hours=10
+        )
+        self.certificates = []
+        for name in ('alice', 'bob'):
+            student = User.objects.create_user(username=name, first_name=name.title(), last_name='Doe')
+            enrollment = Enrollment.objects.create(
+                student=student,
+                course=self.course,
+                progress_percentage=100,
+                completed_at=timezone.now()
+            )
+            self.certificates.append(generate_certificate_for_enrollment(enrollment))
+
+        self.url = reverse('certificates:course_certificate_archive', kwargs={'course_id': self.course.id})
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def download(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+
+    def read_manifest(self, archive):
+        return list(csv.DictReader(io.StringIO(archive.read('manifest.csv').decode('utf-8'))))
+
+    def test_archive_contains_pdfs_and_manifest(self):
+        """Test the archive holds every certificate PDF and a manifest row for each"""
+        self.client.force_authenticate(self.instructor)
+        response = self.client.get(self.url)
+
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertIn(f'course_{self.course.id}_certificates.zip', response['Content-Disposition'])
+
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertIsNone(archive.testzip())
+        rows = self.read_manifest(archive)
+        self.assertEqual(len(rows), 2)
+        for certificate, row in zip(self.certificates, rows):
+            self.assertEqual(row['certificate_id'], str(certificate.certificate_id))
+            self.assertEqual(row['verification_code'], certificate.verification_code)
+            self.assertEqual(row['status'], 'stored')
+            self.assertTrue(archive.read(row['filename']).startswith(b'%PDF'))
+
+    def test_missing_pdf_rendered_on_demand(self):
+        """Test certificates without a stored PDF are rendered into the archive"""
+        certificate = self.certificates[0]
+        os.remove(certificate.pdf_file.path)
+
+        self.client.force_authenticate(self.instructor)
+        archive = self.download()
+
+        row = self.read_manifest(archive)[0]
+        self.assertEqual(row['status'], 'rendered')
+        self.assertTrue(archive.read(row['filename']).startswith(b'%PDF'))
+        certificate.refresh_from_db()
+        self.assertTrue(certificate.pdf_file.storage.exists(certificate.pdf_file.name))
+
+    def test_revoked_certificates_excluded(self):
+        """Test revoked certificates are left out of the archive"""
+        revoked = self.certificates[1]
+        revoked.is_verified = False
+        revoked.save(update_fields=['is_verified'])
+
+        self.client.force_authenticate(self.instructor)
+        rows = self.read_manifest(self.download())
+        self.assertEqual([row['certificate_id'] for row in rows], [str(self.certificates[0].certificate_id)])
+
+    def test_other_instructor_cannot_export(self):
+        """Test only the course instructor or an admin can export"""
+        other = User.objects.create_user(username='other', user_type='instructor')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+
+        admin = User.objects.create_user(username='admin', user_type='admin')
+        self.client.force_authenticate(admin)
+        self.assertEqual(len(self.read_manifest(self.download())), 2)
+
+    def test_export_command(self):
+        """Test the management command writes the same archive to a file"""
+        path = os.path.join(self.media_root, 'export.zip')
+        out = StringIO()
+        call_command('export_course_certificates', str(self.course.id), path, stdout=out)
+
+        self.assertIn('Wrote', out.getvalue())
+        with zipfile.ZipFile(path) as archive:
+            self.assertEqual(len(self.read_manifest(archive)), 2)
@@ -0,0 +1,81 @@
+from django.conf import settings
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class ItemRateThrottle(SimpleRateThrottle):
+    """
+    Throttle by the number of items a request carries instead of by requests.
+
+    The rate (e.g. "5000/min") is read from the setting named by rate_setting.
+    Each history entry records (timestamp, items), so one request for 2000
+    items uses as much of the budget as 2000 single-item requests. Clients
+    are identified by user id when authenticated and by IP otherwise.
+
+    As a view throttle it only turns away clients with no budget left.
+    The view charges the items with charge() once the request has been
+    validated, so malformed or oversized requests cost nothing.
+    """
+
+    rate_setting = None
+    default_rate = None
+
+    def get_rate(self):
+        return getattr(settings, self.rate_setting, self.default_rate)
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def _load_history(self, request, view):
+        self.key = self.get_cache_key(request, view)
+        self.now = self.timer()
+        self.history = [
+            entry for entry in self.cache.get(self.key, [])
+            if entry[0] > self.now - self.duration
+        ]
+        return sum(items for _, items in self.history)
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        if self._load_history(request, view) >= self.num_requests:
+            self.cost = 1
+            return self.throttle_failure()
+        return True
+
+    def charge(self, request, items):
+        """Take items from the client's budget, raising Throttled if they don't fit"""
+        if self.rate is None:
+            return
+
+        if self._load_history(request, None) + items > self.num_requests:
+            self.cost = items
+            raise Throttled(wait=self.wait())
+
+        self.history.insert(0, (self.now, items))
+        self.cache.set(self.key, self.history, self.duration)
+
+    def wait(self):
+        # Seconds until enough of the window expires to fit this request
+        if not self.history or self.cost > self.num_requests:
+            return self.duration
+        available = self.num_requests - sum(items for _, items in self.history)
+        for timestamp, items in reversed(self.history):
+            available += items
+            if available >= self.cost:
+                return max(0, self.duration - (self.now - timestamp))
+        return self.duration
+
+
+class BulkVerificationThrottle(ItemRateThrottle):
+    """Items-per-minute limit for bulk certificate verification"""
+
+    scope = 'certificate_bulk_verification'
+    rate_setting = 'CERTIFICATE_BULK_VERIFY_RATE'
+    # Enough for one full-size NDJSON request (CERTIFICATE_BULK_VERIFY_STREAM_MAX_ITEMS)
+    default_rate = '50000/min'
@@ -9,12 +9,16 @@ urlpatterns = [
     path('<uuid:pk>/', views.CertificateDetailView.as_view(), name='certificate_detail'),
     path('generate/<int:course_id>/', views.generate_certificate, name='generate_certificate'),
     path('download/<uuid:certificate_id>/', views.download_certificate, name='download_certificate'),
+    path('jobs/<uuid:job_id>/', views.certificate_job_status, name='certificate_job'),
+    path('jobs/<uuid:job_id>/events/', views.certificate_job_events, name='certificate_job_events'),
     
     # Certificate verification
     path('verify/', views.verify_certificate_view, name='verify_certificate'),
+    path('verify/bulk/', views.bulk_verify_certificates, name='bulk_verify_certificates'),
     path('public/<uuid:certificate_id>/', views.public_certificate_view, name='public_certificate'),
     
     # Instructor certificate endpoints
     path('instructor/certificates/', views.InstructorCertificateListView.as_view(), name='instructor_certificates'),
     path('instructor/courses/<int:course_id>/certificates/', views.CourseCertificateListView.as_view(), name='course_certificates'),
+    path('instructor/courses/<int:course_id>/certificates/archive/', views.course_certificate_archive, name='course_certificate_archive'),
 ]
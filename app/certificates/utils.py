@@ -7,34 +7,28 @@ from reportlab.lib.enums import TA_CENTER, TA_LEFT
 from reportlab.pdfgen import canvas
 from django.core.files.base import ContentFile
 from django.conf import settings
+import hashlib
 import io
+import logging
 import os
+import threading
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 
 class CertificateGenerator:
     """Generate PDF certificates using ReportLab"""
     
-    def __init__(self, certificate):
+    def __init__(self, certificate, template=None):
         self.certificate = certificate
         self.student = certificate.student
         self.course = certificate.course
-        self.template = self.get_template()
+        self.template = template or self.get_template()
         
     def get_template(self):
         """Get certificate template or use default"""
-        from .models import CertificateTemplate
-        
-        try:
-            return CertificateTemplate.objects.get(is_default=True, is_active=True)
-        except CertificateTemplate.DoesNotExist:
-            # Create a default template if none exists
-            return CertificateTemplate.objects.create(
-                name="Default Template",
-                description="Default certificate template",
-                is_default=True,
-                is_active=True
-            )
+        return get_default_template()
     
     def generate_pdf(self):
         """Generate the certificate PDF"""
@@ -184,17 +178,155 @@ class CertificateGenerator:
         
         # Create filename
         filename = f"certificate_{self.certificate.certificate_id}.pdf"
+        old_name = self.certificate.pdf_file.name
         
-        # Save the PDF file
+        # Save the PDF file and record what it was rendered from
         self.certificate.pdf_file.save(
             filename,
             ContentFile(pdf_content),
-            save=True
+            save=False
         )
+        self.certificate.rendered_template = self.template
+        self.certificate.rendered_template_version = self.template.version
+        self.certificate.render_digest = render_digest(self.certificate)
+        self.certificate.save(update_fields=[
+            'pdf_file', 'rendered_template', 'rendered_template_version',
+            'render_digest', 'updated_at'
+        ])
+        
+        # The new file got its own name, so readers of the old one aren't cut off mid-download
+        if old_name and old_name != self.certificate.pdf_file.name:
+            self.certificate.pdf_file.storage.delete(old_name)
         
         return self.certificate.pdf_file.url
 
 
+def get_default_template():
+    """Get the active default template, creating one if none exists"""
+    from .models import CertificateTemplate
+
+    template = CertificateTemplate.objects.filter(is_default=True, is_active=True).first()
+    if template is None:
+        template = CertificateTemplate.objects.create(
+            name="Default Template",
+            description="Default certificate template",
+            is_default=True,
+            is_active=True
+        )
+    return template
+
+
+def render_digest(certificate):
+    """Hash of the names a certificate PDF prints, which can change after issuance"""
+    student = certificate.student
+    instructor = certificate.course.instructor
+    names = '\n'.join([
+        student.get_full_name() or student.username,
+        certificate.course.title,
+        instructor.get_full_name() or instructor.username,
+    ])
+    return hashlib.sha256(names.encode()).hexdigest()
+
+
+def is_pdf_current(certificate, template):
+    """Whether the cached PDF was rendered with this template version and current names"""
+    return (
+        bool(certificate.pdf_file)
+        and certificate.rendered_template_id == template.pk
+        and certificate.rendered_template_version == template.version
+        and certificate.render_digest == render_digest(certificate)
+    )
+
+
+def ensure_certificate_pdf(certificate, template=None):
+    """
+    Return the certificate's PDF, re-rendering it only if it is stale.
+
+    Returns True if a new PDF was rendered.
+    """
+    template = template or get_default_template()
+    if is_pdf_current(certificate, template):
+        return False
+    CertificateGenerator(certificate, template).save_certificate()
+    return True
+
+
+def stale_certificates(template):
+    """Verified certificates whose PDF is missing or from another template version"""
+    from .models import Certificate
+    from django.db.models import Q
+
+    return Certificate.objects.filter(is_verified=True).filter(
+        Q(pdf_file='')
+        | Q(pdf_file__isnull=True)
+        | Q(rendered_template__isnull=True)
+        | ~Q(rendered_template=template)
+        | Q(rendered_template_version__isnull=True)
+        | ~Q(rendered_template_version=template.version)
+    )
+
+
+PDF_REBUILD_BATCH_SIZE = 100
+
+
+def rebuild_certificate_pdfs(certificates=None, check_names=False, batch_size=PDF_REBUILD_BATCH_SIZE):
+    """
+    Re-render stale certificate PDFs in batches.
+
+    By default only certificates rendered with another template version are
+    selected in SQL. With check_names, every given certificate is also checked
+    for changed names. Returns (rendered, failed) counts.
+    """
+    from .models import Certificate
+
+    template = get_default_template()
+    if certificates is None:
+        certificates = Certificate.objects.filter(is_verified=True)
+    if not check_names:
+        certificates = certificates & stale_certificates(template)
+
+    ids = list(certificates.order_by('pk').values_list('pk', flat=True))
+    rendered = failed = 0
+    for start in range(0, len(ids), batch_size):
+        batch = Certificate.objects.select_related(
+            'student', 'course__instructor'
+        ).filter(pk__in=ids[start:start + batch_size])
+        for certificate in batch:
+            try:
+                if ensure_certificate_pdf(certificate, template):
+                    rendered += 1
+            except Exception:
+                failed += 1
+                logger.exception("Failed to render certificate %s", certificate.certificate_id)
+    return rendered, failed
+
+
+_rebuild_lock = threading.Lock()
+_rebuild_requested = threading.Event()
+
+
+def _run_pdf_rebuild():
+    # Requests that arrive while a rebuild runs are folded into one more pass
+    if not _rebuild_lock.acquire(blocking=False):
+        _rebuild_requested.set()
+        return
+    try:
+        while True:
+            _rebuild_requested.clear()
+            rebuild_certificate_pdfs()
+            if not _rebuild_requested.is_set():
+                break
+    finally:
+        _rebuild_lock.release()
+
+
+def queue_certificate_pdf_rebuild():
+    """Rebuild stale certificate PDFs in the background after the current transaction"""
+    from api.tasks import run_in_background
+
+    run_in_background(_run_pdf_rebuild)
+
+
 def generate_certificate_for_enrollment(enrollment):
     """Generate certificate when student completes a course"""
     from .models import Certificate
@@ -220,49 +352,113 @@ def generate_certificate_for_enrollment(enrollment):
 
 
 def verify_certificate(certificate_id=None, verification_code=None):
-    """Verify a certificate by ID or verification code"""
+    """
+    Verify a certificate by ID or verification code.
+
+    Served from the verification read model, so a valid certificate costs
+    at most one indexed lookup. The Certificate instance in a valid result
+    is only loaded if it is used.
+    """
+    from django.utils.functional import SimpleLazyObject
     from .models import Certificate
-    from django.core.exceptions import ValidationError
+    from .verification import canonical_code, get_verification_record, public_details
     import uuid
 
-    try:
-        if certificate_id:
-            # Validate UUID format first
-            try:
-                uuid.UUID(str(certificate_id))
-            except (ValueError, TypeError):
-                return {
-                    'valid': False,
-                    'message': 'Invalid certificate ID format'
-                }
-
-            certificate = Certificate.objects.get(
-                certificate_id=certificate_id,
-                is_verified=True
-            )
-        elif verification_code:
-            certificate = Certificate.objects.get(
-                verification_code=verification_code,
-                is_verified=True
-            )
-        else:
+    if certificate_id:
+        # Validate UUID format first
+        try:
+            uuid.UUID(str(certificate_id))
+        except (ValueError, TypeError):
             return {
                 'valid': False,
-                'message': 'Certificate ID or verification code required'
+                'message': 'Invalid certificate ID format'
             }
-
+        record = get_verification_record(certificate_id=certificate_id)
+    elif verification_code:
+        if canonical_code(verification_code) is None:
+            # Forged or mistyped: rejected without a query
+            return {
+                'valid': False,
+                'message': 'Invalid verification code'
+            }
+        record = get_verification_record(verification_code=verification_code)
+    else:
         return {
-            'valid': True,
-            'certificate': certificate,
-            'student_name': certificate.student.get_full_name() or certificate.student.username,
-            'course_title': certificate.course.title,
-            'completion_date': certificate.completion_date,
-            'final_score': certificate.final_score,
-            'issued_date': certificate.issued_date
+            'valid': False,
+            'message': 'Certificate ID or verification code required'
         }
 
-    except (Certificate.DoesNotExist, ValidationError):
+    if record is None or not record['is_valid']:
         return {
             'valid': False,
             'message': 'Certificate not found or invalid'
         }
+
+    return {
+        'valid': True,
+        'certificate': SimpleLazyObject(
+            lambda: Certificate.objects.get(certificate_id=record['certificate_id'])
+        ),
+        'verification_code': record['verification_code'],
+        **public_details(record)
+    }
+
+
+BULK_VERIFY_BATCH_SIZE = 500
+
+
+def verify_certificates_bulk(certificate_ids=(), verification_codes=(), batch_size=BULK_VERIFY_BATCH_SIZE):
+    """
+    Verify many certificates, yielding one result per input in order.
+
+    Items are resolved in batches against the verification read model, with
+    at most one IN query each for the records that aren't cached. Malformed
+    ids and codes with a bad signature are answered without a lookup.
+    """
+    items = [('certificate_id', value) for value in certificate_ids]
+    items += [('verification_code', value) for value in verification_codes]
+
+    for start in range(0, len(items), batch_size):
+        yield from _verify_batch(items[start:start + batch_size])
+
+
+def _lookup_key(kind, value):
+    """Cache/record key an input is matched on, or None if it can't be valid"""
+    from .verification import canonical_code
+    import uuid
+
+    if kind == 'certificate_id':
+        try:
+            return ('id', str(uuid.UUID(str(value))))
+        except (ValueError, TypeError):
+            return None
+
+    code = canonical_code(value)
+    return ('code', code) if code is not None else None
+
+
+def _verify_batch(items):
+    from .verification import get_verification_records, public_details
+
+    keys = [_lookup_key(kind, value) for kind, value in items]
+    records = get_verification_records(
+        certificate_ids=[key[1] for key in keys if key and key[0] == 'id'],
+        verification_codes=[key[1] for key in keys if key and key[0] == 'code']
+    )
+
+    for (kind, value), key in zip(items, keys):
+        result = {kind: value}
+        record = records.get(key) if key is not None else None
+        if key is None:
+            result['valid'] = False
+            result['message'] = (
+                'Invalid certificate ID format' if kind == 'certificate_id'
+                else 'Invalid verification code'
+            )
+        elif record is not None and record['is_valid']:
+            result['valid'] = True
+            result.update(public_details(record))
+        else:
+            result['valid'] = False
+            result['message'] = 'Certificate not found or invalid'
+        yield result
@@ -0,0 +1,204 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .codes import is_legacy_verification_code, make_verification_code, parse_verification_code
+
+RECORD_FIELDS = (
+    'certificate_id', 'verification_code', 'student_name', 'course_title',
+    'instructor_name', 'completion_date', 'issued_date', 'final_score', 'is_valid',
+)
+
+
+class LRUCache:
+    """
+    Small thread-safe in-process LRU cache with a per-entry time to live.
+
+    The TTL bounds how long another process can serve a record after it
+    was revoked; revocations in this process are forgotten immediately.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+verification_cache = LRUCache(
+    maxsize=getattr(settings, 'CERTIFICATE_VERIFICATION_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'CERTIFICATE_VERIFICATION_CACHE_TTL', 300)
+)
+
+
+def canonical_code(verification_code):
+    """
+    The stored form of a verification code, or None if it can't be valid.
+
+    Signed codes are checked and re-formatted without a query, so typos in
+    case or grouping still hit the same index entry and cache key.
+    """
+    certificate_pk = parse_verification_code(verification_code)
+    if certificate_pk is not None:
+        return make_verification_code(certificate_pk)
+    if is_legacy_verification_code(verification_code):
+        return verification_code
+    return None
+
+
+def _cache(record):
+    verification_cache.set(('id', str(record['certificate_id'])), record)
+    verification_cache.set(('code', record['verification_code']), record)
+
+
+def get_verification_record(certificate_id=None, verification_code=None):
+    """
+    Return the verification record for a certificate as a dict, or None.
+
+    Served from the LRU cache when possible, otherwise one indexed lookup
+    on the read model. Revoked certificates are returned with is_valid False.
+    """
+    from .models import CertificateVerification
+
+    if certificate_id:
+        key = ('id', str(certificate_id))
+        lookup = {'certificate_id': certificate_id}
+    else:
+        code = canonical_code(verification_code)
+        if code is None:
+            return None
+        key = ('code', code)
+        lookup = {'verification_code': code}
+
+    record = verification_cache.get(key)
+    if record is not None:
+        return record
+
+    record = CertificateVerification.objects.filter(**lookup).values(*RECORD_FIELDS).first()
+    if record is not None:
+        _cache(record)
+    return record
+
+
+def get_verification_records(certificate_ids=(), verification_codes=()):
+    """
+    Fetch records for many ids and canonical codes with one IN query.
+
+    Returns a dict keyed by ('id', str(certificate_id)) and ('code', code).
+    Cached records are used as is and only the misses are queried.
+    """
+    from django.db.models import Q
+    from .models import CertificateVerification
+
+    records = {}
+    missing_ids, missing_codes = [], []
+    for certificate_id in certificate_ids:
+        record = verification_cache.get(('id', str(certificate_id)))
+        if record is None:
+            missing_ids.append(certificate_id)
+        else:
+            records[('id', str(certificate_id))] = record
+    for code in verification_codes:
+        record = verification_cache.get(('code', code))
+        if record is None:
+            missing_codes.append(code)
+        else:
+            records[('code', code)] = record
+
+    query = Q()
+    if missing_ids:
+        query |= Q(certificate_id__in=missing_ids)
+    if missing_codes:
+        query |= Q(verification_code__in=missing_codes)
+
+    if query:
+        for record in CertificateVerification.objects.filter(query).values(*RECORD_FIELDS):
+            _cache(record)
+            records[('id', str(record['certificate_id']))] = record
+            records[('code', record['verification_code'])] = record
+
+    return records
+
+
+def forget_verification(certificate_id, verification_code):
+    """Drop a certificate's record from this process's cache"""
+    verification_cache.delete(('id', str(certificate_id)))
+    verification_cache.delete(('code', verification_code))
+
+
+def public_details(record):
+    """Fields shown to the public for a valid record"""
+    return {
+        'student_name': record['student_name'],
+        'course_title': record['course_title'],
+        'instructor_name': record['instructor_name'],
+        'completion_date': record['completion_date'],
+        'final_score': record['final_score'],
+        'issued_date': record['issued_date'],
+    }
+
+
+def rebuild_verification_records(certificates=None, create_missing=True):
+    """
+    Rewrite verification records from their certificates.
+
+    Corrects changed records and, with create_missing, creates missing
+    ones, e.g. after certificates were changed with raw SQL or names were
+    edited. Returns (created, updated) counts.
+    """
+    from .models import Certificate, CertificateVerification
+
+    if certificates is None:
+        certificates = Certificate.objects.all()
+    certificates = certificates.select_related('student', 'course__instructor', 'verification')
+
+    created, changed = [], []
+    for certificate in certificates.iterator(chunk_size=500):
+        fields = CertificateVerification.fields_for(certificate)
+        try:
+            record = certificate.verification
+        except CertificateVerification.DoesNotExist:
+            if create_missing:
+                created.append(CertificateVerification(source=certificate, **fields))
+            continue
+        if any(getattr(record, name) != value for name, value in fields.items()):
+            forget_verification(record.certificate_id, record.verification_code)
+            for name, value in fields.items():
+                setattr(record, name, value)
+            changed.append(record)
+
+    CertificateVerification.objects.bulk_create(created, batch_size=500)
+    CertificateVerification.objects.bulk_update(changed, list(RECORD_FIELDS), batch_size=500)
+    return len(created), len(changed)
@@ -1,16 +1,24 @@
+import time
 from rest_framework import generics, status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes, throttle_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.settings import api_settings
+from django.conf import settings
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse
+from django.http import FileResponse, StreamingHttpResponse
 from courses.models import Course, Enrollment
-from .models import Certificate
+from .archive import iter_course_certificate_archive
+from .jobs import issue_certificate, reap_stale_jobs
+from .models import Certificate, CertificateJob
+from .renderers import EventStreamRenderer, NDJSONRenderer, ZipArchiveRenderer, render_event, render_line
 from .serializers import (
     CertificateSerializer, CertificateListSerializer,
-    CertificateVerificationSerializer, CertificateVerificationResultSerializer
+    CertificateVerificationSerializer, CertificateVerificationResultSerializer,
+    BulkCertificateVerificationSerializer, CertificateJobSerializer
 )
-from .utils import generate_certificate_for_enrollment, verify_certificate
+from .throttling import BulkVerificationThrottle
+from .utils import ensure_certificate_pdf, verify_certificate, verify_certificates_bulk
 
 
 class StudentCertificateListView(generics.ListAPIView):
@@ -57,31 +65,79 @@ def generate_certificate(request, course_id):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    # Check if certificate already exists
-    if hasattr(enrollment, 'certificate'):
+    certificate, job = issue_certificate(enrollment)
+
+    if job is None:
         return Response(
             {
                 'message': 'Certificate already exists',
-                'certificate': CertificateSerializer(enrollment.certificate).data
+                'certificate': CertificateSerializer(certificate).data
             },
             status=status.HTTP_200_OK
         )
 
-    # Generate certificate
-    try:
-        certificate = generate_certificate_for_enrollment(enrollment)
-        return Response(
-            {
-                'message': 'Certificate generated successfully',
-                'certificate': CertificateSerializer(certificate).data
-            },
-            status=status.HTTP_201_CREATED
-        )
-    except Exception as e:
-        return Response(
-            {'error': f'Failed to generate certificate: {str(e)}'},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
+    # Rendering happens in the background; poll the job or follow its events
+    return Response(
+        {
+            'message': 'Certificate generation started',
+            'job': CertificateJobSerializer(job).data
+        },
+        status=status.HTTP_202_ACCEPTED
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def certificate_job_status(request, job_id):
+    """Get the progress of a certificate rendering job"""
+    reap_stale_jobs(CertificateJob.objects.filter(pk=job_id))
+    job = get_object_or_404(
+        CertificateJob.objects.select_related('certificate'),
+        pk=job_id,
+        certificate__student=request.user
+    )
+    return Response(CertificateJobSerializer(job).data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@renderer_classes([EventStreamRenderer] + api_settings.DEFAULT_RENDERER_CLASSES)
+def certificate_job_events(request, job_id):
+    """Stream server-sent events for a certificate job until it finishes or briefly times out"""
+    reap_stale_jobs(CertificateJob.objects.filter(pk=job_id))
+    job = get_object_or_404(
+        CertificateJob.objects.select_related('certificate'),
+        pk=job_id,
+        certificate__student=request.user
+    )
+
+    poll_interval = getattr(settings, 'CERTIFICATE_JOB_EVENTS_POLL_INTERVAL', 0.5)
+    # Each open stream holds a worker, so it only long-polls briefly; clients
+    # reconnect or fall back to the job's status_url
+    timeout = getattr(settings, 'CERTIFICATE_JOB_EVENTS_TIMEOUT', 10)
+
+    def events():
+        deadline = time.monotonic() + timeout
+        last_sent = None
+        current = job
+        while True:
+            state = (current.status, current.progress)
+            if state != last_sent:
+                event = current.status if current.is_finished else 'progress'
+                yield render_event(event, CertificateJobSerializer(current).data)
+                last_sent = state
+            if current.is_finished:
+                return
+            if time.monotonic() >= deadline:
+                yield render_event('timeout', CertificateJobSerializer(current).data)
+                return
+            time.sleep(poll_interval)
+            current = CertificateJob.objects.select_related('certificate').get(pk=job.pk)
+
+    response = StreamingHttpResponse(events(), content_type=EventStreamRenderer.media_type)
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 @api_view(['GET'])
@@ -89,25 +145,21 @@ def generate_certificate(request, course_id):
 def download_certificate(request, certificate_id):
     """Download certificate PDF"""
     certificate = get_object_or_404(
-        Certificate,
+        Certificate.objects.select_related('student', 'course__instructor'),
         certificate_id=certificate_id,
         student=request.user,
         is_verified=True
     )
 
-    if not certificate.pdf_file:
-        return Response(
-            {'error': 'Certificate PDF not available'},
-            status=status.HTTP_404_NOT_FOUND
-        )
-
     try:
-        response = HttpResponse(
-            certificate.pdf_file.read(),
+        # Serves the cached PDF unless its template or names changed since rendering
+        ensure_certificate_pdf(certificate)
+        return FileResponse(
+            certificate.pdf_file.open('rb'),
+            as_attachment=True,
+            filename=f"certificate_{certificate.certificate_id}.pdf",
             content_type='application/pdf'
         )
-        response['Content-Disposition'] = f'attachment; filename="certificate_{certificate.certificate_id}.pdf"'
-        return response
     except Exception as e:
         return Response(
             {'error': f'Failed to download certificate: {str(e)}'},
@@ -122,10 +174,12 @@ def verify_certificate_view(request):
     serializer = CertificateVerificationSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
 
-    certificate_id = serializer.validated_data.get('certificate_id')
-    verification_code = serializer.validated_data.get('verification_code')
-
-    result = verify_certificate(certificate_id, verification_code)
+    result = verify_certificate(
+        certificate_id=serializer.validated_data.get('certificate_id'),
+        verification_code=serializer.validated_data.get('verification_code')
+    )
+    if not result['valid']:
+        result['message'] = 'Certificate not found or invalid'
 
     result_serializer = CertificateVerificationResultSerializer(data=result)
     result_serializer.is_valid(raise_exception=True)
@@ -133,33 +187,81 @@ def verify_certificate_view(request):
     return Response(result_serializer.data, status=status.HTTP_200_OK)
 
 
+@api_view(['POST'])
+@permission_classes([AllowAny])
+@renderer_classes(api_settings.DEFAULT_RENDERER_CLASSES + [NDJSONRenderer])
+@throttle_classes([BulkVerificationThrottle])
+def bulk_verify_certificates(request):
+    """Verify many certificates by ID or verification code in one request"""
+    streaming = request.accepted_renderer.format == 'ndjson'
+    max_items = (
+        getattr(settings, 'CERTIFICATE_BULK_VERIFY_STREAM_MAX_ITEMS', 50000) if streaming
+        else getattr(settings, 'CERTIFICATE_BULK_VERIFY_MAX_ITEMS', 1000)
+    )
+
+    serializer = BulkCertificateVerificationSerializer(
+        data=request.data,
+        context={'max_items': max_items}
+    )
+    serializer.is_valid(raise_exception=True)
+    BulkVerificationThrottle().charge(
+        request,
+        len(serializer.validated_data['certificate_ids']) + len(serializer.validated_data['verification_codes'])
+    )
+
+    results = verify_certificates_bulk(
+        serializer.validated_data['certificate_ids'],
+        serializer.validated_data['verification_codes']
+    )
+
+    if streaming:
+        # One line per item, written as each batch resolves
+        return StreamingHttpResponse(
+            (render_line(result) for result in results),
+            content_type=NDJSONRenderer.media_type
+        )
+
+    results = list(results)
+    return Response({
+        'count': len(results),
+        'valid_count': sum(1 for result in results if result['valid']),
+        'results': results
+    }, status=status.HTTP_200_OK)
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def public_certificate_view(request, certificate_id):
     """Public view of certificate for verification"""
-    try:
-        certificate = Certificate.objects.get(
-            certificate_id=certificate_id,
-            is_verified=True
-        )
+    result = verify_certificate(certificate_id=certificate_id)
 
-        return Response({
-            'valid': True,
-            'student_name': certificate.student.get_full_name() or certificate.student.username,
-            'course_title': certificate.course.title,
-            'instructor_name': certificate.course.instructor.get_full_name() or certificate.course.instructor.username,
-            'completion_date': certificate.completion_date,
-            'final_score': certificate.final_score,
-            'issued_date': certificate.issued_date,
-            'verification_code': certificate.verification_code
-        }, status=status.HTTP_200_OK)
-
-    except Certificate.DoesNotExist:
+    if not result['valid']:
         return Response(
             {'valid': False, 'message': 'Certificate not found'},
             status=status.HTTP_404_NOT_FOUND
         )
 
+    result.pop('certificate')
+    return Response(result, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@renderer_classes(api_settings.DEFAULT_RENDERER_CLASSES + [ZipArchiveRenderer])
+def course_certificate_archive(request, course_id):
+    """Download every certificate PDF of a course as a streamed ZIP"""
+    if request.user.user_type == 'admin':
+        course = get_object_or_404(Course, id=course_id)
+    else:
+        course = get_object_or_404(Course, id=course_id, instructor=request.user)
+
+    response = StreamingHttpResponse(
+        iter_course_certificate_archive(course),
+        content_type=ZipArchiveRenderer.media_type
+    )
+    response['Content-Disposition'] = f'attachment; filename="course_{course.id}_certificates.zip"'
+    return response
+
 
 class InstructorCertificateListView(generics.ListAPIView):
     """List certificates for instructor's courses"""
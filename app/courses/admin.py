@@ -19,7 +19,7 @@ class CourseAdmin(admin.ModelAdmin):
     list_display = ('title', 'instructor', 'category', 'price', 'is_free', 'is_published', 'student_count', 'created_at')
     list_filter = ('is_published', 'is_free', 'difficulty_level', 'category', 'created_at')
     search_fields = ('title', 'description', 'instructor__username')
-    readonly_fields = ('student_count', 'average_rating', 'lesson_count')
+    readonly_fields = ('student_count', 'enrolled_count', 'average_rating', 'lesson_count')
     inlines = [LessonInline]
 
     fieldsets = (
@@ -33,7 +33,7 @@ class CourseAdmin(admin.ModelAdmin):
             'fields': ('is_published', 'max_students')
         }),
         ('Statistics', {
-            'fields': ('student_count', 'average_rating', 'lesson_count'),
+            'fields': ('student_count', 'enrolled_count', 'average_rating', 'lesson_count'),
             'classes': ('collapse',)
         })
     )
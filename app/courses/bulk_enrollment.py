@@ -0,0 +1,258 @@
+import csv
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models.constants import OnConflict
+
+from .utils import release_seats, reserve_available_seats
+
+MAX_BULK_ENROLLMENT_ROWS = 50000
+LOOKUP_BATCH_SIZE = 500
+INSERT_BATCH_SIZE = 5000
+
+
+def read_student_identifiers(stream, file_format='csv'):
+    """
+    Read usernames or emails from a CSV or JSON stream.
+
+    CSV files may have a header with a `username` or `email` column;
+    otherwise the first column is used. JSON may be a list of strings or
+    objects, or an object with a `students` list.
+    """
+    if file_format == 'json':
+        data = json.load(stream)
+        if isinstance(data, dict):
+            data = data.get('students', [])
+        if not isinstance(data, list):
+            raise ValueError('Expected a list of students or an object with a "students" list')
+        return [normalize_identifier(item) for item in data]
+
+    try:
+        return _read_csv_identifiers(csv.reader(stream))
+    except csv.Error as e:
+        raise ValueError(str(e))
+
+
+def _read_csv_identifiers(rows):
+    first = next(rows, None)
+    if first is None:
+        return []
+
+    header = [cell.strip().lower() for cell in first]
+    column = 0
+    identifiers = []
+    if 'username' in header:
+        column = header.index('username')
+    elif 'email' in header:
+        column = header.index('email')
+    else:
+        identifiers.append(first[0].strip() if first else '')
+
+    for row in rows:
+        identifiers.append(row[column].strip() if len(row) > column else '')
+
+    return identifiers
+
+
+def normalize_identifier(item):
+    """Turn a JSON row into a username/email string"""
+    if isinstance(item, dict):
+        item = item.get('username') or item.get('email')
+    if not isinstance(item, (str, int)) or isinstance(item, bool):
+        return ''
+    return str(item).strip()
+
+
+def _resolve_users(identifiers):
+    """Map identifiers to user ids with batched IN queries"""
+    User = get_user_model()
+
+    resolved = {}
+    ambiguous = set()
+
+    for start in range(0, len(identifiers), LOOKUP_BATCH_SIZE):
+        batch = identifiers[start:start + LOOKUP_BATCH_SIZE]
+        resolved.update(
+            User.objects.filter(username__in=batch).values_list('username', 'id')
+        )
+
+    # Anything that looks like an email and isn't a username is matched by email
+    emails = [i for i in identifiers if '@' in i and i not in resolved]
+    for start in range(0, len(emails), LOOKUP_BATCH_SIZE):
+        batch = emails[start:start + LOOKUP_BATCH_SIZE]
+        for email, user_id in User.objects.filter(email__in=batch).values_list('email', 'id'):
+            # Emails aren't unique on the user model
+            if email in resolved:
+                ambiguous.add(email)
+            resolved[email] = user_id
+
+    for email in ambiguous:
+        del resolved[email]
+
+    return resolved, ambiguous
+
+
+def bulk_enroll_students(course, identifiers):
+    """
+    Enroll many students in a course at once.
+
+    Users are resolved in batches, existing enrollments are skipped, seats
+    are reserved against max_students in one go and the new rows are
+    inserted with a prepared executemany. Seats reserved for students
+    enrolled concurrently are released again. Returns one result dict per
+    input row.
+    """
+    from .models import Enrollment
+
+    results = [
+        {'row': index, 'student': identifier, 'status': None}
+        for index, identifier in enumerate(identifiers, start=1)
+    ]
+
+    seen = set()
+    candidates = []
+    for result in results:
+        identifier = result['student']
+        if not identifier:
+            result['status'] = 'invalid'
+        elif identifier in seen:
+            result['status'] = 'duplicate'
+        else:
+            seen.add(identifier)
+            candidates.append(result)
+
+    resolved, ambiguous = _resolve_users([result['student'] for result in candidates])
+
+    pending = []
+    for result in candidates:
+        if result['student'] in ambiguous:
+            result['status'] = 'ambiguous'
+        elif result['student'] not in resolved:
+            result['status'] = 'not_found'
+        else:
+            result['user_id'] = resolved[result['student']]
+            pending.append(result)
+
+    # The same user may appear once by username and once by email
+    unique_pending = {}
+    for result in pending:
+        if result['user_id'] in unique_pending:
+            result['status'] = 'duplicate'
+        else:
+            unique_pending[result['user_id']] = result
+    pending = list(unique_pending.values())
+
+    amount_paid = 0 if course.is_free else course.price
+
+    with transaction.atomic():
+        user_ids = [result['user_id'] for result in pending]
+        enrolled = set()
+        for start in range(0, len(user_ids), LOOKUP_BATCH_SIZE):
+            enrolled.update(
+                Enrollment.objects.filter(
+                    course=course,
+                    student_id__in=user_ids[start:start + LOOKUP_BATCH_SIZE]
+                ).values_list('student_id', flat=True)
+            )
+
+        new = []
+        for result in pending:
+            if result['user_id'] in enrolled:
+                result['status'] = 'already_enrolled'
+            else:
+                new.append(result)
+
+        granted = reserve_available_seats(course.pk, len(new)) if new else 0
+
+        for result in new[granted:]:
+            result['status'] = 'course_full'
+
+        inserted = _insert_enrollments(
+            course,
+            [result['user_id'] for result in new[:granted]],
+            amount_paid
+        )
+        if len(inserted) < granted:
+            # Enrolled concurrently; give back the seats reserved for them
+            release_seats(course.pk, granted - len(inserted))
+
+        for result in new[:granted]:
+            result['status'] = 'enrolled' if result['user_id'] in inserted else 'already_enrolled'
+
+    for result in results:
+        result.pop('user_id', None)
+
+    return results
+
+
+def _insert_enrollments(course, student_ids, amount_paid):
+    """
+    Insert enrollment rows with executemany, ignoring conflicts.
+
+    Every row shares the same course, timestamps and defaults, so the field
+    values are prepared once from a prototype instance and only the student
+    id varies. This skips bulk_create's per-row, per-field preparation,
+    which dominates the cost at tens of thousands of rows.
+
+    A concurrent request may enroll some of the same students in between
+    the existing-enrollment check and the insert; the (student, course)
+    constraint skips those rows. Each batch runs in a savepoint and, if its
+    row count falls short, is rolled back and inserted row by row to find
+    out which students were ours. Returns the set of student ids inserted.
+    """
+    from .models import Enrollment
+
+    if not student_ids:
+        return set()
+
+    prototype = Enrollment(course=course, amount_paid=amount_paid)
+    fields = [field for field in Enrollment._meta.concrete_fields if not field.primary_key]
+    student_field = Enrollment._meta.get_field('student')
+    base_values = [
+        field.get_db_prep_save(field.pre_save(prototype, True), connection)
+        for field in fields
+    ]
+    student_index = fields.index(student_field)
+
+    quote = connection.ops.quote_name
+    sql = '%s %s (%s) VALUES (%s) %s' % (
+        connection.ops.insert_statement(on_conflict=OnConflict.IGNORE),
+        quote(Enrollment._meta.db_table),
+        ', '.join(quote(field.column) for field in fields),
+        ', '.join(['%s'] * len(fields)),
+        connection.ops.on_conflict_suffix_sql(fields, OnConflict.IGNORE, None, None)
+    )
+
+    def row(student_id):
+        values = list(base_values)
+        values[student_index] = student_id
+        return values
+
+    inserted = set()
+    with connection.cursor() as cursor:
+        for start in range(0, len(student_ids), INSERT_BATCH_SIZE):
+            batch = student_ids[start:start + INSERT_BATCH_SIZE]
+            savepoint = transaction.savepoint()
+            cursor.executemany(sql, [row(student_id) for student_id in batch])
+            if cursor.rowcount == len(batch):
+                transaction.savepoint_commit(savepoint)
+                inserted.update(batch)
+                continue
+
+            # Some students were enrolled concurrently: redo this batch one
+            # row at a time so each row count says whether the row was ours
+            transaction.savepoint_rollback(savepoint)
+            for student_id in batch:
+                cursor.execute(sql, row(student_id))
+                if cursor.rowcount == 1:
+                    inserted.add(student_id)
+    return inserted
+
+
+def summarize_results(results):
+    """Count bulk enrollment results by status"""
+    summary = {}
+    for result in results:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+    return summary
@@ -0,0 +1,52 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from courses.bulk_enrollment import (
+    bulk_enroll_students, read_student_identifiers, summarize_results
+)
+from courses.models import Course
+
+
+class Command(BaseCommand):
+    help = "Enroll students listed in a CSV or JSON file in a course"
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_id', type=int)
+        parser.add_argument('path', help='CSV or JSON file of usernames or emails')
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'json'],
+            help='Input format (defaults to the file extension)'
+        )
+        parser.add_argument(
+            '--report',
+            help='Write a per-row CSV report to this path'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            course = Course.objects.get(id=options['course_id'])
+        except Course.DoesNotExist:
+            raise CommandError(f"Course {options['course_id']} does not exist")
+
+        file_format = options['format'] or (
+            'json' if options['path'].lower().endswith('.json') else 'csv'
+        )
+
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                identifiers = read_student_identifiers(stream, file_format)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read {options['path']}: {e}")
+
+        results = bulk_enroll_students(course, identifiers)
+
+        if options['report']:
+            with open(options['report'], 'w', newline='') as report:
+                writer = csv.DictWriter(report, fieldnames=['row', 'student', 'status'])
+                writer.writeheader()
+                writer.writerows(results)
+
+        for result_status, count in sorted(summarize_results(results).items()):
+            self.stdout.write(f"{result_status}: {count}")
+        self.stdout.write(self.style.SUCCESS(f"Processed {len(results)} row(s) for {course.title}"))
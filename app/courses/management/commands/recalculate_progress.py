@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from courses.models import Enrollment
+from courses.utils import recalculate_enrollment_progress
+
+
+class Command(BaseCommand):
+    help = "Recalculate stored enrollment progress after lessons are added or removed"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--course',
+            type=int,
+            action='append',
+            dest='course_ids',
+            help='Only recalculate enrollments for this course id (repeatable)'
+        )
+
+    def handle(self, *args, **options):
+        enrollments = Enrollment.objects.all()
+        if options['course_ids']:
+            enrollments = enrollments.filter(course_id__in=options['course_ids'])
+
+        changed = recalculate_enrollment_progress(enrollments)
+        self.stdout.write(self.style.SUCCESS(f"Updated progress for {changed} enrollment(s)"))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from courses.models import Course
+from courses.utils import sync_enrolled_counts
+
+
+class Command(BaseCommand):
+    help = "Rebuild course seat counters from active enrollments"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--course',
+            type=int,
+            action='append',
+            dest='course_ids',
+            help='Only rebuild the counter for this course id (repeatable)'
+        )
+
+    def handle(self, *args, **options):
+        courses = Course.objects.all()
+        if options['course_ids']:
+            courses = courses.filter(id__in=options['course_ids'])
+
+        updated = sync_enrolled_counts(courses)
+        self.stdout.write(self.style.SUCCESS(f"Synced seat counters for {updated} course(s)"))
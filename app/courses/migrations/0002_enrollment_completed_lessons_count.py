@@ -0,0 +1,37 @@
+# Generated by Django 5.0.4 on 2026-10-19 07:13
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_completed_lessons_count(apps, schema_editor):
+    Enrollment = apps.get_model('courses', 'Enrollment')
+    LessonProgress = apps.get_model('courses', 'LessonProgress')
+
+    completed = LessonProgress.objects.filter(
+        enrollment=OuterRef('pk'),
+        is_completed=True
+    ).order_by().values('enrollment').annotate(total=Count('pk')).values('total')
+
+    Enrollment.objects.update(
+        completed_lessons_count=Coalesce(
+            Subquery(completed, output_field=IntegerField()), Value(0)
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enrollment',
+            name='completed_lessons_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of completed lessons (maintained incrementally)'),
+        ),
+        migrations.RunPython(backfill_completed_lessons_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.4 on 2026-10-19 07:31
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_enrolled_count(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    Enrollment = apps.get_model('courses', 'Enrollment')
+
+    active = Enrollment.objects.filter(
+        course=OuterRef('pk'),
+        is_active=True
+    ).order_by().values('course').annotate(total=Count('pk')).values('total')
+
+    Course.objects.update(
+        enrolled_count=Coalesce(Subquery(active, output_field=IntegerField()), Value(0))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0002_enrollment_completed_lessons_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='enrolled_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Seats taken by active enrollments (maintained atomically)'),
+        ),
+        migrations.RunPython(backfill_enrolled_count, migrations.RunPython.noop),
+    ]
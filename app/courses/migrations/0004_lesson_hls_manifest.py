@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-19 07:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0003_course_enrolled_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='hls_manifest',
+            field=models.CharField(blank=True, editable=False, help_text='HLS master playlist generated from the uploaded video', max_length=255),
+        ),
+    ]
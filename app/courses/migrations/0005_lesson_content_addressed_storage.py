@@ -0,0 +1,24 @@
+# Generated by Django 5.0.4 on 2026-10-19 07:28
+
+import mediafiles.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0004_lesson_hls_manifest'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='lesson',
+            name='pdf_material',
+            field=models.FileField(blank=True, help_text='PDF study material', null=True, storage=mediafiles.storage.get_content_addressed_storage, upload_to='lesson_materials/'),
+        ),
+        migrations.AlterField(
+            model_name='lesson',
+            name='video_file',
+            field=models.FileField(blank=True, help_text='Upload video lesson', null=True, storage=mediafiles.storage.get_content_addressed_storage, upload_to='lesson_videos/'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.4 on 2026-10-19 09:15
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_lessons_count(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    Lesson = apps.get_model('courses', 'Lesson')
+
+    lessons = Lesson.objects.filter(
+        course=OuterRef('pk')
+    ).order_by().values('course').annotate(total=Count('pk')).values('total')
+
+    Course.objects.update(
+        lessons_count=Coalesce(Subquery(lessons, output_field=IntegerField()), Value(0))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_lesson_content_addressed_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='lessons_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of lessons (maintained incrementally)'),
+        ),
+        migrations.RunPython(backfill_lessons_count, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
+from mediafiles.storage import get_content_addressed_storage
 
 
 class Category(models.Model):
@@ -70,6 +71,16 @@ class Course(models.Model):
         blank=True,
         help_text="Maximum number of students (leave blank for unlimited)"
     )
+    enrolled_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Seats taken by active enrollments (maintained atomically)"
+    )
+    lessons_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Number of lessons (maintained incrementally)"
+    )
 
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -81,6 +92,16 @@ class Course(models.Model):
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        # The counters are only changed through F() UPDATEs, so a full save
+        # of a stale instance must not overwrite them
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in ('enrolled_count', 'lessons_count')
+            ]
+        super().save(*args, **kwargs)
+
     @property
     def student_count(self):
         return self.enrollments.filter(is_active=True).count()
@@ -112,10 +133,17 @@ class Lesson(models.Model):
     # Media files
     video_file = models.FileField(
         upload_to='lesson_videos/',
+        storage=get_content_addressed_storage,
         blank=True,
         null=True,
         help_text="Upload video lesson"
     )
+    hls_manifest = models.CharField(
+        max_length=255,
+        blank=True,
+        editable=False,
+        help_text="HLS master playlist generated from the uploaded video"
+    )
     video_url = models.URLField(
         blank=True,
         help_text="Or provide video URL (YouTube, Vimeo, etc.)"
@@ -124,6 +152,7 @@ class Lesson(models.Model):
     # Study materials
     pdf_material = models.FileField(
         upload_to='lesson_materials/',
+        storage=get_content_addressed_storage,
         blank=True,
         null=True,
         help_text="PDF study material"
@@ -172,6 +201,10 @@ class Enrollment(models.Model):
         default=0,
         validators=[MinValueValidator(0), MaxValueValidator(100)]
     )
+    completed_lessons_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of completed lessons (maintained incrementally)"
+    )
     completed_at = models.DateTimeField(null=True, blank=True)
 
     # Payment details (if applicable)
@@ -187,6 +220,19 @@ class Enrollment(models.Model):
     def __str__(self):
         return f"{self.student.username} - {self.course.title}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets the seat-counting signals see activity changes without a query
+        if 'is_active' in field_names:
+            instance._loaded_is_active = instance.is_active
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        if fields is None or 'is_active' in fields:
+            self._loaded_is_active = self.is_active
+
     @property
     def is_completed(self):
         return self.progress_percentage == 100
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import Category, Course, Lesson, Enrollment, LessonProgress, CourseReview
 from users.serializers import UserProfileSerializer
+from mediafiles.serializers import ImageVariantsField, StorageURLField
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -13,12 +14,13 @@ class CategorySerializer(serializers.ModelSerializer):
 
 class LessonSerializer(serializers.ModelSerializer):
     """Serializer for lessons"""
+    hls_manifest_url = StorageURLField(source='hls_manifest')
     
     class Meta:
         model = Lesson
         fields = [
             'id', 'title', 'description', 'order', 'video_file',
-            'video_url', 'pdf_material', 'duration_minutes',
+            'hls_manifest_url', 'video_url', 'pdf_material', 'duration_minutes',
             'is_preview', 'created_at', 'updated_at'
         ]
 
@@ -30,13 +32,14 @@ class CourseListSerializer(serializers.ModelSerializer):
     student_count = serializers.ReadOnlyField()
     average_rating = serializers.ReadOnlyField()
     lesson_count = serializers.ReadOnlyField()
+    thumbnail_variants = ImageVariantsField(source='thumbnail')
     
     class Meta:
         model = Course
         fields = [
             'id', 'title', 'description', 'instructor_name', 'category_name',
             'price', 'is_free', 'difficulty_level', 'duration_hours',
-            'thumbnail', 'is_published', 'student_count', 'average_rating',
+            'thumbnail', 'thumbnail_variants', 'is_published', 'student_count', 'average_rating',
             'lesson_count', 'created_at'
         ]
 
@@ -98,7 +101,8 @@ class EnrollmentSerializer(serializers.ModelSerializer):
         model = Enrollment
         fields = [
             'id', 'student', 'course', 'enrolled_at', 'is_active',
-            'progress_percentage', 'completed_at', 'amount_paid'
+            'progress_percentage', 'completed_lessons_count',
+            'completed_at', 'amount_paid'
         ]
 
 
@@ -134,3 +138,14 @@ class CourseReviewCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = CourseReview
         fields = ['rating', 'review_text']
+
+
+class WatchHeartbeatSerializer(serializers.Serializer):
+    """Serializer for a single lesson watch-time heartbeat"""
+    lesson = serializers.IntegerField(min_value=1)
+    seconds = serializers.IntegerField(min_value=1, max_value=300)
+
+
+class WatchHeartbeatBatchSerializer(serializers.Serializer):
+    """Serializer for a batch of watch-time heartbeats"""
+    events = WatchHeartbeatSerializer(many=True, allow_empty=False, max_length=500)
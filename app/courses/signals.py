@@ -0,0 +1,62 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .models import Course, Enrollment, Lesson
+from .utils import EnrollmentError, release_seats, reserve_seats
+
+
+@receiver(pre_save, sender=Enrollment)
+def reserve_reactivated_seat(sender, instance, update_fields=None, raw=False, **kwargs):
+    """
+    Note whether a saved enrollment was active before this save.
+
+    Reactivating an enrollment takes its seat back here, before the row is
+    written, so a full course refuses the save with EnrollmentError.
+    """
+    instance._was_active = None
+    if raw or instance.pk is None or (update_fields is not None and 'is_active' not in update_fields):
+        return
+    was_active = getattr(instance, '_loaded_is_active', None)
+    if was_active is None:
+        was_active = Enrollment.objects.filter(pk=instance.pk).values_list('is_active', flat=True).first()
+    instance._was_active = was_active
+
+    if was_active is False and instance.is_active and not reserve_seats(instance.course_id):
+        raise EnrollmentError('Course is full')
+
+
+@receiver(post_save, sender=Enrollment)
+def follow_enrollment_activity(sender, instance, created, **kwargs):
+    """Give back a seat when an enrollment is deactivated"""
+    was_active = getattr(instance, '_was_active', None)
+    instance._loaded_is_active = instance.is_active
+    if not created and was_active and not instance.is_active:
+        release_seats(instance.course_id)
+
+
+@receiver(post_delete, sender=Enrollment)
+def release_deleted_enrollment_seat(sender, instance, origin=None, **kwargs):
+    """Deleting an active enrollment frees its seat"""
+    if not instance.is_active:
+        return
+    if isinstance(origin, Course) and origin.pk == instance.course_id:
+        # The course itself is being deleted
+        return
+    release_seats(instance.course_id)
+
+
+@receiver(post_save, sender=Lesson)
+def count_added_lesson(sender, instance, created, raw=False, **kwargs):
+    """Keep Course.lessons_count in step as lessons are added"""
+    if created and not raw:
+        Course.objects.filter(pk=instance.course_id).update(lessons_count=F('lessons_count') + 1)
+
+
+@receiver(post_delete, sender=Lesson)
+def count_deleted_lesson(sender, instance, origin=None, **kwargs):
+    """Keep Course.lessons_count in step as lessons are deleted"""
+    if isinstance(origin, Course) and origin.pk == instance.course_id:
+        return
+    Course.objects.filter(pk=instance.course_id, lessons_count__gt=0).update(
+        lessons_count=F('lessons_count') - 1
+    )
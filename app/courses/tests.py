@@ -1,11 +1,24 @@
-from django.test import TestCase
+import os
+import tempfile
+import threading
+import time
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection
+from django.test.utils import CaptureQueriesContext
+from django.test import TestCase, TransactionTestCase
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import RefreshToken
 from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.test import override_settings
+from unittest.mock import patch
 from .models import Category, Course, Lesson, Enrollment, LessonProgress
+from .utils import EnrollmentError, enroll_student
+from .watch_time import watch_time_buffer
 
 User = get_user_model()
 
@@ -228,3 +241,623 @@ class LessonProgressTest(TestCase):
 
         # Since there's only one lesson, progress should be 100%
         # Note: This would need to be implemented in the actual progress calculation logic
+
+
+class MarkLessonCompleteAPITest(APITestCase):
+    """Test incremental progress tracking when completing lessons"""
+
+    def setUp(self):
+        self.instructor = User.objects.create_user(
+            username='instructor',
+            email='instructor@example.com',
+            password='testpass123',
+            user_type='instructor'
+        )
+
+        self.student = User.objects.create_user(
+            username='student',
+            email='student@example.com',
+            password='testpass123',
+            user_type='student'
+        )
+
+        self.course = Course.objects.create(
+            title='Python Basics',
+            description='Learn Python programming',
+            instructor=self.instructor,
+            price=Decimal('0.00'),
+            is_free=True,
+            difficulty_level='beginner',
+            duration_hours=10,
+            is_published=True
+        )
+
+        self.lessons = [
+            Lesson.objects.create(course=self.course, title=f'Lesson {i}', order=i)
+            for i in range(1, 5)
+        ]
+
+        self.enrollment = Enrollment.objects.create(
+            student=self.student,
+            course=self.course,
+            is_active=True
+        )
+
+        refresh = RefreshToken.for_user(self.student)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+    def complete_url(self, lesson):
+        return reverse('courses:mark_lesson_complete', kwargs={
+            'course_id': self.course.pk,
+            'lesson_id': lesson.pk
+        })
+
+    def test_completion_updates_counter_and_percentage(self):
+        """Test completing a lesson bumps the stored counter"""
+        response = self.client.post(self.complete_url(self.lessons[0]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['progress_percentage'], 25)
+
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.completed_lessons_count, 1)
+        self.assertEqual(self.enrollment.progress_percentage, 25)
+
+    def test_repeat_completion_is_idempotent(self):
+        """Test completing the same lesson twice counts it once"""
+        self.client.post(self.complete_url(self.lessons[0]))
+        response = self.client.post(self.complete_url(self.lessons[0]))
+        self.assertEqual(response.data['progress_percentage'], 25)
+
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.completed_lessons_count, 1)
+
+    def test_completing_all_lessons_completes_course(self):
+        """Test completing every lesson marks the enrollment complete"""
+        for lesson in self.lessons:
+            response = self.client.post(self.complete_url(lesson))
+
+        self.assertEqual(response.data['progress_percentage'], 100)
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.completed_lessons_count, 4)
+        self.assertIsNotNone(self.enrollment.completed_at)
+
+    def test_recalculate_progress_command(self):
+        """Test recalculating progress after lessons change"""
+        for lesson in self.lessons[:2]:
+            self.client.post(self.complete_url(lesson))
+
+        self.lessons[3].delete()
+        self.lessons[2].delete()
+        call_command('recalculate_progress', course_ids=[self.course.pk], stdout=StringIO())
+
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.completed_lessons_count, 2)
+        self.assertEqual(self.enrollment.progress_percentage, 100)
+        self.assertIsNotNone(self.enrollment.completed_at)
+        # Reaching 100% through recalculation issues the certificate like a completion does
+        self.assertTrue(Enrollment.objects.filter(pk=self.enrollment.pk, certificate__isnull=False).exists())
+
+        Lesson.objects.create(course=self.course, title='Bonus', order=5)
+        call_command('recalculate_progress', course_ids=[self.course.pk], stdout=StringIO())
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.progress_percentage, 66)
+        self.assertIsNone(self.enrollment.completed_at)
+
+    def test_lessons_count_follows_lessons(self):
+        """Test Course.lessons_count is kept in step and completions don't recount lessons"""
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.lessons_count, 4)
+        self.lessons[3].delete()
+        # A full save of the stale instance leaves the counter alone
+        self.course.title = 'Renamed'
+        self.course.save()
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.lessons_count, 3)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.complete_url(self.lessons[0]))
+        self.assertEqual(response.data['progress_percentage'], 33)
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if 'COUNT(' in query['sql'] and '"courses_lesson"' in query['sql']
+        ])
+
+
+@override_settings(WATCH_TIME_FLUSH_INTERVAL=0)
+class WatchHeartbeatAPITest(APITestCase):
+    """Test batched watch-time heartbeat ingestion"""
+
+    def setUp(self):
+        self.instructor = User.objects.create_user(
+            username='instructor',
+            email='instructor@example.com',
+            password='testpass123',
+            user_type='instructor'
+        )
+
+        self.student = User.objects.create_user(
+            username='student',
+            email='student@example.com',
+            password='testpass123',
+            user_type='student'
+        )
+
+        self.course = Course.objects.create(
+            title='Python Basics',
+            description='Learn Python programming',
+            instructor=self.instructor,
+            price=Decimal('0.00'),
+            is_free=True,
+            difficulty_level='beginner',
+            duration_hours=10,
+            is_published=True
+        )
+
+        self.other_course = Course.objects.create(
+            title='Advanced Python',
+            description='Learn more Python',
+            instructor=self.instructor,
+            price=Decimal('0.00'),
+            is_free=True,
+            difficulty_level='advanced',
+            duration_hours=10,
+            is_published=True
+        )
+
+        self.lesson = Lesson.objects.create(course=self.course, title='Intro', order=1)
+        self.other_lesson = Lesson.objects.create(course=self.other_course, title='Intro', order=1)
+
+        self.enrollment = Enrollment.objects.create(
+            student=self.student,
+            course=self.course,
+            is_active=True
+        )
+
+        self.url = reverse('courses:watch_heartbeats')
+        refresh = RefreshToken.for_user(self.student)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        watch_time_buffer.clear()
+
+    def tearDown(self):
+        watch_time_buffer.clear()
+
+    def test_heartbeats_are_coalesced_until_flush(self):
+        """Test heartbeats are buffered and written in one flush"""
+        events = [{'lesson': self.lesson.pk, 'seconds': 5}] * 3
+        response = self.client.post(self.url, {'events': events}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['accepted'], 3)
+
+        self.client.post(self.url, {'events': events}, format='json')
+        self.assertFalse(LessonProgress.objects.filter(enrollment=self.enrollment).exists())
+
+        self.assertEqual(watch_time_buffer.flush(), 1)
+        progress = LessonProgress.objects.get(enrollment=self.enrollment, lesson=self.lesson)
+        self.assertEqual(progress.watch_time_seconds, 30)
+        self.assertFalse(progress.is_completed)
+
+    def test_flush_adds_to_existing_progress(self):
+        """Test flushed watch time increments existing rows"""
+        LessonProgress.objects.create(
+            enrollment=self.enrollment,
+            lesson=self.lesson,
+            is_completed=True,
+            watch_time_seconds=100
+        )
+
+        self.client.post(self.url, {'events': [{'lesson': self.lesson.pk, 'seconds': 10}]}, format='json')
+        watch_time_buffer.flush()
+
+        progress = LessonProgress.objects.get(enrollment=self.enrollment, lesson=self.lesson)
+        self.assertEqual(progress.watch_time_seconds, 110)
+        self.assertTrue(progress.is_completed)
+
+    def test_heartbeats_for_unenrolled_lessons_are_rejected(self):
+        """Test heartbeats for lessons outside the student's enrollments are dropped"""
+        events = [
+            {'lesson': self.lesson.pk, 'seconds': 5},
+            {'lesson': self.other_lesson.pk, 'seconds': 5},
+            {'lesson': 999999, 'seconds': 5},
+        ]
+        response = self.client.post(self.url, {'events': events}, format='json')
+
+        self.assertEqual(response.data['accepted'], 1)
+        self.assertEqual(response.data['rejected'], 2)
+        watch_time_buffer.flush()
+        self.assertEqual(LessonProgress.objects.count(), 1)
+
+    @override_settings(WATCH_TIME_FLUSH_INTERVAL=30)
+    def test_timer_flushes_and_retries_after_errors(self):
+        """Test a timer, not the request, flushes heartbeats and retries a failed write"""
+        events = [{'lesson': self.lesson.pk, 'seconds': 5}]
+        with patch('courses.watch_time.threading.Timer') as timer:
+            response = self.client.post(self.url, {'events': events}, format='json')
+            self.client.post(self.url, {'events': events}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertFalse(LessonProgress.objects.exists())
+        timer.assert_called_once_with(30, watch_time_buffer._flush_from_timer)
+
+        with patch('courses.watch_time.threading.Timer') as timer, \
+                patch('courses.watch_time.connection'), \
+                patch.object(watch_time_buffer, '_write', side_effect=OperationalError('locked')), \
+                self.assertLogs('courses.watch_time', 'ERROR'):
+            watch_time_buffer._flush_from_timer()
+        timer.assert_called_once_with(30, watch_time_buffer._flush_from_timer)
+
+        with patch('courses.watch_time.connection'):
+            watch_time_buffer._flush_from_timer()
+        progress = LessonProgress.objects.get(enrollment=self.enrollment, lesson=self.lesson)
+        self.assertEqual(progress.watch_time_seconds, 10)
+
+    def test_heartbeat_seconds_are_bounded(self):
+        """Test oversized heartbeat deltas are rejected"""
+        events = [{'lesson': self.lesson.pk, 'seconds': 10000}]
+        response = self.client.post(self.url, {'events': events}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class EnrollmentCapacityTest(APITestCase):
+    """Test atomic seat reservation on enrollment"""
+
+    def setUp(self):
+        self.instructor = User.objects.create_user(
+            username='instructor',
+            email='instructor@example.com',
+            password='testpass123',
+            user_type='instructor'
+        )
+
+        self.course = Course.objects.create(
+            title='Python Basics',
+            description='Learn Python programming',
+            instructor=self.instructor,
+            price=Decimal('0.00'),
+            is_free=True,
+            difficulty_level='beginner',
+            duration_hours=10,
+            is_published=True,
+            max_students=1
+        )
+
+        self.enroll_url = reverse('courses:enroll_course', kwargs={'course_id': self.course.pk})
+
+    def enroll(self, username):
+        student = User.objects.create_user(
+            username=username,
+            email=f'{username}@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(student)
+        return self.client.post(self.enroll_url)
+
+    def test_full_course_rejects_enrollment(self):
+        """Test enrollment beyond max_students is rejected"""
+        self.assertEqual(self.enroll('first').status_code, status.HTTP_201_CREATED)
+
+        response = self.enroll('second')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Course is full', response.data['error'])
+
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.enrolled_count, 1)
+        self.assertEqual(self.course.enrollments.count(), 1)
+
+    def test_duplicate_enrollment_does_not_take_a_seat(self):
+        """Test a duplicate enrollment leaves the seat counter unchanged"""
+        self.course.max_students = None
+        self.course.save()
+
+        self.enroll('first')
+        response = self.client.post(self.enroll_url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.enrolled_count, 1)
+
+    def test_course_save_does_not_overwrite_seat_counter(self):
+        """Test saving a stale course instance keeps the stored counter"""
+        stale = Course.objects.get(pk=self.course.pk)
+        self.enroll('first')
+
+        stale.title = 'Renamed'
+        stale.save()
+
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.title, 'Renamed')
+        self.assertEqual(self.course.enrolled_count, 1)
+
+    def test_deleting_enrollment_releases_seat(self):
+        """Test a deleted enrollment frees its seat for the next student"""
+        self.enroll('first')
+        Enrollment.objects.get(course=self.course).delete()
+
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.enrolled_count, 0)
+        self.assertEqual(self.enroll('second').status_code, status.HTTP_201_CREATED)
+
+    def test_deactivating_enrollment_releases_seat(self):
+        """Test deactivating an enrollment frees its seat and reactivating takes it back"""
+        self.enroll('first')
+        enrollment = Enrollment.objects.get(course=self.course)
+        enrollment.is_active = False
+        enrollment.save()
+
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.enrolled_count, 0)
+
+        # Saving again without a change doesn't release a second seat
+        enrollment.save()
+        enrollment.is_active = True
+        enrollment.save(update_fields=['is_active'])
+
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.enrolled_count, 1)
+
+    def test_reactivating_into_full_course_is_refused(self):
+        """Test reactivation takes a seat through reserve_seats and fails when the course is full"""
+        self.enroll('first')
+        enrollment = Enrollment.objects.get(course=self.course)
+        enrollment.is_active = False
+        enrollment.save()
+        self.enroll('second')
+
+        enrollment.is_active = True
+        with self.assertRaises(EnrollmentError):
+            enrollment.save()
+
+        self.assertFalse(Enrollment.objects.get(pk=enrollment.pk).is_active)
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.enrolled_count, 1)
+
+    def test_saving_loaded_enrollment_skips_activity_lookup(self):
+        """Test a full save of a loaded enrollment doesn't re-read is_active"""
+        self.enroll('first')
+        enrollment = Enrollment.objects.get(course=self.course)
+        enrollment.progress_percentage = 10
+        # Just the UPDATE
+        with self.assertNumQueries(1):
+            enrollment.save()
+
+    def test_sync_enrolled_counts_command(self):
+        """Test rebuilding seat counters from enrollments"""
+        student = User.objects.create_user(username='direct', password='testpass123')
+        Enrollment.objects.create(student=student, course=self.course)
+
+        call_command('sync_enrolled_counts', stdout=StringIO())
+
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.enrolled_count, 1)
+
+
+class ConcurrentEnrollmentTest(TransactionTestCase):
+    """Stress test that concurrent enrollments never overbook a course"""
+
+    workers = 24
+    capacity = 5
+
+    def setUp(self):
+        instructor = User.objects.create_user(
+            username='instructor',
+            password='testpass123',
+            user_type='instructor'
+        )
+        self.course = Course.objects.create(
+            title='Launch Day',
+            description='Very popular course',
+            instructor=instructor,
+            price=Decimal('0.00'),
+            is_free=True,
+            duration_hours=1,
+            is_published=True,
+            max_students=self.capacity
+        )
+        self.students = [
+            User.objects.create_user(username=f'student{i}')
+            for i in range(self.workers)
+        ]
+
+    def test_no_overbooking_under_concurrency(self):
+        """Test racing workers fill the course exactly to capacity"""
+        barrier = threading.Barrier(self.workers)
+        outcomes = []
+        lock = threading.Lock()
+
+        def worker(student):
+            barrier.wait()
+            try:
+                while True:
+                    try:
+                        enroll_student(self.course, student)
+                        outcome = 'enrolled'
+                    except EnrollmentError:
+                        outcome = 'rejected'
+                    except OperationalError:
+                        # SQLite reports lock contention instead of blocking
+                        time.sleep(0.005)
+                        continue
+                    break
+                with lock:
+                    outcomes.append(outcome)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(student,)) for student in self.students]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.course.refresh_from_db()
+        self.assertEqual(outcomes.count('enrolled'), self.capacity)
+        self.assertEqual(outcomes.count('rejected'), self.workers - self.capacity)
+        self.assertEqual(self.course.enrolled_count, self.capacity)
+        self.assertEqual(self.course.enrollments.count(), self.capacity)
+
+
+class BulkEnrollmentTest(APITestCase):
+    """Test bulk enrollment API and import command"""
+
+    def setUp(self):
+        self.instructor = User.objects.create_user(
+            username='instructor',
+            email='instructor@example.com',
+            password='testpass123',
+            user_type='instructor'
+        )
+
+        self.course = Course.objects.create(
+            title='Python Basics',
+            description='Learn Python programming',
+            instructor=self.instructor,
+            price=Decimal('0.00'),
+            is_free=True,
+            difficulty_level='beginner',
+            duration_hours=10,
+            is_published=True,
+            max_students=3
+        )
+
+        self.students = [
+            User.objects.create_user(username=f'student{i}', email=f'student{i}@example.com')
+            for i in range(5)
+        ]
+
+        self.url = reverse('courses:bulk_enroll_course', kwargs={'course_id': self.course.pk})
+
+    def statuses(self, response):
+        return [result['status'] for result in response.data['results']]
+
+    def test_bulk_enroll_json(self):
+        """Test per-row results for a JSON student list"""
+        self.client.force_authenticate(self.instructor)
+        response = self.client.post(self.url, {
+            'students': ['student0', 'student1@example.com', 'student0', 'missing', '']
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self.statuses(response),
+            ['enrolled', 'enrolled', 'duplicate', 'not_found', 'invalid']
+        )
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.enrolled_count, 2)
+        self.assertEqual(self.course.enrollments.count(), 2)
+
+    def test_bulk_enroll_respects_capacity(self):
+        """Test rows beyond max_students are reported as course_full"""
+        Enrollment.objects.create(student=self.students[0], course=self.course)
+        call_command('sync_enrolled_counts', stdout=StringIO())
+
+        self.client.force_authenticate(self.instructor)
+        response = self.client.post(self.url, {
+            'students': [student.username for student in self.students]
+        }, format='json')
+
+        self.assertEqual(
+            self.statuses(response),
+            ['already_enrolled', 'enrolled', 'enrolled', 'course_full', 'course_full']
+        )
+        self.assertEqual(response.data['summary']['course_full'], 2)
+        self.assertEqual(self.course.enrollments.count(), 3)
+
+    def test_bulk_enroll_concurrent_duplicate_releases_seat(self):
+        """Test a student enrolled concurrently is reported and their seat released"""
+        from courses import bulk_enrollment
+
+        insert = bulk_enrollment._insert_enrollments
+
+        def racing_insert(course, student_ids, amount_paid):
+            # Another request enrolls student0 between the check and the insert
+            Enrollment.objects.create(student=self.students[0], course=course)
+            return insert(course, student_ids, amount_paid)
+
+        self.client.force_authenticate(self.instructor)
+        with patch.object(bulk_enrollment, '_insert_enrollments', racing_insert):
+            response = self.client.post(self.url, {
+                'students': ['student0', 'student1']
+            }, format='json')
+
+        self.assertEqual(self.statuses(response), ['already_enrolled', 'enrolled'])
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.enrolled_count, 1)
+        self.assertEqual(self.course.enrollments.count(), 2)
+
+    def test_insert_throughput(self):
+        """Test 20k enrollment rows insert at tens of thousands of rows per second"""
+        from courses import bulk_enrollment
+
+        users = User.objects.bulk_create(
+            [User(username=f'bulk{i}', email=f'bulk{i}@example.com') for i in range(20000)],
+            batch_size=2000
+        )
+        student_ids = list(User.objects.filter(username__startswith='bulk').values_list('id', flat=True))
+        self.assertEqual(len(student_ids), len(users))
+
+        started = time.perf_counter()
+        inserted = bulk_enrollment._insert_enrollments(self.course, student_ids, 0)
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(inserted, set(student_ids))
+        # About 0.2s (100k+ rows/s) on SQLite; bulk_create managed roughly 5k rows/s
+        self.assertLess(elapsed, 2.0)
+
+    def test_bulk_enroll_rejects_null_rows(self):
+        """Test null rows are invalid rather than looked up as 'None'"""
+        User.objects.create_user(username='None', email='none@example.com')
+        self.client.force_authenticate(self.instructor)
+        response = self.client.post(self.url, {
+            'students': [None, {'username': None}, 'student0']
+        }, format='json')
+
+        self.assertEqual(self.statuses(response), ['invalid', 'invalid', 'enrolled'])
+
+    def test_bulk_enroll_rejects_non_list_json(self):
+        """Test JSON bodies and files that aren't student lists are a 400"""
+        self.client.force_authenticate(self.instructor)
+        response = self.client.post(self.url, ['student0'], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        for content in (b'5', b'{"students": "student0"}'):
+            upload = SimpleUploadedFile('students.json', content, content_type='application/json')
+            response = self.client.post(self.url, {'file': upload}, format='multipart')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('error', response.data)
+        self.assertEqual(self.course.enrollments.count(), 0)
+
+    def test_bulk_enroll_csv_upload(self):
+        """Test CSV uploads with an email header"""
+        upload = SimpleUploadedFile(
+            'students.csv',
+            b'name,email\nA,student2@example.com\nB,student3@example.com\n',
+            content_type='text/csv'
+        )
+        self.client.force_authenticate(self.instructor)
+        response = self.client.post(self.url, {'file': upload}, format='multipart')
+
+        self.assertEqual(self.statuses(response), ['enrolled', 'enrolled'])
+
+    def test_bulk_enroll_requires_course_instructor(self):
+        """Test other users cannot bulk enroll"""
+        self.client.force_authenticate(self.students[0])
+        response = self.client.post(self.url, {'students': ['student1']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_bulk_enroll_command(self):
+        """Test the CSV import management command"""
+        self.course.max_students = None
+        self.course.save()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'students.csv')
+            report_path = os.path.join(directory, 'report.csv')
+            with open(path, 'w') as f:
+                f.write('username\n' + '\n'.join(s.username for s in self.students))
+
+            out = StringIO()
+            call_command('bulk_enroll', self.course.pk, path, report=report_path, stdout=out)
+
+            with open(report_path) as f:
+                self.assertEqual(f.read().count('enrolled'), 5)
+
+        self.assertIn('enrolled: 5', out.getvalue())
+        self.assertEqual(self.course.enrollments.count(), 5)
@@ -16,6 +16,7 @@ urlpatterns = [
     path('<int:course_id>/lessons/', views.CourseLessonListView.as_view(), name='course_lessons'),
     path('<int:course_id>/lessons/<int:pk>/', views.LessonDetailView.as_view(), name='lesson_detail'),
     path('<int:course_id>/lessons/<int:lesson_id>/complete/', views.mark_lesson_complete, name='mark_lesson_complete'),
+    path('heartbeats/', views.record_watch_heartbeats, name='watch_heartbeats'),
     
     # Course reviews
     path('<int:course_id>/reviews/', views.CourseReviewListView.as_view(), name='course_reviews'),
@@ -23,6 +24,7 @@ urlpatterns = [
     # Instructor endpoints
     path('instructor/courses/', views.InstructorCourseListView.as_view(), name='instructor_courses'),
     path('instructor/courses/<int:pk>/', views.InstructorCourseDetailView.as_view(), name='instructor_course_detail'),
+    path('instructor/courses/<int:course_id>/enrollments/bulk/', views.bulk_enroll_in_course, name='bulk_enroll_course'),
     
     # Student enrollments and progress
     path('enrollments/', views.StudentEnrollmentListView.as_view(), name='student_enrollments'),
@@ -0,0 +1,244 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+class EnrollmentError(Exception):
+    """Raised when a student cannot be enrolled in a course"""
+
+
+def reserve_seats(course_id, seats=1):
+    """
+    Atomically take seats in a course.
+
+    A single conditional UPDATE bumps enrolled_count only while it stays
+    within max_students, so concurrent enrollments can never overbook.
+    Returns True if the seats were reserved.
+    """
+    from .models import Course
+
+    return Course.objects.filter(pk=course_id).filter(
+        Q(max_students__isnull=True)
+        | Q(enrolled_count__lte=F('max_students') - seats)
+    ).update(enrolled_count=F('enrolled_count') + seats) == 1
+
+
+def reserve_available_seats(course_id, requested):
+    """
+    Reserve as many of the requested seats as the course can still take.
+
+    Retries the conditional UPDATE if another enrollment races in between
+    reading the counter and reserving. Returns the number of seats granted.
+    """
+    from .models import Course
+
+    while requested > 0:
+        course = Course.objects.filter(pk=course_id).values(
+            'max_students', 'enrolled_count'
+        ).first()
+        if course is None:
+            return 0
+
+        if course['max_students'] is None:
+            granted = requested
+        else:
+            granted = min(requested, course['max_students'] - course['enrolled_count'])
+
+        if granted <= 0:
+            return 0
+        if reserve_seats(course_id, granted):
+            return granted
+
+    return 0
+
+
+def release_seats(course_id, seats=1):
+    """Give back seats previously taken with reserve_seats"""
+    from .models import Course
+
+    Course.objects.filter(pk=course_id, enrolled_count__gte=seats).update(
+        enrolled_count=F('enrolled_count') - seats
+    )
+
+
+def enroll_student(course, student):
+    """
+    Enroll a student in a course, enforcing capacity without a pre-check.
+
+    Duplicates are caught by the (student, course) unique constraint and
+    capacity by reserve_seats; both happen inside one transaction so a
+    failed reservation also rolls back the enrollment row.
+    """
+    from .models import Enrollment
+
+    try:
+        with transaction.atomic():
+            enrollment = Enrollment.objects.create(
+                student=student,
+                course=course,
+                amount_paid=0 if course.is_free else course.price
+            )
+            if not reserve_seats(course.pk):
+                raise EnrollmentError('Course is full')
+    except IntegrityError:
+        raise EnrollmentError('Already enrolled in this course')
+
+    return enrollment
+
+
+def calculate_progress_percentage(completed_lessons, total_lessons):
+    """Convert a completed/total lesson pair into a whole percentage"""
+    if total_lessons <= 0:
+        return 0
+    return min(int((completed_lessons / total_lessons) * 100), 100)
+
+
+def record_lesson_completion(enrollment, lesson):
+    """
+    Mark a lesson as completed for an enrollment and update progress incrementally.
+
+    The completed-lesson counter is bumped with an F-expression only when the
+    lesson transitions to completed, so repeated completions are no-ops.
+    The course's lesson total comes from the denormalized
+    Course.lessons_count, read back with the new counter in one query.
+    Returns a tuple of (enrollment, newly_completed).
+    """
+    from .models import Enrollment, LessonProgress
+
+    now = timezone.now()
+
+    with transaction.atomic():
+        lesson_progress, created = LessonProgress.objects.get_or_create(
+            enrollment=enrollment,
+            lesson=lesson,
+            defaults={
+                'is_completed': True,
+                'completed_at': now
+            }
+        )
+
+        if created:
+            newly_completed = True
+        else:
+            # Conditional update keeps concurrent duplicate requests idempotent
+            newly_completed = LessonProgress.objects.filter(
+                pk=lesson_progress.pk,
+                is_completed=False
+            ).update(is_completed=True, completed_at=now) == 1
+
+        if not newly_completed:
+            return enrollment, False
+
+        Enrollment.objects.filter(pk=enrollment.pk).update(
+            completed_lessons_count=F('completed_lessons_count') + 1
+        )
+        enrollment.completed_lessons_count, lessons_count = Enrollment.objects.filter(
+            pk=enrollment.pk
+        ).values_list('completed_lessons_count', 'course__lessons_count').get()
+
+        progress_percentage = calculate_progress_percentage(
+            enrollment.completed_lessons_count,
+            lessons_count
+        )
+
+        update_fields = []
+        if progress_percentage != enrollment.progress_percentage:
+            enrollment.progress_percentage = progress_percentage
+            update_fields.append('progress_percentage')
+
+        if progress_percentage == 100 and not enrollment.completed_at:
+            enrollment.completed_at = now
+            update_fields.append('completed_at')
+
+        if update_fields:
+            enrollment.save(update_fields=update_fields)
+
+    return enrollment, True
+
+
+def recalculate_enrollment_progress(enrollments):
+    """
+    Recompute stored progress for a queryset of enrollments.
+
+    Used after lessons are added to or removed from a course. The courses'
+    lessons_count is rebuilt first, then completed-lesson counters from
+    LessonProgress rows with a subquery, and written back with bulk_update.
+    Enrollments that drop below 100% lose their completed_at. The few that
+    newly reach 100% are saved one by one instead, so the post_save hook
+    issues their certificates. Returns the number of enrollments that
+    changed.
+    """
+    from .models import Course, Enrollment, Lesson, LessonProgress
+
+    completed_subquery = LessonProgress.objects.filter(
+        enrollment=OuterRef('pk'),
+        is_completed=True
+    ).order_by().values('enrollment').annotate(
+        total=Count('pk')
+    ).values('total')
+
+    lessons_subquery = Lesson.objects.filter(
+        course=OuterRef('pk')
+    ).order_by().values('course').annotate(
+        total=Count('pk')
+    ).values('total')
+    Course.objects.filter(pk__in=enrollments.values('course_id')).update(
+        lessons_count=Coalesce(Subquery(lessons_subquery, output_field=IntegerField()), Value(0))
+    )
+
+    enrollments = enrollments.annotate(
+        actual_completed=Coalesce(
+            Subquery(completed_subquery, output_field=IntegerField()), Value(0)
+        ),
+        actual_total=F('course__lessons_count')
+    ).only(
+        'pk', 'student_id', 'course_id', 'completed_lessons_count', 'progress_percentage', 'completed_at'
+    )
+
+    now = timezone.now()
+    changed = []
+    completed = []
+
+    for enrollment in enrollments.iterator(chunk_size=2000):
+        progress_percentage = calculate_progress_percentage(
+            enrollment.actual_completed,
+            enrollment.actual_total
+        )
+        completed_at = enrollment.completed_at
+        if progress_percentage < 100:
+            completed_at = None
+        elif not completed_at:
+            completed_at = now
+
+        if (
+            enrollment.completed_lessons_count != enrollment.actual_completed
+            or enrollment.progress_percentage != progress_percentage
+            or enrollment.completed_at != completed_at
+        ):
+            newly_completed = completed_at is not None and enrollment.completed_at is None
+            enrollment.completed_lessons_count = enrollment.actual_completed
+            enrollment.progress_percentage = progress_percentage
+            enrollment.completed_at = completed_at
+            (completed if newly_completed else changed).append(enrollment)
+
+    fields = ['completed_lessons_count', 'progress_percentage', 'completed_at']
+    Enrollment.objects.bulk_update(changed, fields, batch_size=500)
+    for enrollment in completed:
+        enrollment.save(update_fields=fields)
+
+    return len(changed) + len(completed)
+
+
+def sync_enrolled_counts(courses):
+    """Rebuild Course.enrolled_count from active enrollments, returning rows updated"""
+    from .models import Enrollment
+
+    active = Enrollment.objects.filter(
+        course=OuterRef('pk'),
+        is_active=True
+    ).order_by().values('course').annotate(total=Count('pk')).values('total')
+
+    return courses.update(
+        enrolled_count=Coalesce(Subquery(active, output_field=IntegerField()), Value(0))
+    )
@@ -1,17 +1,23 @@
+import io
 from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.shortcuts import get_object_or_404
-from django.utils import timezone
 from .models import Category, Course, Lesson, Enrollment, LessonProgress, CourseReview
 from django.db import models
 from .serializers import (
     CategorySerializer, CourseListSerializer, CourseDetailSerializer,
     CourseCreateUpdateSerializer, LessonSerializer, LessonCreateUpdateSerializer,
     EnrollmentSerializer, LessonProgressSerializer, CourseReviewSerializer,
-    CourseReviewCreateSerializer
+    CourseReviewCreateSerializer, WatchHeartbeatBatchSerializer
 )
+from .bulk_enrollment import (
+    MAX_BULK_ENROLLMENT_ROWS, bulk_enroll_students, normalize_identifier,
+    read_student_identifiers, summarize_results
+)
+from .utils import EnrollmentError, enroll_student, record_lesson_completion
+from .watch_time import watch_time_buffer
 
 
 class CategoryListView(generics.ListCreateAPIView):
@@ -142,33 +148,68 @@ def enroll_in_course(request, course_id):
     """Enroll student in a course"""
     course = get_object_or_404(Course, id=course_id, is_published=True)
 
-    # Check if already enrolled
-    if Enrollment.objects.filter(student=request.user, course=course).exists():
+    try:
+        enrollment = enroll_student(course, request.user)
+    except EnrollmentError as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    return Response(
+        {
+            'message': 'Successfully enrolled in course',
+            'enrollment': EnrollmentSerializer(enrollment).data
+        },
+        status=status.HTTP_201_CREATED
+    )
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_enroll_in_course(request, course_id):
+    """Enroll a list of students (CSV upload or JSON) in a course"""
+    if request.user.user_type == 'admin':
+        course = get_object_or_404(Course, id=course_id)
+    else:
+        course = get_object_or_404(Course, id=course_id, instructor=request.user)
+
+    upload = request.FILES.get('file')
+    try:
+        if upload is not None:
+            file_format = 'json' if upload.name.lower().endswith('.json') else 'csv'
+            identifiers = read_student_identifiers(
+                io.TextIOWrapper(upload, encoding='utf-8-sig'),
+                file_format
+            )
+        else:
+            students = request.data.get('students') if isinstance(request.data, dict) else None
+            if not isinstance(students, list):
+                return Response(
+                    {'error': 'Provide a CSV/JSON file or a "students" list'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            identifiers = [normalize_identifier(item) for item in students]
+    except (ValueError, UnicodeDecodeError) as e:
         return Response(
-            {'error': 'Already enrolled in this course'},
+            {'error': f'Could not parse student list: {str(e)}'},
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    # Check if course has max students limit
-    if course.max_students and course.student_count >= course.max_students:
+    if len(identifiers) > MAX_BULK_ENROLLMENT_ROWS:
         return Response(
-            {'error': 'Course is full'},
+            {'error': f'At most {MAX_BULK_ENROLLMENT_ROWS} students per request'},
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    # Create enrollment
-    enrollment = Enrollment.objects.create(
-        student=request.user,
-        course=course,
-        amount_paid=0 if course.is_free else course.price
-    )
+    results = bulk_enroll_students(course, identifiers)
 
     return Response(
         {
-            'message': 'Successfully enrolled in course',
-            'enrollment': EnrollmentSerializer(enrollment).data
+            'summary': summarize_results(results),
+            'results': results
         },
-        status=status.HTTP_201_CREATED
+        status=status.HTTP_200_OK
     )
 
 
@@ -188,51 +229,60 @@ class StudentEnrollmentListView(generics.ListAPIView):
 @permission_classes([IsAuthenticated])
 def mark_lesson_complete(request, course_id, lesson_id):
     """Mark a lesson as completed"""
-    course = get_object_or_404(Course, id=course_id)
-    lesson = get_object_or_404(Lesson, id=lesson_id, course=course)
+    lesson = get_object_or_404(Lesson, id=lesson_id, course_id=course_id)
     enrollment = get_object_or_404(
         Enrollment,
         student=request.user,
-        course=course,
+        course_id=course_id,
         is_active=True
     )
 
-    # Create or update lesson progress
-    lesson_progress, created = LessonProgress.objects.get_or_create(
-        enrollment=enrollment,
-        lesson=lesson,
-        defaults={
-            'is_completed': True,
-            'completed_at': timezone.now()
-        }
-    )
-
-    if not created and not lesson_progress.is_completed:
-        lesson_progress.is_completed = True
-        lesson_progress.completed_at = timezone.now()
-        lesson_progress.save()
+    enrollment, _ = record_lesson_completion(enrollment, lesson)
 
-    # Update overall course progress
-    total_lessons = course.lessons.count()
-    completed_lessons = LessonProgress.objects.filter(
-        enrollment=enrollment,
-        is_completed=True
-    ).count()
+    return Response(
+        {
+            'message': 'Lesson marked as completed',
+            'progress_percentage': enrollment.progress_percentage
+        },
+        status=status.HTTP_200_OK
+    )
 
-    progress_percentage = (completed_lessons / total_lessons) * 100 if total_lessons > 0 else 0
-    enrollment.progress_percentage = int(progress_percentage)
 
-    if progress_percentage == 100:
-        enrollment.completed_at = timezone.now()
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def record_watch_heartbeats(request):
+    """Ingest a batch of lesson watch-time heartbeats"""
+    serializer = WatchHeartbeatBatchSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    events = serializer.validated_data['events']
+
+    lesson_courses = dict(
+        Lesson.objects.filter(
+            id__in={event['lesson'] for event in events}
+        ).values_list('id', 'course_id')
+    )
+    course_enrollments = dict(
+        Enrollment.objects.filter(
+            student=request.user,
+            is_active=True,
+            course_id__in=set(lesson_courses.values())
+        ).values_list('course_id', 'id')
+    )
 
-    enrollment.save()
+    accepted = 0
+    for event in events:
+        enrollment_id = course_enrollments.get(lesson_courses.get(event['lesson']))
+        if enrollment_id is None:
+            continue
+        watch_time_buffer.add(enrollment_id, event['lesson'], event['seconds'])
+        accepted += 1
 
     return Response(
         {
-            'message': 'Lesson marked as completed',
-            'progress_percentage': enrollment.progress_percentage
+            'accepted': accepted,
+            'rejected': len(events) - accepted
         },
-        status=status.HTTP_200_OK
+        status=status.HTTP_202_ACCEPTED
     )
 
 
@@ -369,7 +419,9 @@ class InstructorCourseAnalyticsView(generics.RetrieveAPIView):
                 'total_attempts': attempts.count(),
                 'passed_attempts': passed_attempts.count(),
                 'pass_rate': (passed_attempts.count() / attempts.count() * 100) if attempts.count() > 0 else 0,
-                'average_score': attempts.aggregate(avg_score=models.Avg('score'))['avg_score'] or 0
+                'average_score': attempts.aggregate(avg_score=models.Avg('score'))['avg_score'] or 0,
+                'students_attempted': quiz.best_scores.filter(completed_attempts__gt=0).count(),
+                'students_passed': quiz.best_scores.filter(passed=True).count()
             })
 
         return Response({
@@ -0,0 +1,136 @@
+import atexit
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+
+class WatchTimeBuffer:
+    """
+    In-process write-behind buffer for lesson watch-time heartbeats.
+
+    Heartbeats are coalesced per (enrollment_id, lesson_id) and written to
+    LessonProgress in bulk by a timer thread, flush interval seconds after
+    the first heartbeat buffered since the last flush, so requests never
+    wait on the write and quiet periods still get flushed. Anything still
+    buffered when a worker dies is lost, which is acceptable for watch time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = defaultdict(int)
+        self._timer = None
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'WATCH_TIME_FLUSH_INTERVAL', 30)
+
+    def add(self, enrollment_id, lesson_id, seconds):
+        """Buffer watched seconds for an enrollment/lesson pair"""
+        with self._lock:
+            self._pending[(enrollment_id, lesson_id)] += seconds
+            self._schedule()
+
+    def _schedule(self):
+        # Called with the lock held; one timer at a time while anything is pending
+        if self._timer is not None or not self.flush_interval:
+            return
+        self._timer = threading.Timer(self.flush_interval, self._flush_from_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _flush_from_timer(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        except Exception:
+            # The deltas were put back; schedule another attempt
+            logger.exception("Failed to flush buffered watch time")
+            with self._lock:
+                self._schedule()
+        finally:
+            connection.close()
+
+    def flush(self):
+        """Write all buffered watch time to the database, returning rows touched"""
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(int)
+
+        if not pending:
+            return 0
+
+        try:
+            self._write(pending)
+        except Exception:
+            # Put the deltas back so the next flush can retry them
+            with self._lock:
+                for key, seconds in pending.items():
+                    self._pending[key] += seconds
+            raise
+
+        return len(pending)
+
+    def clear(self):
+        """Drop everything buffered without writing it"""
+        with self._lock:
+            self._pending = defaultdict(int)
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _write(self, pending):
+        from .models import LessonProgress
+
+        enrollment_ids = {enrollment_id for enrollment_id, _ in pending}
+        lesson_ids = {lesson_id for _, lesson_id in pending}
+
+        with transaction.atomic():
+            # Make sure a progress row exists for every key before incrementing
+            LessonProgress.objects.bulk_create(
+                [
+                    LessonProgress(enrollment_id=enrollment_id, lesson_id=lesson_id)
+                    for enrollment_id, lesson_id in pending
+                ],
+                ignore_conflicts=True,
+                batch_size=500
+            )
+
+            progress_ids = {
+                (enrollment_id, lesson_id): pk
+                for pk, enrollment_id, lesson_id in LessonProgress.objects.filter(
+                    enrollment_id__in=enrollment_ids,
+                    lesson_id__in=lesson_ids
+                ).values_list('pk', 'enrollment_id', 'lesson_id')
+            }
+
+            # Heartbeats arrive at fixed intervals, so most keys share a delta;
+            # one UPDATE per distinct delta keeps the statement count small
+            by_delta = defaultdict(list)
+            for key, seconds in pending.items():
+                if key in progress_ids:
+                    by_delta[seconds].append(progress_ids[key])
+
+            for seconds, pks in by_delta.items():
+                for start in range(0, len(pks), 500):
+                    LessonProgress.objects.filter(pk__in=pks[start:start + 500]).update(
+                        watch_time_seconds=F('watch_time_seconds') + seconds
+                    )
+
+
+watch_time_buffer = WatchTimeBuffer()
+
+
+def _flush_on_exit():
+    try:
+        watch_time_buffer.flush()
+    except Exception:
+        pass
+
+
+atexit.register(_flush_on_exit)
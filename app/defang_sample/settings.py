@@ -79,6 +79,7 @@ INSTALLED_APPS = [
     'courses',
     'quizzes',
     'certificates',
+    'mediafiles',
     'example_app',
 ]
 
@@ -236,5 +237,58 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Seconds buffered lesson watch-time heartbeats wait before a background thread
+# flushes them in bulk; 0 leaves them buffered until shutdown or an explicit flush
+WATCH_TIME_FLUSH_INTERVAL = int(os.environ.get('WATCH_TIME_FLUSH_INTERVAL', '30'))
+
+# Background tasks run in an in-process thread pool; eager mode runs them inline
+BACKGROUND_TASK_WORKERS = int(os.environ.get('BACKGROUND_TASK_WORKERS', '2'))
+BACKGROUND_TASKS_EAGER = os.environ.get('BACKGROUND_TASKS_EAGER', 'False') == 'True'
+
+# Widths (px) of the resized variants generated for uploaded images
+IMAGE_VARIANT_WIDTHS = [160, 320, 640, 1280]
+
+# Resumable lesson uploads: where partial files live and the largest accepted chunk
+CHUNKED_UPLOAD_TEMP_DIR = os.path.join(BASE_DIR, 'upload_tmp')
+CHUNKED_UPLOAD_MAX_CHUNK_SIZE = 16 * 1024 * 1024
+
+# Transcode workers: seconds between heartbeats on a running job, and without one before the job is requeued
+TRANSCODE_JOB_HEARTBEAT_SECONDS = 30
+TRANSCODE_JOB_STALE_SECONDS = 300
+
+# Bulk certificate verification: items per request (JSON / NDJSON stream) and items per minute per client
+CERTIFICATE_BULK_VERIFY_MAX_ITEMS = 1000
+CERTIFICATE_BULK_VERIFY_STREAM_MAX_ITEMS = 50000
+CERTIFICATE_BULK_VERIFY_RATE = '50000/min'
+
+# In-process LRU cache in front of the public certificate verification records
+CERTIFICATE_VERIFICATION_CACHE_SIZE = 10000
+CERTIFICATE_VERIFICATION_CACHE_TTL = 300
+
+# Server-sent events for certificate jobs: seconds between job polls and before the stream closes
+CERTIFICATE_JOB_EVENTS_POLL_INTERVAL = 0.5
+CERTIFICATE_JOB_EVENTS_TIMEOUT = 10
+
+# Seconds without progress after which a pending or rendering certificate job is failed
+CERTIFICATE_JOB_STALE_SECONDS = 300
+
+# Certificate PDFs re-rendered per minute after student, instructor or course name changes
+CERTIFICATE_RERENDER_RATE = 600
+
+# Failed re-renders of one certificate before it is dropped from the queue
+CERTIFICATE_RERENDER_MAX_ATTEMPTS = 5
+
+# Seconds a quiz's item analysis is cached; it is also recomputed when attempts or questions change
+QUIZ_ITEM_ANALYSIS_CACHE_TIMEOUT = 3600
+
+# Seconds after a quiz attempt's deadline that submissions are still accepted
+QUIZ_SUBMISSION_GRACE_SECONDS = 30
+
+# Minimum seconds between two autosaves of the same quiz attempt; quicker saves get a 429 to retry
+QUIZ_AUTOSAVE_MIN_INTERVAL = 5
+
+# Most questions a single question bank import may add
+QUIZ_IMPORT_MAX_QUESTIONS = 20000
+
 # Custom user model
 AUTH_USER_MODEL = 'users.User'
@@ -33,6 +33,7 @@ urlpatterns = [
     path('api/courses/', include('courses.urls', namespace='courses')),
     path('api/quizzes/', include('quizzes.urls', namespace='quizzes')),
     path('api/certificates/', include('certificates.urls', namespace='certificates')),
+    path('api/media/', include('mediafiles.urls', namespace='mediafiles')),
 
     # Legacy endpoints
     path('todos/', include('example_app.urls', namespace='example_app')),
@@ -0,0 +1,32 @@
+from django.contrib import admin
+from .models import Blob, ImageAsset, TranscodeJob, UploadSession
+
+
+@admin.register(ImageAsset)
+class ImageAssetAdmin(admin.ModelAdmin):
+    list_display = ('name', 'digest', 'width', 'height', 'created_at')
+    search_fields = ('name', 'digest')
+    readonly_fields = ('name', 'digest', 'width', 'height', 'variant_widths', 'variant_formats', 'created_at')
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'lesson', 'owner', 'offset', 'total_size', 'status', 'updated_at')
+    list_filter = ('status', 'field_name')
+    search_fields = ('filename', 'owner__username')
+    readonly_fields = ('id', 'offset', 'created_at', 'updated_at')
+
+
+@admin.register(TranscodeJob)
+class TranscodeJobAdmin(admin.ModelAdmin):
+    list_display = ('source_name', 'lesson', 'status', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    search_fields = ('source_name',)
+    readonly_fields = ('manifest_name', 'error', 'attempts', 'created_at', 'started_at', 'finished_at')
+
+
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'ref_count', 'created_at', 'last_stored_at')
+    search_fields = ('name', 'digest')
+    readonly_fields = ('name', 'digest', 'size', 'ref_count', 'created_at', 'last_stored_at')
@@ -0,0 +1,149 @@
+import hashlib
+import io
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+# Uploaded image fields that get resized variants, by model label
+IMAGE_FIELDS = {
+    'courses.Course': ['thumbnail'],
+    'users.User': ['profile_picture'],
+    'certificates.CertificateTemplate': ['logo', 'background_image'],
+}
+
+VARIANTS_DIR = 'variants'
+CACHE_PREFIX = 'image-variants:'
+MISSING_CACHE_TIMEOUT = 30
+
+
+def get_variant_widths():
+    return sorted(getattr(settings, 'IMAGE_VARIANT_WIDTHS', (160, 320, 640, 1280)))
+
+
+def get_variant_formats():
+    formats = ['jpeg']
+    if features.check('webp'):
+        formats.insert(0, 'webp')
+    return formats
+
+
+def variant_name(digest, width, image_format):
+    """Content-addressed storage name for a variant"""
+    extension = 'jpg' if image_format == 'jpeg' else image_format
+    return f"{VARIANTS_DIR}/{digest[:2]}/{digest}/{width}w.{extension}"
+
+
+def hash_file(file_obj, chunk_size=64 * 1024):
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: file_obj.read(chunk_size), b''):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _encode(image, image_format):
+    buffer = io.BytesIO()
+    if image_format == 'jpeg':
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        image.save(buffer, 'JPEG', quality=82, optimize=True, progressive=True)
+    else:
+        image.save(buffer, 'WEBP', quality=80, method=4)
+    return buffer.getvalue()
+
+
+def generate_variants(name, storage=None):
+    """
+    Generate resized variants for a stored image.
+
+    Variants are written once per content digest, so re-uploads of the same
+    image reuse the files already on disk. Returns the ImageAsset record.
+    """
+    from .models import ImageAsset
+
+    storage = storage or default_storage
+
+    existing = ImageAsset.objects.filter(name=name).first()
+    if existing is not None:
+        return existing
+
+    with storage.open(name, 'rb') as source:
+        digest = hash_file(source)
+        source.seek(0)
+        image = Image.open(source)
+        image.load()
+
+    image = ImageOps.exif_transpose(image)
+    formats = get_variant_formats()
+
+    # Never upscale: only widths smaller than the original, plus the original size
+    widths = [width for width in get_variant_widths() if width < image.width]
+    widths.append(min(image.width, get_variant_widths()[-1]))
+    widths = sorted(set(widths))
+
+    for width in widths:
+        resized = None
+        for image_format in formats:
+            target = variant_name(digest, width, image_format)
+            if storage.exists(target):
+                continue
+            if resized is None:
+                height = max(1, round(image.height * width / image.width))
+                resized = image.resize((width, height), Image.LANCZOS)
+            storage.save(target, ContentFile(_encode(resized, image_format)))
+
+    asset, _ = ImageAsset.objects.get_or_create(
+        name=name,
+        defaults={
+            'digest': digest,
+            'width': image.width,
+            'height': image.height,
+            'variant_widths': widths,
+            'variant_formats': formats,
+        }
+    )
+    cache.delete(CACHE_PREFIX + name)
+    return asset
+
+
+def get_variant_names(name):
+    """
+    Return {width: {format: storage_name}} for an image, or None if not ready.
+
+    Lookups are cached so list endpoints don't query per row.
+    """
+    from .models import ImageAsset
+
+    key = CACHE_PREFIX + name
+    variants = cache.get(key)
+    if variants is not None:
+        return variants or None
+
+    asset = ImageAsset.objects.filter(name=name).values(
+        'digest', 'variant_widths', 'variant_formats'
+    ).first()
+
+    if asset is None:
+        cache.set(key, {}, MISSING_CACHE_TIMEOUT)
+        return None
+
+    variants = {
+        str(width): {
+            image_format: variant_name(asset['digest'], width, image_format)
+            for image_format in asset['variant_formats']
+        }
+        for width in asset['variant_widths']
+    }
+    cache.set(key, variants, None)
+    return variants
+
+
+def queue_variants(name):
+    """Generate variants for an image in the background if they don't exist yet"""
+    from api.tasks import run_in_background
+
+    if cache.get(CACHE_PREFIX + name):
+        return
+    run_in_background(generate_variants, name)
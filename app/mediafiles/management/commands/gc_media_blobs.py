@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from mediafiles.storage import collect_garbage, recount_blob_references
+
+
+class Command(BaseCommand):
+    help = "Recount blob references and delete content-addressed files nothing uses"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours',
+            type=int,
+            default=24,
+            help='Keep unreferenced blobs stored within this many hours (default 24)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='List the blobs that would be deleted without deleting them'
+        )
+
+    def handle(self, *args, **options):
+        recounted = recount_blob_references()
+        if recounted:
+            self.stdout.write(f"Corrected reference counts for {recounted} blob(s)")
+
+        deleted = collect_garbage(
+            timedelta(hours=options['grace_hours']),
+            dry_run=options['dry_run']
+        )
+        for name in deleted:
+            self.stdout.write(name)
+
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {len(deleted)} unreferenced blob(s)"))
@@ -0,0 +1,37 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from mediafiles.images import IMAGE_FIELDS, generate_variants
+from mediafiles.models import ImageAsset
+
+
+class Command(BaseCommand):
+    help = "Generate resized variants for uploaded images that don't have them yet"
+
+    def handle(self, *args, **options):
+        done = set(ImageAsset.objects.values_list('name', flat=True))
+        generated = 0
+        failed = 0
+
+        for label, field_names in IMAGE_FIELDS.items():
+            model = apps.get_model(label)
+            for field_name in field_names:
+                names = model.objects.exclude(
+                    **{f'{field_name}__isnull': True}
+                ).exclude(
+                    **{field_name: ''}
+                ).values_list(field_name, flat=True).distinct()
+
+                for name in names.iterator():
+                    if name in done:
+                        continue
+                    try:
+                        generate_variants(name)
+                        generated += 1
+                    except Exception as e:
+                        failed += 1
+                        self.stderr.write(f"Failed to process {name}: {e}")
+                    done.add(name)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated variants for {generated} image(s), {failed} failed"
+        ))
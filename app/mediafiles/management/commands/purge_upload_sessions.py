@@ -0,0 +1,33 @@
+import os
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from mediafiles.models import UploadSession
+from mediafiles.uploads import part_path
+
+
+class Command(BaseCommand):
+    help = "Delete abandoned resumable uploads and their partial files"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-hours',
+            type=int,
+            default=48,
+            help='Purge unfinished sessions idle for this many hours (default 48)'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['older_than_hours'])
+        stale = UploadSession.objects.filter(updated_at__lt=cutoff).exclude(status='complete')
+
+        purged = 0
+        for session in stale.iterator():
+            path = part_path(session)
+            if os.path.exists(path):
+                os.remove(path)
+            session.delete()
+            purged += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} upload session(s)"))
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from mediafiles.transcoding import claim_next_job, ffmpeg_available, run_job
+
+
+class Command(BaseCommand):
+    help = "Run queued HLS segmenting jobs for lesson videos (requires ffmpeg on PATH)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process the pending queue and exit instead of polling'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=10,
+            help='Seconds to wait between polls when the queue is empty'
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=3,
+            help='Give up on a job after this many failed runs'
+        )
+
+    def handle(self, *args, **options):
+        if not ffmpeg_available():
+            raise CommandError("ffmpeg and ffprobe must be installed and on PATH")
+
+        while True:
+            job = claim_next_job(options['max_attempts'])
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f"Segmenting {job.source_name} (attempt {job.attempts})")
+            job = run_job(job, options['max_attempts'])
+            if job.status == 'complete':
+                self.stdout.write(self.style.SUCCESS(f"  -> {job.manifest_name}"))
+            else:
+                self.stderr.write(f"  failed: {job.error}")
@@ -0,0 +1,67 @@
+from django.core.files.storage import default_storage
+from rest_framework import serializers
+from .images import get_variant_names
+from .models import UploadSession
+
+
+def storage_url(name, request=None):
+    """URL for a name in default storage, absolute when a request is available"""
+    url = default_storage.url(name)
+    if request is not None:
+        url = request.build_absolute_uri(url)
+    return url
+
+
+class StorageURLField(serializers.ReadOnlyField):
+    """Read-only field rendering a storage name (CharField) as a URL"""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        return storage_url(value, self.context.get('request'))
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """
+    Read-only field exposing resized variant URLs for an image field.
+
+    Renders as {"<width>": {"webp": url, "jpeg": url}, ...}, or null while
+    the variants haven't been generated yet.
+    """
+
+    def to_representation(self, value):
+        if not value:
+            return None
+
+        variants = get_variant_names(value.name)
+        if not variants:
+            return None
+
+        request = self.context.get('request')
+        return {
+            width: {
+                image_format: storage_url(name, request)
+                for image_format, name in formats.items()
+            }
+            for width, formats in variants.items()
+        }
+
+
+class UploadSessionCreateSerializer(serializers.Serializer):
+    """Serializer for starting a resumable lesson upload"""
+    lesson = serializers.IntegerField(min_value=1)
+    field_name = serializers.ChoiceField(choices=UploadSession.FIELD_CHOICES)
+    filename = serializers.CharField(max_length=255)
+    total_size = serializers.IntegerField(min_value=1)
+    checksum = serializers.RegexField(r'^[0-9a-fA-F]{64}$', required=False, allow_blank=True)
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """Serializer for upload session status"""
+
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'lesson', 'field_name', 'filename', 'total_size',
+            'offset', 'status', 'error', 'created_at', 'updated_at'
+        ]
@@ -0,0 +1,97 @@
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from courses.models import Lesson
+from .images import IMAGE_FIELDS, queue_variants
+from .storage import adjust_ref_counts, get_blob_fields
+from .transcoding import hls_directory, queue_transcode
+
+
+def queue_image_variants(sender, instance, update_fields=None, **kwargs):
+    """Queue variant generation for any uploaded images on the saved instance"""
+    for field_name in IMAGE_FIELDS[sender._meta.label]:
+        if update_fields is not None and field_name not in update_fields:
+            continue
+        field_file = getattr(instance, field_name)
+        if field_file:
+            queue_variants(field_file.name)
+
+
+for label in IMAGE_FIELDS:
+    post_save.connect(
+        queue_image_variants,
+        sender=apps.get_model(label),
+        dispatch_uid=f'queue_image_variants_{label}'
+    )
+
+
+@receiver(post_save, sender=Lesson)
+def queue_lesson_transcode(sender, instance, update_fields=None, **kwargs):
+    """Queue HLS segmenting when a lesson gets a new video"""
+    if update_fields is not None and 'video_file' not in update_fields:
+        return
+
+    if not instance.video_file:
+        if instance.hls_manifest:
+            Lesson.objects.filter(pk=instance.pk).update(hls_manifest='')
+        return
+
+    if instance.hls_manifest.startswith(hls_directory(instance.video_file.name) + '/'):
+        return
+
+    if instance.hls_manifest:
+        # The manifest belongs to a replaced video
+        Lesson.objects.filter(pk=instance.pk).update(hls_manifest='')
+        instance.hls_manifest = ''
+    queue_transcode(instance)
+
+
+def remember_blob_names(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Load the blob names a row held before this save so post_save can diff them"""
+    instance._previous_blob_names = {}
+    if raw or instance._state.adding or instance.pk is None:
+        return
+
+    fields = BLOB_FIELDS[sender]
+    if update_fields is not None:
+        fields = [name for name in fields if name in update_fields]
+    if fields:
+        previous = sender._default_manager.filter(pk=instance.pk).values(*fields).first()
+        instance._previous_blob_names = previous or {}
+
+
+def count_blob_references(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Move blob reference counts from the old file names to the new ones"""
+    if raw:
+        return
+
+    previous = getattr(instance, '_previous_blob_names', {})
+    added, removed = [], []
+    for field_name in BLOB_FIELDS[sender]:
+        if not created and field_name not in previous:
+            continue
+        old_name = previous.get(field_name) or ''
+        new_name = getattr(instance, field_name).name or ''
+        if old_name != new_name:
+            added.append(new_name)
+            removed.append(old_name)
+
+    adjust_ref_counts(added, 1)
+    adjust_ref_counts(removed, -1)
+
+
+def release_blob_references(sender, instance, **kwargs):
+    """Drop the references held by a deleted row; orphans are removed by gc_media_blobs"""
+    adjust_ref_counts(
+        [getattr(instance, field_name).name for field_name in BLOB_FIELDS[sender]],
+        -1
+    )
+
+
+BLOB_FIELDS = get_blob_fields()
+
+for model in BLOB_FIELDS:
+    label = model._meta.label
+    pre_save.connect(remember_blob_names, sender=model, dispatch_uid=f'remember_blob_names_{label}')
+    post_save.connect(count_blob_references, sender=model, dispatch_uid=f'count_blob_references_{label}')
+    post_delete.connect(release_blob_references, sender=model, dispatch_uid=f'release_blob_references_{label}')
@@ -0,0 +1,223 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+BLOBS_DIR = 'blobs'
+READ_SIZE = 64 * 1024
+
+
+def blob_name(digest, extension=''):
+    """Content-addressed storage name for a blob"""
+    return f"{BLOBS_DIR}/{digest[:2]}/{digest}{extension}"
+
+
+def _extension(name):
+    extension = os.path.splitext(name)[1].lower()
+    # Keep the extension for content types, but never anything path-like or huge
+    if len(extension) > 10 or not extension[1:].isalnum():
+        return ''
+    return extension
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Filesystem storage that keeps each distinct file once, named by its SHA-256.
+
+    The upload is hashed while it is streamed to a temporary file next to the
+    blobs, then renamed to `blobs/<aa>/<digest><ext>`. If that blob already
+    exists the temporary file is dropped and the existing name is returned,
+    so every field holding the same content points at the same file. Blob
+    names never change content, which makes their URLs safe to cache forever.
+
+    Files stored before this backend was enabled keep their old names and
+    are still served from the same MEDIA_ROOT.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The final name depends on the content, so collisions are the point
+        return name
+
+    def _save(self, name, content):
+        temp_dir = self.path(os.path.join(BLOBS_DIR, 'tmp'))
+        os.makedirs(temp_dir, exist_ok=True)
+
+        digest = hashlib.sha256()
+        if hasattr(content, 'temporary_file_path'):
+            # Large uploads Django already spooled to disk: hash, then move without copying
+            with open(content.temporary_file_path(), 'rb') as f:
+                for chunk in iter(lambda: f.read(READ_SIZE), b''):
+                    digest.update(chunk)
+            fd, temp_path = tempfile.mkstemp(dir=temp_dir)
+            os.close(fd)
+            file_move_safe(content.temporary_file_path(), temp_path, allow_overwrite=True)
+        else:
+            fd, temp_path = tempfile.mkstemp(dir=temp_dir)
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    f.write(chunk)
+
+        return self._store(temp_path, digest.hexdigest(), _extension(name))
+
+    def import_file(self, name, path, digest=None):
+        """
+        Store a local file by moving it into place, e.g. an assembled upload.
+
+        The file must be on the same filesystem to avoid a copy. Returns the
+        blob name.
+        """
+        if digest is None:
+            sha = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(READ_SIZE), b''):
+                    sha.update(chunk)
+            digest = sha.hexdigest()
+        return self._store(path, digest, _extension(name))
+
+    def _store(self, temp_path, digest, extension):
+        from .models import Blob
+
+        name = blob_name(digest, extension)
+        target = self.path(name)
+
+        with transaction.atomic():
+            # The row lock orders this against garbage collection of the same
+            # blob: either the collector sees the fresh last_stored_at and
+            # keeps the file, or it has already removed both and we put them back
+            blob, created = Blob.objects.select_for_update().get_or_create(
+                name=name,
+                defaults={'digest': digest, 'size': os.path.getsize(temp_path)}
+            )
+            if not created:
+                # Reused content counts as fresh so garbage collection leaves it alone
+                Blob.objects.filter(pk=blob.pk).update(last_stored_at=timezone.now())
+
+            if os.path.exists(target):
+                os.remove(temp_path)
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(temp_path, self.file_permissions_mode)
+                try:
+                    # Atomic rename: readers never see a partially written blob
+                    os.replace(temp_path, target)
+                except OSError:
+                    # Different filesystem (e.g. an upload temp dir elsewhere)
+                    file_move_safe(temp_path, target, allow_overwrite=True)
+        return name
+
+
+content_addressed_storage = ContentAddressedStorage()
+
+
+def get_content_addressed_storage():
+    return content_addressed_storage
+
+
+def adjust_ref_counts(names, delta):
+    """Add delta to the reference count of each blob name"""
+    from .models import Blob
+
+    for name in names:
+        if not name or not name.startswith(BLOBS_DIR + '/'):
+            continue
+        Blob.objects.filter(name=name).update(ref_count=F('ref_count') + delta)
+
+
+def get_blob_fields():
+    """Map each model to the names of its file fields stored in content-addressed storage"""
+    from django.apps import apps
+    from django.db.models import FileField
+
+    blob_fields = {}
+    for model in apps.get_models():
+        names = [
+            field.name for field in model._meta.concrete_fields
+            if isinstance(field, FileField) and isinstance(field.storage, ContentAddressedStorage)
+        ]
+        if names:
+            blob_fields[model] = names
+    return blob_fields
+
+
+def recount_blob_references():
+    """
+    Rebuild every blob's reference count from the file fields that use it.
+
+    Counts maintained by signals drift when rows are changed with
+    QuerySet.update() or raw SQL; this is the authoritative recount.
+    Returns the number of blobs whose count changed.
+    """
+    from django.db.models import Count
+    from .models import Blob
+
+    counts = {}
+    for model, field_names in get_blob_fields().items():
+        for field_name in field_names:
+            rows = model._default_manager.filter(
+                **{f'{field_name}__startswith': BLOBS_DIR + '/'}
+            ).values(field_name).annotate(references=Count('pk'))
+            for row in rows:
+                counts[row[field_name]] = counts.get(row[field_name], 0) + row['references']
+
+    changed = []
+    for blob in Blob.objects.only('pk', 'name', 'ref_count').iterator():
+        ref_count = counts.get(blob.name, 0)
+        if blob.ref_count != ref_count:
+            blob.ref_count = ref_count
+            changed.append(blob)
+
+    Blob.objects.bulk_update(changed, ['ref_count'], batch_size=500)
+    return len(changed)
+
+
+def collect_garbage(grace_period, dry_run=False):
+    """
+    Delete blobs nothing references that haven't been stored within grace_period.
+
+    The grace period covers files saved by a request whose row hasn't been
+    written yet. Generated HLS segments next to a video blob go with it.
+    Returns the list of deleted blob names.
+    """
+    from .models import Blob
+    from .transcoding import hls_directory
+
+    storage = content_addressed_storage
+    cutoff = timezone.now() - grace_period
+    orphans = Blob.objects.filter(ref_count__lte=0, last_stored_at__lt=cutoff)
+
+    deleted = []
+    for blob in orphans.only('pk', 'name').iterator():
+        if dry_run:
+            deleted.append(blob.name)
+            continue
+
+        with transaction.atomic():
+            # Re-check under the row lock so a blob re-stored or re-referenced
+            # meanwhile survives, and nobody can store it again until its
+            # file is gone
+            orphan = Blob.objects.select_for_update().filter(
+                pk=blob.pk,
+                ref_count__lte=0,
+                last_stored_at__lt=cutoff
+            ).first()
+            if orphan is None:
+                continue
+
+            orphan.delete()
+            storage.delete(blob.name)
+            hls_path = storage.path(hls_directory(blob.name))
+            if os.path.isdir(hls_path):
+                shutil.rmtree(hls_path, ignore_errors=True)
+        deleted.append(blob.name)
+
+    return deleted
@@ -0,0 +1,583 @@
+import fcntl
+import hashlib
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from unittest import mock, skipUnless
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APITestCase
+from courses.models import Course, Lesson
+from courses.serializers import CourseListSerializer, LessonSerializer
+from users.serializers import UserProfileSerializer
+from .images import generate_variants, variant_name
+from .models import Blob, ImageAsset, TranscodeJob, UploadSession
+from .storage import blob_name, content_addressed_storage
+from .transcoding import (
+    SEGMENT_SECONDS, claim_next_job, ffmpeg_available, ffmpeg_command, hls_directory, master_playlist,
+    select_renditions
+)
+from .uploads import part_path
+
+User = get_user_model()
+
+
+def make_image(name='image.png', size=(800, 400), color='red'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class ImageVariantTest(TestCase):
+    """Test resized image variant generation"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            BACKGROUND_TASKS_EAGER=True,
+            IMAGE_VARIANT_WIDTHS=[160, 320, 640, 1280]
+        )
+        self.settings_override.enable()
+        cache.clear()
+
+        self.instructor = User.objects.create_user(
+            username='instructor',
+            email='instructor@example.com',
+            password='testpass123',
+            user_type='instructor'
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+        cache.clear()
+
+    def create_course(self, thumbnail):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Course.objects.create(
+                title='Python Basics',
+                description='Learn Python programming',
+                instructor=self.instructor,
+                price=Decimal('0.00'),
+                is_free=True,
+                duration_hours=10,
+                thumbnail=thumbnail
+            )
+
+    def test_variants_generated_on_upload(self):
+        """Test saving a course thumbnail generates variants without upscaling"""
+        course = self.create_course(make_image())
+
+        asset = ImageAsset.objects.get(name=course.thumbnail.name)
+        self.assertEqual(asset.variant_widths, [160, 320, 640, 800])
+        self.assertTrue(default_storage.exists(variant_name(asset.digest, 160, 'jpeg')))
+
+        with default_storage.open(variant_name(asset.digest, 320, 'jpeg')) as f:
+            self.assertEqual(Image.open(f).size, (320, 160))
+
+    def test_identical_uploads_share_variants(self):
+        """Test variants are content-addressed by the original's digest"""
+        first = self.create_course(make_image('a.png'))
+        second = self.create_course(make_image('b.png'))
+
+        first_asset = ImageAsset.objects.get(name=first.thumbnail.name)
+        second_asset = ImageAsset.objects.get(name=second.thumbnail.name)
+        self.assertNotEqual(first.thumbnail.name, second.thumbnail.name)
+        self.assertEqual(first_asset.digest, second_asset.digest)
+
+    def test_course_list_serializer_exposes_variants(self):
+        """Test variant URLs appear in the course list serializer"""
+        course = self.create_course(make_image())
+
+        data = CourseListSerializer(course).data
+        self.assertIn('160', data['thumbnail_variants'])
+        self.assertTrue(data['thumbnail_variants']['160']['jpeg'].endswith('160w.jpg'))
+
+    def test_profile_serializer_without_picture(self):
+        """Test users without a profile picture have no variants"""
+        data = UserProfileSerializer(self.instructor).data
+        self.assertIsNone(data['profile_picture_variants'])
+
+    def test_generate_variants_is_idempotent(self):
+        """Test generating variants twice reuses the existing record"""
+        course = self.create_course(make_image())
+        asset = generate_variants(course.thumbnail.name)
+        self.assertEqual(ImageAsset.objects.filter(name=course.thumbnail.name).count(), 1)
+        self.assertEqual(asset.name, course.thumbnail.name)
+
+
+class ChunkedUploadTest(APITestCase):
+    """Test resumable chunked lesson uploads"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.temp_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            CHUNKED_UPLOAD_TEMP_DIR=self.temp_dir,
+            CHUNKED_UPLOAD_MAX_CHUNK_SIZE=1024
+        )
+        self.settings_override.enable()
+
+        self.instructor = User.objects.create_user(
+            username='instructor',
+            email='instructor@example.com',
+            password='testpass123',
+            user_type='instructor'
+        )
+        self.course = Course.objects.create(
+            title='Python Basics',
+            description='Learn Python programming',
+            instructor=self.instructor,
+            price=Decimal('0.00'),
+            is_free=True,
+            duration_hours=10
+        )
+        self.lesson = Lesson.objects.create(course=self.course, title='Intro', order=1)
+        self.content = bytes(range(256)) * 10
+        self.client.force_authenticate(self.instructor)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def start_upload(self, **overrides):
+        data = {
+            'lesson': self.lesson.pk,
+            'field_name': 'video_file',
+            'filename': 'lecture.mp4',
+            'total_size': len(self.content),
+            'checksum': hashlib.sha256(self.content).hexdigest()
+        }
+        data.update(overrides)
+        return self.client.post(reverse('mediafiles:create_upload'), data, format='json')
+
+    def send_chunk(self, upload_id, offset, chunk, checksum=None):
+        return self.client.generic(
+            'PATCH',
+            reverse('mediafiles:upload_detail', kwargs={'upload_id': upload_id}),
+            chunk,
+            content_type='application/offset+octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset),
+            HTTP_UPLOAD_CHECKSUM=f"sha256 {checksum or hashlib.sha256(chunk).hexdigest()}"
+        )
+
+    def test_chunked_upload_assembles_into_lesson(self):
+        """Test uploading in chunks stores the file on the lesson"""
+        response = self.start_upload()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        upload_id = response.data['id']
+
+        for offset in range(0, len(self.content), 1000):
+            response = self.send_chunk(upload_id, offset, self.content[offset:offset + 1000])
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(response.data['status'], 'complete')
+        self.lesson.refresh_from_db()
+        self.assertEqual(
+            self.lesson.video_file.name,
+            blob_name(hashlib.sha256(self.content).hexdigest(), '.mp4')
+        )
+        self.assertEqual(Blob.objects.get(name=self.lesson.video_file.name).ref_count, 1)
+        with self.lesson.video_file.open('rb') as f:
+            self.assertEqual(f.read(), self.content)
+
+    def test_resume_after_bad_chunk(self):
+        """Test a corrupted chunk is rejected and the upload can resume"""
+        upload_id = self.start_upload().data['id']
+        self.send_chunk(upload_id, 0, self.content[:1000])
+
+        response = self.send_chunk(upload_id, 1000, self.content[1000:2000], checksum='0' * 64)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['offset'], 1000)
+
+        status_response = self.client.get(
+            reverse('mediafiles:upload_detail', kwargs={'upload_id': upload_id})
+        )
+        self.assertEqual(status_response.data['offset'], 1000)
+
+        self.send_chunk(upload_id, 1000, self.content[1000:2000])
+        response = self.send_chunk(upload_id, 2000, self.content[2000:])
+        self.assertEqual(response.data['status'], 'complete')
+
+    def test_wrong_offset_conflicts(self):
+        """Test chunks at the wrong offset are rejected with 409"""
+        upload_id = self.start_upload().data['id']
+        response = self.send_chunk(upload_id, 500, self.content[500:1000])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['offset'], 0)
+
+    def test_chunk_during_another_write_conflicts(self):
+        """Test a chunk sent while another one is being written is refused untouched"""
+        upload_id = self.start_upload().data['id']
+        self.send_chunk(upload_id, 0, self.content[:1000])
+
+        with open(part_path(UploadSession.objects.get(pk=upload_id)), 'r+b') as part:
+            fcntl.flock(part.fileno(), fcntl.LOCK_EX)
+            response = self.send_chunk(upload_id, 1000, self.content[1000:2000])
+            self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+            self.assertEqual(os.fstat(part.fileno()).st_size, 1000)
+
+        response = self.send_chunk(upload_id, 1000, self.content[1000:2000])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['offset'], 2000)
+
+    def test_file_checksum_follows_chunks_across_workers(self):
+        """Test the whole-file checksum is kept per chunk, catching up on chunks other workers wrote"""
+        from mediafiles import uploads
+
+        upload_id = self.start_upload().data['id']
+        self.send_chunk(upload_id, 0, self.content[:1000])
+        # Another worker, with no digest of its own, takes the next chunk
+        uploads._digests.clear()
+        self.send_chunk(upload_id, 1000, self.content[1000:2000])
+        session_id = UploadSession.objects.get(pk=upload_id).pk
+        self.assertEqual(uploads._digests[session_id][0], 2000)
+
+        response = self.send_chunk(upload_id, 2000, self.content[2000:])
+        self.assertEqual(response.data['status'], 'complete')
+        self.assertNotIn(session_id, uploads._digests)
+        self.lesson.refresh_from_db()
+        self.assertEqual(
+            self.lesson.video_file.name,
+            blob_name(hashlib.sha256(self.content).hexdigest(), '.mp4')
+        )
+
+        bad = self.start_upload(checksum='0' * 64).data['id']
+        self.send_chunk(bad, 0, self.content[:1000])
+        self.send_chunk(bad, 1000, self.content[1000:2000])
+        response = self.send_chunk(bad, 2000, self.content[2000:])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(UploadSession.objects.get(pk=bad).status, 'failed')
+
+    def test_failed_assembly_marks_session_failed(self):
+        """Test an upload whose file can't be stored ends failed instead of stuck at full offset"""
+        upload_id = self.start_upload().data['id']
+        self.send_chunk(upload_id, 0, self.content[:1000])
+        self.send_chunk(upload_id, 1000, self.content[1000:2000])
+
+        with mock.patch.object(
+            content_addressed_storage.__class__, 'import_file', side_effect=OSError('disk full')
+        ):
+            response = self.send_chunk(upload_id, 2000, self.content[2000:])
+
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        session = UploadSession.objects.get(pk=upload_id)
+        self.assertEqual(session.status, 'failed')
+        self.assertIn('disk full', session.error)
+        self.assertFalse(os.path.exists(part_path(session)))
+        self.lesson.refresh_from_db()
+        self.assertFalse(self.lesson.video_file)
+
+    def test_oversized_chunk_rejected(self):
+        """Test chunks above the configured maximum are rejected"""
+        upload_id = self.start_upload().data['id']
+        response = self.send_chunk(upload_id, 0, self.content[:2000])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_only_course_instructor_can_upload(self):
+        """Test other users can't start uploads for a lesson"""
+        other = User.objects.create_user(username='other', password='testpass123')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.start_upload().status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TranscodePipelineTest(TestCase):
+    """Test HLS segmenting job queueing and the ffmpeg runner"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+
+        instructor = User.objects.create_user(username='instructor', password='testpass123')
+        self.course = Course.objects.create(
+            title='Python Basics',
+            description='Learn Python programming',
+            instructor=instructor,
+            price=Decimal('0.00'),
+            is_free=True,
+            duration_hours=10
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_video_upload_queues_job(self):
+        """Test saving a lesson video queues one segmenting job per video"""
+        lesson = Lesson.objects.create(
+            course=self.course,
+            title='Intro',
+            order=1,
+            video_file=SimpleUploadedFile('intro.mp4', b'not really a video')
+        )
+        lesson.title = 'Renamed'
+        lesson.save()
+
+        job = TranscodeJob.objects.get(lesson=lesson)
+        self.assertEqual(job.status, 'pending')
+        self.assertEqual(job.source_name, lesson.video_file.name)
+
+    def test_replacing_video_clears_manifest(self):
+        """Test a new video invalidates the old manifest and queues a new job"""
+        lesson = Lesson.objects.create(
+            course=self.course,
+            title='Intro',
+            order=1,
+            video_file=SimpleUploadedFile('intro.mp4', b'first')
+        )
+        Lesson.objects.filter(pk=lesson.pk).update(
+            hls_manifest=f"{hls_directory(lesson.video_file.name)}/master.m3u8"
+        )
+        lesson.refresh_from_db()
+
+        lesson.video_file = SimpleUploadedFile('second.mp4', b'second')
+        lesson.save()
+
+        lesson.refresh_from_db()
+        self.assertEqual(lesson.hls_manifest, '')
+        self.assertEqual(TranscodeJob.objects.filter(lesson=lesson).count(), 2)
+        self.assertIsNone(LessonSerializer(lesson).data['hls_manifest_url'])
+
+    def test_duplicate_video_reuses_ladder(self):
+        """Test a lesson re-using an already segmented video gets its manifest immediately"""
+        first = Lesson.objects.create(
+            course=self.course,
+            title='Intro',
+            order=1,
+            video_file=SimpleUploadedFile('intro.mp4', b'same video')
+        )
+        manifest = f"{hls_directory(first.video_file.name)}/master.m3u8"
+        default_storage.save(manifest, io.BytesIO(b'#EXTM3U\n'))
+        TranscodeJob.objects.filter(lesson=first).update(status='complete', manifest_name=manifest)
+
+        second = Lesson.objects.create(
+            course=self.course,
+            title='Intro again',
+            order=2,
+            video_file=SimpleUploadedFile('intro-copy.mp4', b'same video')
+        )
+
+        second.refresh_from_db()
+        self.assertEqual(second.hls_manifest, manifest)
+        self.assertEqual(TranscodeJob.objects.get(lesson=second).status, 'complete')
+
+    def test_ladder_never_upscales(self):
+        """Test renditions above the source height are skipped"""
+        renditions = select_renditions(1280, 720)
+        self.assertEqual([r['name'] for r in renditions], ['360p', '480p', '720p'])
+        self.assertEqual(renditions[0]['width'], 640)
+
+        tiny = select_renditions(320, 181)
+        self.assertEqual(len(tiny), 1)
+        self.assertEqual(tiny[0]['height'], 180)
+
+    def test_keyframes_follow_segment_time(self):
+        """Test keyframes are forced by time so segments align at any frame rate"""
+        command = ffmpeg_command('in.mp4', 'out', select_renditions(1280, 720)[0], has_audio=False)
+        self.assertEqual(
+            command[command.index('-force_key_frames') + 1],
+            f'expr:gte(t,n_forced*{SEGMENT_SECONDS})'
+        )
+        self.assertNotIn('-g', command)
+
+    def test_master_playlist(self):
+        """Test the master playlist lists every rendition"""
+        playlist = master_playlist(select_renditions(1280, 720), has_audio=True)
+        self.assertTrue(playlist.startswith('#EXTM3U'))
+        self.assertIn('RESOLUTION=1280x720', playlist)
+        self.assertIn('720p/index.m3u8', playlist)
+
+    def test_stale_running_job_is_requeued(self):
+        """Test a job left running by a dead worker is claimed again, and failed once out of attempts"""
+        Lesson.objects.create(
+            course=self.course,
+            title='Intro',
+            order=1,
+            video_file=SimpleUploadedFile('intro.mp4', b'not really a video')
+        )
+        job = claim_next_job(max_attempts=2)
+        self.assertEqual(job.status, 'running')
+        self.assertIsNone(claim_next_job(max_attempts=2))
+
+        stale = timezone.now() - timedelta(hours=1)
+        TranscodeJob.objects.filter(pk=job.pk).update(heartbeat_at=stale)
+        job = claim_next_job(max_attempts=2)
+        self.assertEqual(job.status, 'running')
+        self.assertEqual(job.attempts, 2)
+
+        TranscodeJob.objects.filter(pk=job.pk).update(heartbeat_at=stale)
+        self.assertIsNone(claim_next_job(max_attempts=2))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.error, 'Transcode worker stopped responding')
+
+    @skipUnless(ffmpeg_available(), 'ffmpeg is not installed')
+    def test_run_transcode_jobs(self):
+        """Test the job runner segments a real video and publishes the manifest"""
+        source = os.path.join(self.media_root, 'source.mp4')
+        subprocess.run(
+            [
+                'ffmpeg', '-y', '-v', 'error', '-f', 'lavfi', '-i', 'testsrc=size=640x360:rate=24',
+                '-t', '2', '-pix_fmt', 'yuv420p', source
+            ],
+            check=True
+        )
+        with open(source, 'rb') as f:
+            lesson = Lesson.objects.create(
+                course=self.course,
+                title='Intro',
+                order=1,
+                video_file=SimpleUploadedFile('intro.mp4', f.read())
+            )
+
+        call_command('run_transcode_jobs', once=True, stdout=io.StringIO())
+
+        lesson.refresh_from_db()
+        self.assertTrue(lesson.hls_manifest.endswith('_hls/master.m3u8'))
+        self.assertTrue(default_storage.exists(lesson.hls_manifest))
+        self.assertEqual(TranscodeJob.objects.get(lesson=lesson).status, 'complete')
+
+
+class ContentAddressedStorageTest(TestCase):
+    """Test deduplicated lesson media storage and blob garbage collection"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+
+        instructor = User.objects.create_user(username='instructor', password='testpass123')
+        self.course = Course.objects.create(
+            title='Python Basics',
+            description='Learn Python programming',
+            instructor=instructor,
+            price=Decimal('0.00'),
+            is_free=True,
+            duration_hours=10
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def create_lesson(self, order, content, filename='notes.pdf'):
+        return Lesson.objects.create(
+            course=self.course,
+            title=f'Lesson {order}',
+            order=order,
+            pdf_material=SimpleUploadedFile(filename, content)
+        )
+
+    def gc(self, *args):
+        out = io.StringIO()
+        call_command('gc_media_blobs', *args, stdout=out)
+        return out.getvalue()
+
+    def test_identical_uploads_stored_once(self):
+        """Test the same content uploaded twice shares one blob"""
+        first = self.create_lesson(1, b'%PDF same notes', 'week1.pdf')
+        second = self.create_lesson(2, b'%PDF same notes', 'copy of week1.PDF')
+
+        self.assertEqual(first.pdf_material.name, second.pdf_material.name)
+        self.assertEqual(
+            first.pdf_material.name,
+            blob_name(hashlib.sha256(b'%PDF same notes').hexdigest(), '.pdf')
+        )
+        self.assertEqual(Blob.objects.get().ref_count, 2)
+
+        blob_dir = os.path.dirname(content_addressed_storage.path(first.pdf_material.name))
+        self.assertEqual(len(os.listdir(blob_dir)), 1)
+
+    def test_reference_counts_follow_saves_and_deletes(self):
+        """Test replacing and deleting files moves reference counts"""
+        lesson = self.create_lesson(1, b'version one')
+        old_name = lesson.pdf_material.name
+
+        lesson.pdf_material = SimpleUploadedFile('notes.pdf', b'version two')
+        lesson.save()
+        self.assertEqual(Blob.objects.get(name=old_name).ref_count, 0)
+        self.assertEqual(Blob.objects.get(name=lesson.pdf_material.name).ref_count, 1)
+
+        lesson.title = 'Renamed'
+        lesson.save(update_fields=['title'])
+        self.assertEqual(Blob.objects.get(name=lesson.pdf_material.name).ref_count, 1)
+
+        lesson.delete()
+        self.assertFalse(Blob.objects.filter(ref_count__gt=0).exists())
+
+    def test_gc_deletes_only_orphans(self):
+        """Test garbage collection removes unreferenced blobs past the grace period"""
+        kept = self.create_lesson(1, b'kept')
+        orphan = self.create_lesson(2, b'orphan')
+        orphan_name = orphan.pdf_material.name
+        orphan.delete()
+
+        self.assertIn('Deleted 0', self.gc())
+
+        Blob.objects.update(last_stored_at=timezone.now() - timedelta(days=2))
+        output = self.gc('--dry-run')
+        self.assertIn(orphan_name, output)
+        self.assertTrue(content_addressed_storage.exists(orphan_name))
+
+        self.gc()
+        self.assertFalse(content_addressed_storage.exists(orphan_name))
+        self.assertFalse(Blob.objects.filter(name=orphan_name).exists())
+        self.assertTrue(content_addressed_storage.exists(kept.pdf_material.name))
+
+    def test_gc_keeps_blob_stored_again_after_listing(self):
+        """Test a blob stored again after the orphans were listed is neither unlinked nor forgotten"""
+        orphan = self.create_lesson(1, b'orphan')
+        name = orphan.pdf_material.name
+        orphan.delete()
+        Blob.objects.update(last_stored_at=timezone.now() - timedelta(days=2))
+
+        listed = list(Blob.objects.values_list('pk', flat=True))
+        original_filter = Blob.objects.filter
+
+        def stale_listing(*args, **kwargs):
+            if 'ref_count__lte' in kwargs:
+                # Another request stores the same content right after the listing
+                self.create_lesson(2, b'orphan')
+                return original_filter(pk__in=listed)
+            return original_filter(*args, **kwargs)
+
+        with mock.patch.object(Blob.objects, 'filter', side_effect=stale_listing):
+            self.assertIn('Deleted 0', self.gc())
+
+        self.assertTrue(content_addressed_storage.exists(name))
+        self.assertEqual(Blob.objects.get(name=name).ref_count, 1)
+
+    def test_storing_again_restores_missing_file(self):
+        """Test storing content whose blob row survived without its file puts the file back"""
+        lesson = self.create_lesson(1, b'content')
+        name = lesson.pdf_material.name
+        os.remove(content_addressed_storage.path(name))
+
+        self.assertEqual(self.create_lesson(2, b'content').pdf_material.name, name)
+        self.assertTrue(content_addressed_storage.exists(name))
+
+    def test_gc_recounts_references(self):
+        """Test drifted reference counts are rebuilt before collecting"""
+        lesson = self.create_lesson(1, b'content')
+        Blob.objects.update(ref_count=0, last_stored_at=timezone.now() - timedelta(days=2))
+
+        output = self.gc()
+        self.assertIn('Corrected reference counts for 1 blob(s)', output)
+        self.assertTrue(content_addressed_storage.exists(lesson.pdf_material.name))
+        self.assertEqual(Blob.objects.get().ref_count, 1)
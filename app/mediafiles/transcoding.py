@@ -0,0 +1,306 @@
+import json
+import os
+import shutil
+import logging
+import subprocess
+import tempfile
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HLS_LADDER = [
+    {'name': '360p', 'height': 360, 'video_bitrate': 800, 'audio_bitrate': 96},
+    {'name': '480p', 'height': 480, 'video_bitrate': 1400, 'audio_bitrate': 128},
+    {'name': '720p', 'height': 720, 'video_bitrate': 2800, 'audio_bitrate': 128},
+    {'name': '1080p', 'height': 1080, 'video_bitrate': 5000, 'audio_bitrate': 192},
+]
+
+SEGMENT_SECONDS = 6
+MASTER_PLAYLIST = 'master.m3u8'
+
+
+class TranscodeError(Exception):
+    """Raised when ffmpeg can't segment a video"""
+
+
+def ffmpeg_available():
+    return shutil.which('ffmpeg') is not None and shutil.which('ffprobe') is not None
+
+
+def get_ladder():
+    return getattr(settings, 'VIDEO_HLS_LADDER', DEFAULT_HLS_LADDER)
+
+
+def hls_directory(source_name):
+    """Storage directory for a video's segments, next to the original"""
+    root, _ = os.path.splitext(source_name)
+    return f"{root}_hls"
+
+
+def probe_video(path):
+    """Return (width, height, has_audio) for a video file using ffprobe"""
+    result = subprocess.run(
+        [
+            'ffprobe', '-v', 'error', '-print_format', 'json',
+            '-show_entries', 'stream=codec_type,width,height', path
+        ],
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise TranscodeError(f"ffprobe failed: {result.stderr.strip()[-500:]}")
+
+    streams = json.loads(result.stdout).get('streams', [])
+    video = next((s for s in streams if s.get('codec_type') == 'video'), None)
+    if video is None:
+        raise TranscodeError('No video stream found')
+
+    has_audio = any(s.get('codec_type') == 'audio' for s in streams)
+    return video['width'], video['height'], has_audio
+
+
+def select_renditions(source_width, source_height, ladder=None):
+    """
+    Pick the ladder rungs that don't upscale the source.
+
+    A source smaller than every rung still gets the lowest rung at its
+    native height. Widths are kept even, as libx264 requires.
+    """
+    ladder = ladder or get_ladder()
+    rungs = [rung for rung in ladder if rung['height'] <= source_height]
+    if not rungs:
+        rungs = [dict(ladder[0], height=source_height - source_height % 2)]
+
+    renditions = []
+    for rung in rungs:
+        width = round(source_width * rung['height'] / source_height / 2) * 2
+        renditions.append(dict(rung, width=width))
+    return renditions
+
+
+def ffmpeg_command(source_path, output_dir, rendition, has_audio):
+    """
+    Build the ffmpeg arguments that segment one rendition into HLS.
+
+    Keyframes are forced every SEGMENT_SECONDS of presentation time, not
+    every N frames, so segments line up across renditions whatever the
+    source frame rate; scene-cut keyframes are disabled for the same reason.
+    """
+    video_bitrate = rendition['video_bitrate']
+    command = [
+        'ffmpeg', '-y', '-v', 'error', '-i', source_path,
+        '-map', '0:v:0',
+    ]
+    if has_audio:
+        command += ['-map', '0:a:0']
+    command += [
+        '-vf', f"scale={rendition['width']}:{rendition['height']}",
+        '-c:v', 'libx264', '-preset', 'veryfast', '-profile:v', 'main',
+        '-b:v', f'{video_bitrate}k',
+        '-maxrate', f'{int(video_bitrate * 1.07)}k',
+        '-bufsize', f'{video_bitrate * 2}k',
+        '-force_key_frames', f'expr:gte(t,n_forced*{SEGMENT_SECONDS})', '-sc_threshold', '0',
+    ]
+    if has_audio:
+        command += ['-c:a', 'aac', '-ac', '2', '-b:a', f"{rendition['audio_bitrate']}k"]
+    command += [
+        '-f', 'hls',
+        '-hls_time', str(SEGMENT_SECONDS),
+        '-hls_playlist_type', 'vod',
+        '-hls_segment_filename', os.path.join(output_dir, 'segment_%05d.ts'),
+        os.path.join(output_dir, 'index.m3u8'),
+    ]
+    return command
+
+
+def master_playlist(renditions, has_audio):
+    """Render the HLS master playlist for a set of renditions"""
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3']
+    for rendition in renditions:
+        kbps = rendition['video_bitrate'] + (rendition['audio_bitrate'] if has_audio else 0)
+        lines.append(
+            f"#EXT-X-STREAM-INF:BANDWIDTH={int(kbps * 1000 * 1.1)},"
+            f"RESOLUTION={rendition['width']}x{rendition['height']}"
+        )
+        lines.append(f"{rendition['name']}/index.m3u8")
+    return '\n'.join(lines) + '\n'
+
+
+def segment_video(source_path, output_dir):
+    """Transcode a video into an HLS ladder under output_dir, returning the master path"""
+    width, height, has_audio = probe_video(source_path)
+    renditions = select_renditions(width, height)
+
+    for rendition in renditions:
+        rendition_dir = os.path.join(output_dir, rendition['name'])
+        os.makedirs(rendition_dir, exist_ok=True)
+        result = subprocess.run(
+            ffmpeg_command(source_path, rendition_dir, rendition, has_audio),
+            capture_output=True,
+            text=True
+        )
+        if result.returncode != 0:
+            raise TranscodeError(
+                f"ffmpeg failed for {rendition['name']}: {result.stderr.strip()[-500:]}"
+            )
+
+    master_path = os.path.join(output_dir, MASTER_PLAYLIST)
+    with open(master_path, 'w') as f:
+        f.write(master_playlist(renditions, has_audio))
+    return master_path
+
+
+def queue_transcode(lesson):
+    """Create a pending job for a lesson's current video if it doesn't have one"""
+    from courses.models import Lesson
+    from .models import TranscodeJob
+
+    if not lesson.video_file:
+        return None
+
+    source_name = lesson.video_file.name
+
+    # Deduplicated uploads share a file, so an existing ladder can be reused as is
+    manifest_name = TranscodeJob.objects.filter(
+        source_name=source_name,
+        status='complete'
+    ).exclude(manifest_name='').values_list('manifest_name', flat=True).first()
+    if manifest_name and default_storage.exists(manifest_name):
+        job, _ = TranscodeJob.objects.get_or_create(
+            lesson=lesson,
+            source_name=source_name,
+            defaults={'status': 'complete', 'manifest_name': manifest_name}
+        )
+        Lesson.objects.filter(pk=lesson.pk, video_file=source_name).update(hls_manifest=manifest_name)
+        lesson.hls_manifest = manifest_name
+        return job
+
+    job, _ = TranscodeJob.objects.get_or_create(
+        lesson=lesson,
+        source_name=source_name
+    )
+    return job
+
+
+def reap_stale_jobs(max_attempts=3):
+    """
+    Requeue running jobs whose worker stopped sending heartbeats.
+
+    A worker that crashes or is restarted mid-job leaves it running forever,
+    so its lesson never gets a manifest. Jobs without a heartbeat for
+    TRANSCODE_JOB_STALE_SECONDS go back to pending, or are failed once they
+    have used up max_attempts. Returns the number of jobs reaped.
+    """
+    from .models import TranscodeJob
+
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=getattr(settings, 'TRANSCODE_JOB_STALE_SECONDS', 300))
+    stale = TranscodeJob.objects.filter(status='running').filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    )
+    error = 'Transcode worker stopped responding'
+    requeued = stale.filter(attempts__lt=max_attempts).update(
+        status='pending', error=error, finished_at=now
+    )
+    failed = stale.filter(attempts__gte=max_attempts).update(
+        status='failed', error=error, finished_at=now
+    )
+    return requeued + failed
+
+
+def _send_heartbeats(job_id, stop):
+    """Touch a running job's heartbeat_at until stop is set"""
+    from .models import TranscodeJob
+
+    interval = getattr(settings, 'TRANSCODE_JOB_HEARTBEAT_SECONDS', 30)
+    try:
+        while not stop.wait(interval):
+            try:
+                TranscodeJob.objects.filter(pk=job_id, status='running').update(
+                    heartbeat_at=timezone.now()
+                )
+            except Exception:
+                logger.exception("Failed to record heartbeat for transcode job %s", job_id)
+    finally:
+        connection.close()
+
+
+def claim_next_job(max_attempts=3):
+    """Atomically move the oldest pending job to running and return it"""
+    from .models import TranscodeJob
+
+    reap_stale_jobs(max_attempts)
+
+    candidates = TranscodeJob.objects.filter(
+        status='pending',
+        attempts__lt=max_attempts
+    ).order_by('created_at').values_list('pk', flat=True)[:10]
+
+    for pk in candidates:
+        now = timezone.now()
+        claimed = TranscodeJob.objects.filter(pk=pk, status='pending').update(
+            status='running',
+            started_at=now,
+            heartbeat_at=now,
+            attempts=F('attempts') + 1
+        )
+        if claimed:
+            return TranscodeJob.objects.get(pk=pk)
+    return None
+
+
+def run_job(job, max_attempts=3):
+    """
+    Segment a claimed job's video and publish the manifest on its lesson.
+
+    Segments are written to a scratch directory first and then moved next
+    to the original, so a failed run never leaves a half-written ladder.
+    A background thread keeps the job's heartbeat fresh while ffmpeg runs
+    so reap_stale_jobs only requeues jobs whose worker has died.
+    """
+    from courses.models import Lesson
+
+    storage = default_storage
+    target_dir = storage.path(hls_directory(job.source_name))
+
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_send_heartbeats, args=(job.pk, stop), daemon=True)
+    heartbeat.start()
+    try:
+        with tempfile.TemporaryDirectory() as scratch:
+            output_dir = os.path.join(scratch, 'hls')
+            os.makedirs(output_dir)
+            segment_video(storage.path(job.source_name), output_dir)
+
+            if os.path.exists(target_dir):
+                shutil.rmtree(target_dir)
+            os.makedirs(os.path.dirname(target_dir), exist_ok=True)
+            shutil.move(output_dir, target_dir)
+    except Exception as e:
+        job.status = 'pending' if job.attempts < max_attempts else 'failed'
+        job.error = str(e)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+        return job
+    finally:
+        stop.set()
+        heartbeat.join()
+
+    job.manifest_name = f"{hls_directory(job.source_name)}/{MASTER_PLAYLIST}"
+    job.status = 'complete'
+    job.error = ''
+    job.finished_at = timezone.now()
+    job.save(update_fields=['manifest_name', 'status', 'error', 'finished_at'])
+
+    # Only publish if the lesson still points at the video we segmented
+    Lesson.objects.filter(pk=job.lesson_id, video_file=job.source_name).update(
+        hls_manifest=job.manifest_name
+    )
+    return job
@@ -0,0 +1,255 @@
+import fcntl
+import hashlib
+import logging
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .storage import ContentAddressedStorage
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 64 * 1024
+MAX_CACHED_DIGESTS = 256
+
+# session id -> (offset, sha256 of the part file up to offset), for the
+# sessions whose chunks this process has written most recently
+_digests = OrderedDict()
+_digests_lock = threading.Lock()
+
+
+class UploadError(Exception):
+    """Raised when a chunk can't be accepted"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def get_temp_dir():
+    path = getattr(settings, 'CHUNKED_UPLOAD_TEMP_DIR', os.path.join(settings.BASE_DIR, 'upload_tmp'))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def get_max_chunk_size():
+    return getattr(settings, 'CHUNKED_UPLOAD_MAX_CHUNK_SIZE', 16 * 1024 * 1024)
+
+
+def part_path(session):
+    """Path of the partially uploaded file for a session"""
+    return os.path.join(get_temp_dir(), f"{session.id}.part")
+
+
+def create_session(owner, lesson, field_name, filename, total_size, checksum=''):
+    """Start a resumable upload and pre-create its part file"""
+    from .models import UploadSession
+
+    session = UploadSession.objects.create(
+        owner=owner,
+        lesson=lesson,
+        field_name=field_name,
+        filename=os.path.basename(filename),
+        total_size=total_size,
+        checksum=checksum.lower()
+    )
+    open(part_path(session), 'wb').close()
+    return session
+
+
+def _file_digest(session, part, offset):
+    """
+    SHA-256 of the first offset bytes of a session's part file.
+
+    Continues from the digest this process kept after its last chunk of
+    the session and only reads the bytes other workers wrote since, so the
+    whole file is never re-read at the end. Acknowledged bytes don't change,
+    so a digest kept for an earlier offset is still valid.
+    """
+    with _digests_lock:
+        cached = _digests.get(session.pk)
+    if cached is not None and cached[0] <= offset:
+        done, digest = cached[0], cached[1].copy()
+    else:
+        done, digest = 0, hashlib.sha256()
+
+    part.seek(done)
+    remaining = offset - done
+    while remaining > 0:
+        data = part.read(min(READ_SIZE, remaining))
+        if not data:
+            break
+        digest.update(data)
+        remaining -= len(data)
+    return digest
+
+
+def _remember_digest(session_id, offset, digest):
+    with _digests_lock:
+        _digests[session_id] = (offset, digest)
+        _digests.move_to_end(session_id)
+        while len(_digests) > MAX_CACHED_DIGESTS:
+            _digests.popitem(last=False)
+
+
+def _forget_digest(session_id):
+    with _digests_lock:
+        _digests.pop(session_id, None)
+
+
+def append_chunk(session, offset, stream, length, expected_sha256):
+    """
+    Write one chunk at the given offset and advance the session.
+
+    The chunk is streamed from the request straight into the part file while
+    being hashed, so it is never buffered whole in memory. A checksum
+    mismatch truncates the part file back to the previous offset. The
+    whole-file SHA-256 is kept up to date chunk by chunk, so the last chunk
+    doesn't have to re-read the file.
+
+    Writers of the same session are serialized with an exclusive lock on
+    the part file, held until the offset has been advanced; a chunk that
+    arrives while another is being written is refused with a 409 so the
+    client retries it from the acknowledged offset.
+    """
+    from .models import UploadSession
+
+    if length <= 0 or length > get_max_chunk_size():
+        raise UploadError(f'Chunk size must be between 1 and {get_max_chunk_size()} bytes')
+    if offset + length > session.total_size:
+        raise UploadError('Chunk extends past the declared upload size')
+
+    path = part_path(session)
+    digest = hashlib.sha256()
+    received = 0
+
+    with open(path, 'r+b') as part:
+        try:
+            fcntl.flock(part.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadError('Another chunk of this upload is being written', 409)
+
+        # Re-read the session under the lock; an earlier writer may have moved it on
+        session.status, session.offset = UploadSession.objects.filter(
+            pk=session.pk
+        ).values_list('status', 'offset').get()
+        if session.status != 'uploading':
+            raise UploadError('Upload is not in progress', 409)
+        if offset != session.offset:
+            raise UploadError('Offset does not match the uploaded size', 409)
+
+        # Drop anything left over from a chunk that was written but never acknowledged
+        part.truncate(offset)
+        file_digest = _file_digest(session, part, offset)
+        part.seek(offset)
+        while received < length:
+            data = stream.read(min(READ_SIZE, length - received))
+            if not data:
+                break
+            digest.update(data)
+            file_digest.update(data)
+            part.write(data)
+            received += len(data)
+
+        if received != length or digest.hexdigest() != expected_sha256.lower():
+            part.truncate(offset)
+            if received != length:
+                raise UploadError('Chunk body is shorter than Content-Length')
+            raise UploadError('Chunk checksum mismatch')
+
+        part.flush()
+        os.fsync(part.fileno())
+
+        # Still conditional, in case the session was changed outside append_chunk
+        advanced = UploadSession.objects.filter(
+            pk=session.pk,
+            offset=offset,
+            status='uploading'
+        ).update(offset=offset + length, updated_at=timezone.now())
+        if not advanced:
+            raise UploadError('Upload was modified concurrently', 409)
+        _remember_digest(session.pk, offset + length, file_digest)
+
+    session.offset = offset + length
+    if session.offset == session.total_size:
+        _forget_digest(session.pk)
+        assemble(session, file_digest.hexdigest())
+    return session
+
+
+def _fail(session, error):
+    session.status = 'failed'
+    session.error = error
+    session.save(update_fields=['status', 'error', 'updated_at'])
+    path = part_path(session)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def assemble(session, sha256):
+    """
+    Move the completed part file into the lesson's media field.
+
+    sha256 is the digest of the whole file, kept while its chunks arrived.
+    With filesystem storage on the same device this is a rename, so large
+    videos are never copied; otherwise the storage backend copies it once.
+    If the file can't be stored the session is marked failed rather than
+    left uploading with nothing more to accept.
+    """
+    if session.checksum and sha256 != session.checksum:
+        _fail(session, 'File checksum mismatch')
+        raise UploadError('File checksum mismatch')
+
+    try:
+        return _store_upload(session, sha256)
+    except Exception as e:
+        logger.exception("Failed to store upload %s", session.pk)
+        _fail(session, f'Could not store the uploaded file: {e}')
+        raise UploadError('Could not store the uploaded file', 500)
+
+
+def _store_upload(session, sha256):
+    from courses.models import Lesson
+
+    path = part_path(session)
+    lesson = Lesson.objects.get(pk=session.lesson_id)
+    field_file = getattr(lesson, session.field_name)
+    storage = field_file.storage
+    name = storage.get_available_name(
+        field_file.field.generate_filename(lesson, session.filename),
+        max_length=field_file.field.max_length
+    )
+
+    try:
+        target = storage.path(name)
+    except NotImplementedError:
+        target = None
+
+    if isinstance(storage, ContentAddressedStorage):
+        # Renamed into place under its digest, or dropped if that content is already stored
+        name = storage.import_file(name, path, digest=sha256)
+    elif target is not None:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.replace(path, target)
+        except OSError:
+            # Different filesystem; shutil uses copy_file_range/sendfile where available
+            shutil.move(path, target)
+    else:
+        with open(path, 'rb') as f:
+            name = storage.save(name, File(f), max_length=field_file.field.max_length)
+        os.remove(path)
+
+    with transaction.atomic():
+        setattr(lesson, session.field_name, name)
+        lesson.save(update_fields=[session.field_name, 'updated_at'])
+        session.status = 'complete'
+        session.save(update_fields=['status', 'offset', 'updated_at'])
+
+    return lesson
@@ -0,0 +1,10 @@
+from django.urls import path
+from . import views
+
+app_name = 'mediafiles'
+
+urlpatterns = [
+    # Resumable lesson uploads
+    path('uploads/', views.create_upload_session, name='create_upload'),
+    path('uploads/<uuid:upload_id>/', views.upload_session_detail, name='upload_detail'),
+]
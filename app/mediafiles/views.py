@@ -0,0 +1,78 @@
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+from django.shortcuts import get_object_or_404
+from courses.models import Lesson
+from .models import UploadSession
+from .serializers import UploadSessionCreateSerializer, UploadSessionSerializer
+from .uploads import UploadError, append_chunk, create_session, get_max_chunk_size
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def create_upload_session(request):
+    """Start a resumable chunked upload for a lesson video or PDF"""
+    serializer = UploadSessionCreateSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    data = serializer.validated_data
+
+    lesson = get_object_or_404(
+        Lesson,
+        id=data['lesson'],
+        course__instructor=request.user
+    )
+
+    session = create_session(
+        owner=request.user,
+        lesson=lesson,
+        field_name=data['field_name'],
+        filename=data['filename'],
+        total_size=data['total_size'],
+        checksum=data.get('checksum', '')
+    )
+
+    response = UploadSessionSerializer(session).data
+    response['max_chunk_size'] = get_max_chunk_size()
+    return Response(response, status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET', 'PATCH'])
+@permission_classes([IsAuthenticated])
+def upload_session_detail(request, upload_id):
+    """
+    GET reports the current offset so clients can resume.
+    PATCH appends a raw chunk; send `Upload-Offset` and
+    `Upload-Checksum: sha256 <hex>` headers with the bytes as the body.
+    """
+    session = get_object_or_404(UploadSession, id=upload_id, owner=request.user)
+
+    if request.method == 'GET':
+        return Response(UploadSessionSerializer(session).data)
+
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+        length = int(request.headers.get('Content-Length', ''))
+    except ValueError:
+        return Response(
+            {'error': 'Upload-Offset and Content-Length headers are required'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    algorithm, _, expected = request.headers.get('Upload-Checksum', '').partition(' ')
+    if algorithm.lower() != 'sha256' or not expected:
+        return Response(
+            {'error': 'Upload-Checksum header must be "sha256 <hex digest>"'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        session = append_chunk(session, offset, request.stream, length, expected.strip())
+    except UploadError as e:
+        session.refresh_from_db()
+        return Response(
+            {'error': str(e), 'offset': session.offset},
+            status=e.status_code
+        )
+
+    return Response(UploadSessionSerializer(session).data, status=status.HTTP_200_OK)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Quiz, Question, Answer, QuizAttempt, QuizResponse
+from .models import Quiz, Question, Answer, QuizAttempt, QuizBestScore, QuizResponse
 
 
 class AnswerInline(admin.TabularInline):
@@ -27,10 +27,10 @@ class QuizAdmin(admin.ModelAdmin):
             'fields': ('course', 'title', 'description')
         }),
         ('Quiz Settings', {
-            'fields': ('time_limit_minutes', 'passing_score', 'max_attempts')
+            'fields': ('time_limit_minutes', 'passing_score', 'max_attempts', 'questions_per_attempt')
         }),
         ('Display Options', {
-            'fields': ('randomize_questions', 'show_results_immediately', 'is_active')
+            'fields': ('randomize_questions', 'shuffle_answers', 'show_results_immediately', 'is_active')
         }),
         ('Statistics', {
             'fields': ('question_count', 'total_points'),
@@ -69,10 +69,18 @@ class QuizAttemptAdmin(admin.ModelAdmin):
     list_display = ('student', 'quiz', 'attempt_number', 'score', 'passed', 'is_completed', 'started_at', 'completed_at')
     list_filter = ('is_completed', 'passed', 'quiz__course__category', 'started_at')
     search_fields = ('student__username', 'quiz__title')
-    readonly_fields = ('started_at', 'score', 'total_points_earned', 'total_points_possible', 'passed')
+    readonly_fields = ('started_at', 'deadline', 'score', 'total_points_earned', 'total_points_possible', 'passed', 'timed_out')
     ordering = ('-started_at',)
 
 
+@admin.register(QuizBestScore)
+class QuizBestScoreAdmin(admin.ModelAdmin):
+    list_display = ('student', 'quiz', 'best_score', 'passed', 'attempts_used', 'completed_attempts', 'last_attempt_at')
+    list_filter = ('passed', 'quiz__course__category')
+    search_fields = ('student__username', 'quiz__title')
+    readonly_fields = ('best_attempt', 'best_score', 'attempts_used', 'completed_attempts', 'passed', 'last_attempt_at', 'updated_at')
+
+
 @admin.register(QuizResponse)
 class QuizResponseAdmin(admin.ModelAdmin):
     list_display = ('attempt', 'question', 'is_correct', 'points_earned', 'answered_at')
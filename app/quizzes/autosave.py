@@ -0,0 +1,71 @@
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+
+class AutosaveThrottled(Exception):
+    """Raised when an attempt was autosaved less than QUIZ_AUTOSAVE_MIN_INTERVAL ago"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Answers were saved moments ago; retry in {retry_after} seconds")
+        self.retry_after = retry_after
+
+
+def save_answers(attempt, answers):
+    """
+    Store partial answers of an in-progress attempt.
+
+    Answers are written straight through to QuizResponse with one upsert,
+    so whichever worker process handles the submission (or the expiry)
+    sees them. To keep per-keystroke saves from turning into a write each,
+    an attempt is written at most once per QUIZ_AUTOSAVE_MIN_INTERVAL: the
+    attempt row is claimed with a conditional UPDATE of autosaved_at, and a
+    save arriving sooner raises AutosaveThrottled so the client can resend
+    its pending answers later. The claim also locks the attempt, so a save
+    racing a submission never overwrites graded responses; only the answer
+    fields are written. Returns False if the attempt was already completed.
+    """
+    from .grading import ANSWER_FIELDS, upsert_responses
+    from .models import QuizAttempt, QuizResponse
+
+    interval = getattr(settings, 'QUIZ_AUTOSAVE_MIN_INTERVAL', 5)
+    now = timezone.now()
+
+    with transaction.atomic():
+        open_attempt = QuizAttempt.objects.filter(pk=attempt.pk, is_completed=False)
+        due = open_attempt
+        if interval:
+            due = due.filter(
+                Q(autosaved_at__isnull=True) | Q(autosaved_at__lte=now - timedelta(seconds=interval))
+            )
+        if not due.update(autosaved_at=now):
+            last_saved = open_attempt.values_list('autosaved_at', flat=True).first()
+            if last_saved is None:
+                return False
+            waited = (now - last_saved).total_seconds()
+            raise AutosaveThrottled(max(1, math.ceil(interval - waited)))
+
+        upsert_responses([
+            QuizResponse(
+                attempt=attempt,
+                question_id=question_id,
+                selected_answer_id=selected_answer_id,
+                text_answer=text_answer or ''
+            )
+            for question_id, (selected_answer_id, text_answer) in answers.items()
+        ], update_fields=ANSWER_FIELDS)
+    return True
+
+
+def saved_answers(attempt):
+    """Everything saved for an attempt so far, as {question_id: (selected_answer_id, text_answer)}"""
+    return {
+        question_id: (selected_answer_id, text_answer)
+        for question_id, selected_answer_id, text_answer in attempt.responses.values_list(
+            'question_id', 'selected_answer_id', 'text_answer'
+        )
+    }
@@ -0,0 +1,114 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+
+def grace_period():
+    """Slack after the deadline for submissions still in flight"""
+    return timedelta(seconds=getattr(settings, 'QUIZ_SUBMISSION_GRACE_SECONDS', 30))
+
+
+def attempt_deadline(quiz, started_at):
+    if not quiz.time_limit_minutes:
+        return None
+    return started_at + timedelta(minutes=quiz.time_limit_minutes)
+
+
+def is_expired(attempt, now=None):
+    """Whether an open attempt's time limit, plus the grace period, has run out"""
+    if attempt.is_completed or attempt.deadline is None:
+        return False
+    return (now or timezone.now()) > attempt.deadline + grace_period()
+
+
+def _timed_out(attempt):
+    attempt.timed_out = True
+    attempt.completed_at = attempt.deadline
+
+
+def expire_attempt(attempt, now=None):
+    """
+    Submit an attempt whose time ran out with the answers saved so far.
+
+    Called lazily wherever an open attempt is accessed. Returns True if the
+    attempt's time had run out; it is then closed, by this call or by a
+    concurrent one that completed it first.
+    """
+    from .autosave import saved_answers
+    from .grading import complete_attempt
+
+    if not is_expired(attempt, now):
+        return False
+
+    with transaction.atomic():
+        _timed_out(attempt)
+        complete_attempt(attempt, saved_answers(attempt))
+    return True
+
+
+def expire_student_attempts(quiz, student, now=None):
+    """Expire a student's open attempts at a quiz whose time has run out"""
+    attempts = quiz.attempts.filter(
+        student=student,
+        is_completed=False,
+        deadline__lt=(now or timezone.now()) - grace_period()
+    ).select_related('quiz')
+    return sum(expire_attempt(attempt, now) for attempt in attempts)
+
+
+def expire_due_attempts(batch_size=500, now=None):
+    """
+    Submit and grade every expired attempt, a batch at a time.
+
+    Each batch loads its attempts, their saved responses and their quizzes'
+    questions up front, grades in memory, then writes all responses with
+    one upsert and all attempts with one bulk update, in the same
+    transaction as the students' best-score summaries. Only the attempts
+    this sweep claims in record_graded_attempt are written, so an attempt
+    submitted or lazily expired in the meantime isn't graded twice.
+    Returns the number of attempts expired.
+    """
+    from .grading import ATTEMPT_RESULT_FIELDS, grade_attempt, upsert_responses
+    from .models import Question, QuizAttempt, QuizResponse
+    from .scores import record_graded_attempt
+
+    cutoff = (now or timezone.now()) - grace_period()
+    expired = 0
+    while True:
+        # Graded attempts leave the open set, so each query picks up the next batch
+        attempts = list(
+            QuizAttempt.objects.filter(
+                is_completed=False,
+                deadline__lt=cutoff
+            ).select_related('quiz').order_by('deadline')[:batch_size]
+        )
+        if not attempts:
+            return expired
+
+        answers = {attempt.id: {} for attempt in attempts}
+        for attempt_id, question_id, selected_answer_id, text_answer in QuizResponse.objects.filter(
+            attempt__in=attempts
+        ).values_list('attempt_id', 'question_id', 'selected_answer_id', 'text_answer'):
+            answers[attempt_id][question_id] = (selected_answer_id, text_answer)
+
+        questions = {}
+        for question in Question.objects.filter(
+            quiz_id__in={attempt.quiz_id for attempt in attempts}
+        ).prefetch_related('answers'):
+            questions.setdefault(question.quiz_id, []).append(question)
+
+        responses = []
+        for attempt in attempts:
+            _timed_out(attempt)
+            responses += grade_attempt(attempt, answers[attempt.id], questions.get(attempt.quiz_id, []))
+
+        with transaction.atomic():
+            # A submission or lazy expiry may have completed some of them since
+            claimed = [attempt for attempt in attempts if record_graded_attempt(attempt)]
+            claimed_ids = {attempt.id for attempt in claimed}
+            upsert_responses([response for response in responses if response.attempt_id in claimed_ids])
+            QuizAttempt.objects.bulk_update(claimed, ATTEMPT_RESULT_FIELDS)
+
+        expired += len(claimed)
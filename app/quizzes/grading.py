@@ -0,0 +1,127 @@
+from django.utils import timezone
+from .short_answers import matches_accepted_answer
+
+ANSWER_FIELDS = ['selected_answer', 'text_answer']
+RESPONSE_UPDATE_FIELDS = ANSWER_FIELDS + ['is_correct', 'points_earned']
+
+
+def grade_response(question, selected_answer_id, text_answer):
+    """
+    Return (is_correct, points_earned) for an answer to a question.
+
+    Reads question.answers, so prefetch them when grading many responses.
+    A selected answer that belongs to another question is never correct.
+    """
+    if question.question_type in ['multiple_choice', 'true_false']:
+        is_correct = selected_answer_id is not None and any(
+            answer.id == selected_answer_id and answer.is_correct
+            for answer in question.answers.all()
+        )
+    elif question.question_type == 'short_answer':
+        is_correct = matches_accepted_answer(question, text_answer)
+    else:
+        is_correct = False
+
+    return is_correct, question.points if is_correct else 0
+
+
+def upsert_responses(responses, update_fields=RESPONSE_UPDATE_FIELDS):
+    """Insert or overwrite QuizResponse rows in one statement, keyed by attempt and question"""
+    from .models import QuizResponse
+
+    QuizResponse.objects.bulk_create(
+        responses,
+        update_conflicts=True,
+        unique_fields=['attempt', 'question'],
+        update_fields=update_fields
+    )
+
+
+ATTEMPT_RESULT_FIELDS = [
+    'is_completed', 'completed_at', 'score', 'total_points_earned',
+    'total_points_possible', 'passed', 'timed_out',
+]
+
+
+def grade_attempt(attempt, answers, questions=None):
+    """
+    Grade an attempt in memory and set its result fields, without saving.
+
+    answers maps question id to (selected_answer_id, text_answer). Only the
+    questions the attempt was asked count towards the possible points.
+    questions may be the quiz's questions with answers prefetched, to share
+    them between attempts. Returns the unsaved QuizResponse rows.
+    """
+    from .models import QuizResponse
+    from .randomization import attempt_question_ids
+
+    asked = attempt_question_ids(attempt)
+    if questions is None:
+        questions = attempt.quiz.questions.filter(id__in=asked).prefetch_related('answers')
+    asked = set(asked)
+
+    responses = []
+    total_earned = 0
+    total_possible = 0
+    for question in questions:
+        if question.id not in asked:
+            continue
+        total_possible += question.points
+        if question.id not in answers:
+            continue
+
+        selected_answer_id, text_answer = answers[question.id]
+        is_correct, points = grade_response(question, selected_answer_id, text_answer)
+        total_earned += points
+        responses.append(QuizResponse(
+            attempt=attempt,
+            question=question,
+            selected_answer_id=selected_answer_id,
+            text_answer=text_answer or '',
+            is_correct=is_correct,
+            points_earned=points
+        ))
+
+    attempt.is_completed = True
+    if attempt.completed_at is None:
+        attempt.completed_at = timezone.now()
+    if total_possible > 0:
+        attempt.score = int(total_earned / total_possible * 100)
+        attempt.total_points_earned = total_earned
+        attempt.total_points_possible = total_possible
+        attempt.passed = attempt.score >= attempt.quiz.passing_score
+    return responses
+
+
+def claim_completion(attempt):
+    """
+    Mark an open attempt completed, if nobody else has yet.
+
+    Submission, lazy expiry and the expiry sweep can all try to complete
+    the same attempt at once. A conditional UPDATE lets exactly one of them
+    win; the row stays locked until its transaction commits. Returns True
+    if this call claimed the attempt and should grade it.
+    """
+    from .models import QuizAttempt
+
+    return QuizAttempt.objects.filter(pk=attempt.pk, is_completed=False).update(is_completed=True) == 1
+
+
+def complete_attempt(attempt, answers):
+    """
+    Grade and complete an attempt in one pass.
+
+    Every answered question is graded in memory, all responses are written
+    with a single upsert and the attempt is scored and saved once, along
+    with the student's best-score summary. Call inside a transaction.
+    Returns False, writing nothing, if the attempt was completed by
+    another request first.
+    """
+    from .scores import record_graded_attempt
+
+    responses = grade_attempt(attempt, answers)
+    if not record_graded_attempt(attempt):
+        return False
+    upsert_responses(responses)
+    attempt.save()
+    return True
@@ -0,0 +1,242 @@
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+
+CACHE_PREFIX = 'quizzes:item_analysis:'
+CHUNK_SIZE = 5000
+
+
+class _ItemStats:
+    """Running sums for one question over the attempts seen so far"""
+
+    __slots__ = (
+        'shown', 'total', 'total_sq', 'responses', 'correct', 'score', 'score_sq', 'score_total', 'options'
+    )
+
+    def __init__(self):
+        # Attempts that were asked the question, and the sums of their totals
+        self.shown = 0
+        self.total = 0
+        self.total_sq = 0
+        self.responses = 0
+        self.correct = 0
+        self.score = 0
+        self.score_sq = 0
+        # Sum of item score times attempt total, for the item-total covariance
+        self.score_total = 0
+        # answer_id -> [selections, sum of selectors' totals]
+        self.options = {}
+
+
+def _variance(total, total_sq, n):
+    if n < 2:
+        return 0.0
+    return max(total_sq - total * total / n, 0.0) / (n - 1)
+
+
+def _correlation(n, sum_x, sum_y, sum_xx, sum_yy, sum_xy):
+    covariance = sum_xy - sum_x * sum_y / n
+    spread = (sum_xx - sum_x * sum_x / n) * (sum_yy - sum_y * sum_y / n)
+    if spread <= 0:
+        return None
+    return covariance / math.sqrt(spread)
+
+
+def _iter_attempt_rows(quiz):
+    """
+    Yield (question_ids, rows) per completed attempt, streamed in attempt order.
+
+    question_ids are the questions the attempt was asked (None for every
+    question). Only the response columns the statistics need are read, in
+    chunks, so one attempt's rows are held in memory at a time.
+
+    Attempts and responses are two queries merged on attempt id. Run them in
+    one transaction for a consistent snapshot; where the database doesn't
+    give one, an attempt completed in between may show up in the responses
+    only, and its rows are skipped instead of stalling the merge.
+    """
+    from .models import QuizAttempt, QuizResponse
+
+    attempts = QuizAttempt.objects.filter(
+        quiz=quiz,
+        is_completed=True
+    ).order_by('id').values_list('id', 'question_ids')
+    rows = QuizResponse.objects.filter(
+        attempt__quiz=quiz,
+        attempt__is_completed=True
+    ).order_by('attempt_id').values_list(
+        'attempt_id', 'question_id', 'selected_answer_id', 'is_correct', 'points_earned'
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+    row = next(rows, None)
+    for attempt_id, question_ids in attempts.iterator(chunk_size=CHUNK_SIZE):
+        while row is not None and row[0] < attempt_id:
+            row = next(rows, None)
+        batch = []
+        while row is not None and row[0] == attempt_id:
+            batch.append(row)
+            row = next(rows, None)
+        yield question_ids, batch
+
+
+def compute_item_analysis(quiz):
+    """
+    Item statistics for a quiz's completed attempts.
+
+    Responses are read once and folded into per-question sums, so time
+    grows with the number of responses and memory only with the number of
+    questions and answer choices. Unanswered questions count as 0 points.
+
+    Each question is measured over the attempts that were asked it, so
+    questions left out of a drawn subset don't count as wrong. Per
+    question: difficulty (share of those attempts answering correctly),
+    discrimination (point-biserial correlation between the question score
+    and the rest of the attempt's score) and, per answer choice, how often
+    it was picked and the average attempt score of those who picked it.
+    For the whole quiz: Cronbach's alpha, only defined when every attempt
+    was asked every question.
+    """
+    from .models import Question
+
+    questions = list(
+        Question.objects.filter(quiz=quiz).order_by('order').prefetch_related('answers')
+    )
+    stats = {question.id: _ItemStats() for question in questions}
+
+    n = 0
+    total_sum = 0
+    total_sq = 0
+    with transaction.atomic():
+        for question_ids, batch in _iter_attempt_rows(quiz):
+            total = sum(row[4] for row in batch)
+            n += 1
+            total_sum += total
+            total_sq += total * total
+
+            for question_id in stats if question_ids is None else question_ids:
+                item = stats.get(question_id)
+                if item is not None:
+                    item.shown += 1
+                    item.total += total
+                    item.total_sq += total * total
+
+            for _, question_id, answer_id, is_correct, points in batch:
+                item = stats.get(question_id)
+                if item is None:
+                    continue
+                item.responses += 1
+                item.correct += is_correct
+                item.score += points
+                item.score_sq += points * points
+                item.score_total += points * total
+                if answer_id is not None:
+                    option = item.options.setdefault(answer_id, [0, 0])
+                    option[0] += 1
+                    option[1] += total
+
+    items = []
+    item_variance_sum = 0.0
+    for question in questions:
+        item = stats[question.id]
+        shown = item.shown
+        item_variance_sum += _variance(item.score, item.score_sq, shown)
+
+        discrimination = None
+        if shown >= 2:
+            # Correlate with the rest score (total minus this item) so the
+            # item doesn't inflate its own discrimination
+            discrimination = _correlation(
+                shown,
+                item.score,
+                item.total - item.score,
+                item.score_sq,
+                item.total_sq - 2 * item.score_total + item.score_sq,
+                item.score_total - item.score_sq
+            )
+
+        options = []
+        for answer in question.answers.all():
+            selections, selector_total = item.options.get(answer.id, (0, 0))
+            options.append({
+                'answer_id': answer.id,
+                'answer_text': answer.answer_text,
+                'is_correct': answer.is_correct,
+                'selection_count': selections,
+                'selection_rate': selections / shown if shown else 0,
+                'mean_total_score': selector_total / selections if selections else None,
+            })
+
+        items.append({
+            'question_id': question.id,
+            'order': question.order,
+            'question_type': question.question_type,
+            'points': question.points,
+            'shown_count': shown,
+            'response_count': item.responses,
+            'omit_rate': (shown - item.responses) / shown if shown else 0,
+            'difficulty': item.correct / shown if shown else None,
+            'mean_score': item.score / shown if shown else None,
+            'discrimination': round(discrimination, 4) if discrimination is not None else None,
+            'options': options,
+        })
+
+    k = len(questions)
+    total_variance = _variance(total_sum, total_sq, n)
+    alpha = None
+    same_form = all(stats[question.id].shown == n for question in questions)
+    if k >= 2 and total_variance > 0 and same_form:
+        alpha = round(k / (k - 1) * (1 - item_variance_sum / total_variance), 4)
+
+    return {
+        'quiz_id': quiz.id,
+        'attempt_count': n,
+        'question_count': k,
+        'mean_total_score': total_sum / n if n else None,
+        'cronbach_alpha': alpha,
+        'items': items,
+    }
+
+
+def _fingerprint(quiz):
+    """Changes whenever a completed attempt or a question is added or edited"""
+    attempts = quiz.attempts.filter(is_completed=True).aggregate(
+        count=Count('id'),
+        last=Max('completed_at')
+    )
+    questions = quiz.questions.aggregate(count=Count('id'), last=Max('updated_at'))
+    return (
+        attempts['count'], str(attempts['last']),
+        questions['count'], str(questions['last']),
+    )
+
+
+def get_item_analysis(quiz):
+    """
+    Cached item analysis for a quiz.
+
+    The cached result is reused while no attempt has been completed and no
+    question changed since it was computed; QUIZ_ITEM_ANALYSIS_CACHE_TIMEOUT
+    bounds its age for changes the fingerprint can't see, like answer edits.
+    """
+    key = f"{CACHE_PREFIX}{quiz.id}"
+    fingerprint = _fingerprint(quiz)
+
+    cached = cache.get(key)
+    if cached is not None and cached['fingerprint'] == fingerprint:
+        return cached['analysis']
+
+    analysis = compute_item_analysis(quiz)
+    cache.set(
+        key,
+        {'fingerprint': fingerprint, 'analysis': analysis},
+        getattr(settings, 'QUIZ_ITEM_ANALYSIS_CACHE_TIMEOUT', 3600)
+    )
+    return analysis
+
+
+def invalidate_item_analysis(quiz_id):
+    """Drop a quiz's cached analysis, e.g. after responses were regraded"""
+    cache.delete(f"{CACHE_PREFIX}{quiz_id}")
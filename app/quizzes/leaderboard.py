@@ -0,0 +1,201 @@
+import threading
+from bisect import bisect_left, insort
+
+from django.db import transaction
+from django.db.models import F, Max, Sum
+
+QUIZ = 'quiz'
+COURSE = 'course'
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+class RankedIndex:
+    """
+    Students kept sorted by leaderboard entry, for bisect rank lookups.
+
+    Entries are (-score, completion timestamp, student_id) tuples, so the
+    natural tuple order is the leaderboard order: higher scores first,
+    then whoever got there first, then by student for a stable order.
+    """
+
+    def __init__(self, version, entries):
+        self.version = version
+        self.entries = sorted(entries)
+        self.by_student = {entry[2]: entry for entry in self.entries}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def rank(self, student_id):
+        entry = self.by_student.get(student_id)
+        if entry is None:
+            return None
+        return bisect_left(self.entries, entry) + 1
+
+    def page(self, offset, limit):
+        return [
+            (offset + position + 1, entry)
+            for position, entry in enumerate(self.entries[offset:offset + limit])
+        ]
+
+    def update(self, entry):
+        old = self.by_student.get(entry[2])
+        if old == entry:
+            return
+        if old is not None:
+            del self.entries[bisect_left(self.entries, old)]
+        insort(self.entries, entry)
+        self.by_student[entry[2]] = entry
+
+
+def _entry(student_id, score, completed_at):
+    timestamp = completed_at.timestamp() if completed_at else float('inf')
+    return (-(score or 0), timestamp, student_id)
+
+
+def _load_entries(scope, scope_id, student_id=None):
+    from .models import QuizBestScore
+
+    rows = QuizBestScore.objects.filter(best_attempt__isnull=False)
+    if student_id is not None:
+        rows = rows.filter(student_id=student_id)
+
+    if scope == QUIZ:
+        rows = rows.filter(quiz_id=scope_id).values_list('student_id', 'best_score', 'best_completed_at')
+    else:
+        # A course ranks the sum of best scores over its quizzes; ties go to
+        # whoever reached their total first
+        rows = rows.filter(quiz__course_id=scope_id).order_by().values(
+            'student_id'
+        ).annotate(
+            total=Sum('best_score'),
+            reached_at=Max('best_completed_at')
+        ).values_list('student_id', 'total', 'reached_at')
+    return [_entry(*row) for row in rows.iterator()]
+
+
+def _version(scope, scope_id):
+    """
+    The version of a leaderboard as stored in the database.
+
+    A quiz leaderboard follows its quiz's leaderboard_version. A course
+    leaderboard follows the (quiz id, version) pairs of all its quizzes, so
+    it also moves on when a quiz is added or deleted.
+    """
+    from .models import Quiz
+
+    if scope == QUIZ:
+        return Quiz.objects.filter(pk=scope_id).values_list('leaderboard_version', flat=True).first()
+    return tuple(
+        Quiz.objects.filter(course_id=scope_id).order_by('id').values_list('id', 'leaderboard_version')
+    )
+
+
+def _bump(quiz_ids=None):
+    from .models import Quiz
+
+    quizzes = Quiz.objects.all() if quiz_ids is None else Quiz.objects.filter(id__in=quiz_ids)
+    quizzes.update(leaderboard_version=F('leaderboard_version') + 1)
+
+
+def get_leaderboard(scope, scope_id):
+    """
+    The ranked index of a quiz or course leaderboard, loaded if needed.
+
+    Each process keeps the indexes it has served and applies its own
+    graded attempts to them in place. The version stored on the quizzes
+    tells it when another process changed a leaderboard, in which case the
+    index is reloaded from QuizBestScore in one ordered query.
+    """
+    version = _version(scope, scope_id)
+    with _indexes_lock:
+        index = _indexes.get((scope, scope_id))
+        if index is not None and index.version == version:
+            return index
+
+    index = RankedIndex(version, _load_entries(scope, scope_id))
+    with _indexes_lock:
+        _indexes[(scope, scope_id)] = index
+    return index
+
+
+def _with_quiz_version(versions, quiz_id, version):
+    return tuple((other_id, version if other_id == quiz_id else other) for other_id, other in versions)
+
+
+def _apply(scope, scope_id, student_id, quiz_id, version):
+    key = (scope, scope_id)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            return
+        if scope == QUIZ:
+            previous, current = version - 1, version
+        else:
+            previous = _with_quiz_version(index.version, quiz_id, version - 1)
+            current = _with_quiz_version(index.version, quiz_id, version)
+        if index.version != previous or previous == current:
+            # Another process got there first; reload on next read
+            del _indexes[key]
+            return
+
+    entries = _load_entries(scope, scope_id, student_id=student_id)
+    with _indexes_lock:
+        if _indexes.get(key) is index:
+            for entry in entries:
+                index.update(entry)
+            index.version = current
+
+
+def record_leaderboard_score(quiz, student_id):
+    """
+    Move a student on the quiz and course leaderboards after their best score changed.
+
+    The quiz's leaderboard_version is bumped in the caller's transaction,
+    so other processes reload once the new score commits. This process's
+    own indexes are updated in place after the commit, if they were
+    current up to this change.
+    """
+    from .models import Quiz
+
+    _bump([quiz.id])
+    version = Quiz.objects.filter(pk=quiz.id).values_list('leaderboard_version', flat=True).get()
+    quiz_id, course_id = quiz.id, quiz.course_id
+
+    def apply():
+        _apply(QUIZ, quiz_id, student_id, quiz_id, version)
+        _apply(COURSE, course_id, student_id, quiz_id, version)
+    transaction.on_commit(apply)
+
+
+def invalidate_leaderboards(quiz_ids=None):
+    """
+    Make the given quizzes' leaderboards, and their courses', reload on next read.
+
+    Without quiz_ids every leaderboard is invalidated.
+    """
+    _bump(quiz_ids)
+
+
+def leaderboard_standing(scope, scope_id, student_id, offset=0, limit=10):
+    """
+    A page of a leaderboard plus the student's own position.
+
+    Returns {'total', 'results', 'me'} where each row is a dict with
+    rank, student_id and score; 'me' is None if the student has no
+    completed attempt on the leaderboard.
+    """
+    index = get_leaderboard(scope, scope_id)
+
+    def row(rank, entry):
+        return {'rank': rank, 'student_id': entry[2], 'score': -entry[0]}
+
+    with _indexes_lock:
+        rank = index.rank(student_id)
+        return {
+            'total': len(index),
+            'results': [row(position, entry) for position, entry in index.page(offset, limit)],
+            'me': row(rank, index.by_student[student_id]) if rank is not None else None,
+        }
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from quizzes.deadlines import expire_due_attempts
+
+
+class Command(BaseCommand):
+    help = "Submit and grade quiz attempts whose time limit has run out"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Attempts graded per batch'
+        )
+
+    def handle(self, *args, **options):
+        expired = expire_due_attempts(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Expired {expired} quiz attempt(s)"))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from quizzes.models import Quiz
+from quizzes.question_bank import FORMATS, guess_format, iter_jsonl, iter_qti
+
+
+class Command(BaseCommand):
+    help = "Write a quiz's questions to a JSON Lines or QTI-like XML question bank"
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_id', type=int, help='Quiz to export')
+        parser.add_argument('path', help='Question bank file to write')
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            dest='file_format',
+            help='File format (default: guessed from the extension)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            quiz = Quiz.objects.get(id=options['quiz_id'])
+        except Quiz.DoesNotExist:
+            raise CommandError(f"Quiz {options['quiz_id']} does not exist")
+
+        file_format = options['file_format'] or guess_format(options['path'])
+        chunks = iter_qti(quiz) if file_format == 'qti' else iter_jsonl(quiz)
+        try:
+            with open(options['path'], 'w', encoding='utf-8') as stream:
+                stream.writelines(chunks)
+        except OSError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f"Exported {quiz.questions.count()} question(s) from {quiz}"))
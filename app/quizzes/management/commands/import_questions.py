@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+from quizzes.models import Quiz
+from quizzes.question_bank import (
+    FORMATS, QuestionBankError, guess_format, import_questions, read_question_bank
+)
+
+
+class Command(BaseCommand):
+    help = "Add questions to a quiz from a JSON Lines or QTI-like XML question bank"
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_id', type=int, help='Quiz to add the questions to')
+        parser.add_argument('path', help='Question bank file')
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            dest='file_format',
+            help='File format (default: guessed from the extension)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            quiz = Quiz.objects.get(id=options['quiz_id'])
+        except Quiz.DoesNotExist:
+            raise CommandError(f"Quiz {options['quiz_id']} does not exist")
+
+        file_format = options['file_format'] or guess_format(options['path'])
+        try:
+            with open(options['path'], 'rb') as stream:
+                imported = import_questions(quiz, read_question_bank(stream, file_format))
+        except OSError as e:
+            raise CommandError(str(e))
+        except IntegrityError:
+            raise CommandError('Another import into this quiz is in progress, please retry')
+        except (QuestionBankError, UnicodeDecodeError) as e:
+            for error in getattr(e, 'errors', []):
+                self.stderr.write(f"Line {error['line']}: {error['error']}")
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {imported} question(s) into {quiz}"))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from quizzes.scores import rebuild_best_scores
+
+
+class Command(BaseCommand):
+    help = "Rebuild per-student quiz best scores and attempt counts from quiz attempts"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--quiz',
+            type=int,
+            action='append',
+            dest='quiz_ids',
+            help='Only rebuild summaries for this quiz id (repeatable)'
+        )
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_best_scores(quiz_ids=options['quiz_ids'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} best score summary(ies)"))
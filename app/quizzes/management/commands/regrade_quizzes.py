@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+from quizzes.models import Quiz
+from quizzes.regrade import regrade_quiz
+
+
+class Command(BaseCommand):
+    help = "Regrade completed quiz attempts against the current answer keys"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--quiz',
+            type=int,
+            action='append',
+            dest='quiz_ids',
+            help='Regrade this quiz id (repeatable)'
+        )
+        parser.add_argument(
+            '--course',
+            type=int,
+            action='append',
+            dest='course_ids',
+            help='Regrade every quiz of this course id (repeatable)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would change without saving'
+        )
+
+    def handle(self, *args, **options):
+        if not options['quiz_ids'] and not options['course_ids']:
+            raise CommandError('Pass --quiz or --course')
+
+        quizzes = Quiz.objects.none()
+        if options['quiz_ids']:
+            quizzes |= Quiz.objects.filter(id__in=options['quiz_ids'])
+        if options['course_ids']:
+            quizzes |= Quiz.objects.filter(course_id__in=options['course_ids'])
+
+        for quiz in quizzes.order_by('id'):
+            report = regrade_quiz(quiz, dry_run=options['dry_run'])
+            self.stdout.write(
+                f"{quiz}: {report['attempts_changed']} of {report['attempts_checked']} attempt(s) changed, "
+                f"{len(report['failed_to_passed'])} now passing, {len(report['passed_to_failed'])} now failing"
+            )
+
+        verb = 'Checked' if options['dry_run'] else 'Regraded'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {quizzes.count()} quiz(zes)"))
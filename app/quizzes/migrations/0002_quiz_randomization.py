@@ -0,0 +1,24 @@
+# Generated by Django 5.0.4 on 2026-10-19 07:56
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='questions_per_attempt',
+            field=models.PositiveIntegerField(blank=True, help_text='Draw this many random questions for each attempt (leave blank to ask all)', null=True, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='shuffle_answers',
+            field=models.BooleanField(default=False, help_text='Shuffle answer choices for each attempt'),
+        ),
+    ]
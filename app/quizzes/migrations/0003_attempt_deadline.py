@@ -0,0 +1,48 @@
+# Generated by Django 5.0.4 on 2026-10-19 07:58
+
+from django.conf import settings
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def backfill_deadlines(apps, schema_editor):
+    QuizAttempt = apps.get_model('quizzes', 'QuizAttempt')
+
+    attempts = QuizAttempt.objects.filter(
+        is_completed=False,
+        quiz__time_limit_minutes__isnull=False
+    ).select_related('quiz')
+
+    updated = []
+    for attempt in attempts.iterator(chunk_size=500):
+        if attempt.quiz.time_limit_minutes:
+            attempt.deadline = attempt.started_at + timedelta(minutes=attempt.quiz.time_limit_minutes)
+            updated.append(attempt)
+    QuizAttempt.objects.bulk_update(updated, ['deadline'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0002_quiz_randomization'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizattempt',
+            name='deadline',
+            field=models.DateTimeField(blank=True, help_text='When the time limit runs out (blank for no limit)', null=True),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='timed_out',
+            field=models.BooleanField(default=False, help_text='Submitted automatically when the time limit ran out'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(condition=models.Q(('is_completed', False)), fields=['deadline'], name='quiz_attempt_open_deadline'),
+        ),
+        migrations.RunPython(backfill_deadlines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.0.4 on 2026-10-19 08:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_best_scores(apps, schema_editor):
+    QuizAttempt = apps.get_model('quizzes', 'QuizAttempt')
+    QuizBestScore = apps.get_model('quizzes', 'QuizBestScore')
+
+    completed = Q(is_completed=True)
+    best_attempt = QuizAttempt.objects.filter(
+        student_id=OuterRef('student_id'),
+        quiz_id=OuterRef('quiz_id'),
+        is_completed=True
+    ).order_by('-score', 'completed_at', 'id').values('id')[:1]
+
+    rows = QuizAttempt.objects.order_by().values('student_id', 'quiz_id').annotate(
+        used=Count('id'),
+        completed_count=Count('id', filter=completed),
+        top_score=Coalesce(Max('score', filter=completed), 0),
+        passed_count=Count('id', filter=completed & Q(passed=True)),
+        last_started=Max('started_at'),
+        top_attempt=Subquery(best_attempt)
+    )
+
+    QuizBestScore.objects.bulk_create([
+        QuizBestScore(
+            student_id=row['student_id'],
+            quiz_id=row['quiz_id'],
+            best_attempt_id=row['top_attempt'],
+            best_score=row['top_score'],
+            attempts_used=row['used'],
+            completed_attempts=row['completed_count'],
+            passed=row['passed_count'] > 0,
+            last_attempt_at=row['last_started']
+        )
+        for row in rows
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0003_attempt_deadline'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizBestScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('best_score', models.PositiveIntegerField(default=0)),
+                ('attempts_used', models.PositiveIntegerField(default=0, help_text='Attempts started, completed or not')),
+                ('completed_attempts', models.PositiveIntegerField(default=0)),
+                ('passed', models.BooleanField(default=False)),
+                ('last_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('best_attempt', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='quizzes.quizattempt')),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='best_scores', to='quizzes.quiz')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quiz_best_scores', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('student', 'quiz')},
+            },
+        ),
+        migrations.RunPython(backfill_best_scores, migrations.RunPython.noop),
+    ]
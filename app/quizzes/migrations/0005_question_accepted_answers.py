@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-19 08:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0004_quizbestscore'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='accepted_answers',
+            field=models.JSONField(blank=True, default=list, help_text='Short answer matching rules, e.g. [{"type": "numeric", "value": 3.14, "tolerance": 0.01}]'),
+        ),
+    ]
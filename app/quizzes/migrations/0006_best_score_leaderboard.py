@@ -0,0 +1,37 @@
+# Generated by Django 5.0.4 on 2026-10-19 08:13
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_best_completed_at(apps, schema_editor):
+    QuizAttempt = apps.get_model('quizzes', 'QuizAttempt')
+    QuizBestScore = apps.get_model('quizzes', 'QuizBestScore')
+
+    QuizBestScore.objects.filter(best_attempt__isnull=False).update(
+        best_completed_at=Subquery(
+            QuizAttempt.objects.filter(id=OuterRef('best_attempt_id')).values('completed_at')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0005_question_accepted_answers'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizbestscore',
+            name='best_completed_at',
+            field=models.DateTimeField(blank=True, help_text='When the best attempt was completed; breaks leaderboard ties', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='quizbestscore',
+            index=models.Index(condition=models.Q(('best_attempt__isnull', False)), fields=['quiz', '-best_score', 'best_completed_at', 'student'], name='quiz_best_score_leaderboard'),
+        ),
+        migrations.RunPython(backfill_best_completed_at, migrations.RunPython.noop),
+    ]
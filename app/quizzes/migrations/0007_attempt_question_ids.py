@@ -0,0 +1,56 @@
+# Generated by Django 5.0.4 on 2026-10-19 08:23
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def _rank(attempt_id, kind, item_id):
+    digest = hashlib.blake2b(f"{kind}:{attempt_id}:{item_id}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def freeze_drawn_questions(apps, schema_editor):
+    """Store existing attempts' draws, from the questions that existed when they started"""
+    Question = apps.get_model('quizzes', 'Question')
+    QuizAttempt = apps.get_model('quizzes', 'QuizAttempt')
+
+    banks = {}
+    for quiz_id, question_id, created_at in Question.objects.order_by('order').values_list(
+        'quiz_id', 'id', 'created_at'
+    ):
+        banks.setdefault(quiz_id, []).append((question_id, created_at))
+
+    updated = []
+    for attempt in QuizAttempt.objects.select_related('quiz').iterator(chunk_size=500):
+        quiz = attempt.quiz
+        question_ids = [
+            question_id for question_id, created_at in banks.get(quiz.id, [])
+            if created_at <= attempt.started_at
+        ]
+        if quiz.questions_per_attempt and quiz.questions_per_attempt < len(question_ids):
+            drawn = set(sorted(
+                question_ids, key=lambda question_id: _rank(attempt.id, 'draw', question_id)
+            )[:quiz.questions_per_attempt])
+            question_ids = [question_id for question_id in question_ids if question_id in drawn]
+        if quiz.randomize_questions:
+            question_ids.sort(key=lambda question_id: _rank(attempt.id, 'question', question_id))
+        attempt.question_ids = question_ids
+        updated.append(attempt)
+    QuizAttempt.objects.bulk_update(updated, ['question_ids'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0006_best_score_leaderboard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizattempt',
+            name='question_ids',
+            field=models.JSONField(blank=True, help_text='Questions drawn for this attempt in presentation order, fixed when it starts', null=True),
+        ),
+        migrations.RunPython(freeze_drawn_questions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-19 08:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0007_attempt_question_ids'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='leaderboard_version',
+            field=models.PositiveBigIntegerField(default=0, editable=False, help_text="Bumped whenever the quiz's leaderboard changes, so every process knows to reload it"),
+        ),
+    ]
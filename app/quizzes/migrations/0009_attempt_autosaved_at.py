@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-19 09:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0008_quiz_leaderboard_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizattempt',
+            name='autosaved_at',
+            field=models.DateTimeField(blank=True, help_text='When answers were last autosaved, used to coalesce saves', null=True),
+        ),
+    ]
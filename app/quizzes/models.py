@@ -38,10 +38,25 @@ class Quiz(models.Model):
         default=False,
         help_text="Randomize question order for each attempt"
     )
+    shuffle_answers = models.BooleanField(
+        default=False,
+        help_text="Shuffle answer choices for each attempt"
+    )
+    questions_per_attempt = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(1)],
+        help_text="Draw this many random questions for each attempt (leave blank to ask all)"
+    )
     show_results_immediately = models.BooleanField(
         default=True,
         help_text="Show results immediately after submission"
     )
+    leaderboard_version = models.PositiveBigIntegerField(
+        default=0,
+        editable=False,
+        help_text="Bumped whenever the quiz's leaderboard changes, so every process knows to reload it"
+    )
 
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -54,6 +69,16 @@ class Quiz(models.Model):
     def __str__(self):
         return f"{self.course.title} - {self.title}"
 
+    def save(self, *args, **kwargs):
+        # leaderboard_version is only changed through F() UPDATEs, so a full
+        # save of a stale instance must not overwrite it
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'leaderboard_version'
+            ]
+        super().save(*args, **kwargs)
+
     @property
     def question_count(self):
         return self.questions.count()
@@ -89,6 +114,12 @@ class Question(models.Model):
     )
     order = models.PositiveIntegerField(default=1)
 
+    accepted_answers = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Short answer matching rules, e.g. [{\"type\": \"numeric\", \"value\": 3.14, \"tolerance\": 0.01}]"
+    )
+
     # Optional explanation
     explanation = models.TextField(
         blank=True,
@@ -146,6 +177,16 @@ class QuizAttempt(models.Model):
     attempt_number = models.PositiveIntegerField(default=1)
     started_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
+    deadline = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When the time limit runs out (blank for no limit)"
+    )
+    question_ids = models.JSONField(
+        null=True,
+        blank=True,
+        help_text="Questions drawn for this attempt in presentation order, fixed when it starts"
+    )
 
     # Scoring
     score = models.PositiveIntegerField(
@@ -158,23 +199,44 @@ class QuizAttempt(models.Model):
     # Status
     is_completed = models.BooleanField(default=False)
     passed = models.BooleanField(default=False)
+    timed_out = models.BooleanField(
+        default=False,
+        help_text="Submitted automatically when the time limit ran out"
+    )
+    autosaved_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When answers were last autosaved, used to coalesce saves"
+    )
 
     class Meta:
         ordering = ['-started_at']
         unique_together = ['quiz', 'student', 'attempt_number']
+        indexes = [
+            # Only open attempts, so the expiry sweep stays small however many attempts pile up
+            models.Index(
+                fields=['deadline'],
+                condition=models.Q(is_completed=False),
+                name='quiz_attempt_open_deadline'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.student.username} - {self.quiz.title} (Attempt {self.attempt_number})"
 
     def calculate_score(self):
         """Calculate the score for this attempt"""
+        from .randomization import attempt_question_ids
+
         if not self.is_completed:
             return 0
 
         total_earned = sum(
             response.points_earned for response in self.responses.all()
         )
-        total_possible = self.quiz.total_points
+        total_possible = self.quiz.questions.filter(
+            id__in=attempt_question_ids(self)
+        ).aggregate(total=models.Sum('points'))['total'] or 0
 
         if total_possible > 0:
             percentage = (total_earned / total_possible) * 100
@@ -187,6 +249,58 @@ class QuizAttempt(models.Model):
         return self.score
 
 
+class QuizBestScore(models.Model):
+    """Each student's attempt count and best result per quiz, maintained on start and grading"""
+
+    student = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='quiz_best_scores'
+    )
+    quiz = models.ForeignKey(
+        Quiz,
+        on_delete=models.CASCADE,
+        related_name='best_scores'
+    )
+    best_attempt = models.ForeignKey(
+        QuizAttempt,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+
+    best_score = models.PositiveIntegerField(default=0)
+    best_completed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When the best attempt was completed; breaks leaderboard ties"
+    )
+    attempts_used = models.PositiveIntegerField(
+        default=0,
+        help_text="Attempts started, completed or not"
+    )
+    completed_attempts = models.PositiveIntegerField(default=0)
+    passed = models.BooleanField(default=False)
+    last_attempt_at = models.DateTimeField(null=True, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['student', 'quiz']
+        indexes = [
+            # Leaderboard order, so ranks and top-N pages read an index range
+            models.Index(
+                fields=['quiz', '-best_score', 'best_completed_at', 'student'],
+                condition=models.Q(best_attempt__isnull=False),
+                name='quiz_best_score_leaderboard'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.student.username} - {self.quiz.title}: {self.best_score}"
+
+
 class QuizResponse(models.Model):
     """Student responses to quiz questions"""
 
@@ -229,18 +343,10 @@ class QuizResponse(models.Model):
 
     def check_answer(self):
         """Check if the answer is correct and assign points"""
-        if self.question.question_type in ['multiple_choice', 'true_false']:
-            if self.selected_answer and self.selected_answer.is_correct:
-                self.is_correct = True
-                self.points_earned = self.question.points
-            else:
-                self.is_correct = False
-                self.points_earned = 0
-        elif self.question.question_type == 'short_answer':
-            # For short answer, manual grading might be needed
-            # For now, we'll mark it as correct if there's an answer
-            self.is_correct = bool(self.text_answer.strip())
-            self.points_earned = self.question.points if self.is_correct else 0
+        from .grading import grade_response
 
+        self.is_correct, self.points_earned = grade_response(
+            self.question, self.selected_answer_id, self.text_answer
+        )
         self.save()
         return self.is_correct
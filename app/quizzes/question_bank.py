@@ -0,0 +1,264 @@
+import io
+import json
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape, quoteattr
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+
+from .short_answers import AcceptedAnswerError, compile_accepted_answers
+
+FORMATS = ('jsonl', 'qti')
+QUESTION_TYPES = ('multiple_choice', 'true_false', 'short_answer')
+INSERT_BATCH_SIZE = 1000
+MAX_ERRORS = 100
+
+
+class QuestionBankError(ValueError):
+    """Raised when a question bank file can't be imported"""
+
+    def __init__(self, message, errors=()):
+        super().__init__(message)
+        self.errors = list(errors)
+
+
+def max_questions():
+    return getattr(settings, 'QUIZ_IMPORT_MAX_QUESTIONS', 20000)
+
+
+def guess_format(filename):
+    return 'qti' if filename.lower().endswith('.xml') else 'jsonl'
+
+
+def read_question_bank(stream, file_format):
+    """Records of a binary question bank stream in the given format"""
+    if file_format not in FORMATS:
+        raise QuestionBankError(f"file_format must be one of: {', '.join(FORMATS)}")
+    if file_format == 'qti':
+        return read_qti(stream)
+    return read_jsonl(io.TextIOWrapper(stream, encoding='utf-8-sig'))
+
+
+def clean_question(record):
+    """
+    Validate one question record and return (question_fields, answers).
+
+    Raises ValueError with a message describing the first problem.
+    """
+    if not isinstance(record, dict):
+        raise ValueError('Expected a JSON object')
+
+    text = str(record.get('question_text') or '').strip()
+    if not text:
+        raise ValueError('question_text is required')
+
+    question_type = record.get('question_type', 'multiple_choice')
+    if question_type not in QUESTION_TYPES:
+        raise ValueError(f"Unknown question_type {question_type!r}")
+
+    points = record.get('points', 1)
+    if isinstance(points, bool) or not isinstance(points, int) or points < 1:
+        raise ValueError('points must be a positive integer')
+
+    accepted_answers = record.get('accepted_answers') or []
+    try:
+        compile_accepted_answers(accepted_answers)
+    except AcceptedAnswerError as e:
+        raise ValueError(str(e))
+
+    answers = []
+    for answer in record.get('answers') or []:
+        if not isinstance(answer, dict) or not str(answer.get('answer_text') or '').strip():
+            raise ValueError('Every answer needs an answer_text')
+        answer_text = str(answer['answer_text']).strip()
+        if len(answer_text) > 500:
+            raise ValueError('Answers can be at most 500 characters')
+        answers.append((answer_text, bool(answer.get('is_correct', False))))
+
+    fields = {
+        'question_text': text,
+        'question_type': question_type,
+        'points': points,
+        'explanation': str(record.get('explanation') or ''),
+        'accepted_answers': accepted_answers,
+    }
+    return fields, answers
+
+
+def read_jsonl(stream):
+    """Yield (line_number, record) for each non-blank line of a JSON Lines stream"""
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as e:
+            yield line_number, QuestionBankError(f"Invalid JSON: {e}")
+
+
+def read_qti(stream):
+    """
+    Yield (item_number, record) for each <item> of a QTI-like XML stream.
+
+    Items are parsed incrementally and discarded once read, so large
+    banks don't build the whole document tree in memory.
+    """
+    number = 0
+    try:
+        for _, element in ElementTree.iterparse(stream, events=('end',)):
+            if element.tag != 'item':
+                continue
+            number += 1
+            yield number, _qti_record(element)
+            element.clear()
+    except ElementTree.ParseError as e:
+        raise QuestionBankError(f"Invalid XML: {e}")
+
+
+def _qti_record(item):
+    def text_of(element):
+        return ''.join(element.itertext()).strip() if element is not None else ''
+
+    record = {
+        'question_type': item.get('type', 'multiple_choice'),
+        'question_text': text_of(item.find('presentation/material/mattext')),
+        'explanation': text_of(item.find('itemfeedback/mattext')),
+        'answers': [
+            {'answer_text': text_of(label), 'is_correct': label.get('correct') == 'true'}
+            for label in item.iterfind('presentation/response_lid/render_choice/response_label')
+        ],
+        'accepted_answers': [],
+    }
+
+    points = item.get('points')
+    if points is not None:
+        record['points'] = int(points) if points.isdigit() else points
+
+    for accepted in item.iterfind('presentation/response_str/accepted_answer'):
+        spec = dict(accepted.attrib)
+        spec['value'] = text_of(accepted)
+        if 'case_sensitive' in spec:
+            spec['case_sensitive'] = spec['case_sensitive'] == 'true'
+        # Attributes are strings; restore the numbers the matchers expect
+        for option, convert in (('value', float), ('tolerance', float), ('max_distance', int)):
+            if option in spec and (option != 'value' or spec.get('type') == 'numeric'):
+                try:
+                    spec[option] = convert(spec[option])
+                except ValueError:
+                    pass
+        record['accepted_answers'].append(spec)
+    return record
+
+
+def import_questions(quiz, records):
+    """
+    Validate a question bank and add its questions to a quiz.
+
+    records yields (line_number, record) pairs, e.g. from read_jsonl or
+    read_qti. They are validated one by one as they are read and only
+    compact tuples are kept. If any record is invalid nothing is imported and a
+    QuestionBankError lists the problems by line (JSON Lines) or item
+    number (QTI). Otherwise questions are inserted with bulk_create,
+    numbered after the quiz's last question, followed by their answers.
+    The quiz row is locked while they are numbered; databases without row
+    locks may still raise IntegrityError for a concurrent import.
+    Returns the number of questions imported.
+    """
+    from .models import Answer, Question, Quiz
+    from .randomization import forget_quiz_layout
+
+    limit = max_questions()
+
+    cleaned, errors = [], []
+    for number, record in records:
+        if len(cleaned) + len(errors) >= limit:
+            raise QuestionBankError(f"At most {limit} questions per import")
+        try:
+            if isinstance(record, QuestionBankError):
+                raise record
+            cleaned.append(clean_question(record))
+        except ValueError as e:
+            errors.append({'line': number, 'error': str(e)})
+            if len(errors) >= MAX_ERRORS:
+                break
+
+    if errors:
+        raise QuestionBankError('The question bank has invalid questions', errors)
+    if not cleaned:
+        raise QuestionBankError('The question bank is empty')
+
+    with transaction.atomic():
+        # Lock the quiz so concurrent imports number their questions one after the other
+        Quiz.objects.select_for_update().filter(pk=quiz.pk).exists()
+        start = (quiz.questions.aggregate(last=Max('order'))['last'] or 0) + 1
+        questions = Question.objects.bulk_create(
+            [
+                Question(quiz=quiz, order=start + index, **fields)
+                for index, (fields, _) in enumerate(cleaned)
+            ],
+            batch_size=INSERT_BATCH_SIZE
+        )
+        Answer.objects.bulk_create(
+            [
+                Answer(question=question, answer_text=text, is_correct=is_correct, order=order)
+                for question, (_, answers) in zip(questions, cleaned)
+                for order, (text, is_correct) in enumerate(answers, start=1)
+            ],
+            batch_size=INSERT_BATCH_SIZE
+        )
+    forget_quiz_layout(quiz.id)
+    return len(questions)
+
+
+def _export_questions(quiz):
+    return quiz.questions.order_by('order').prefetch_related('answers').iterator(chunk_size=INSERT_BATCH_SIZE)
+
+
+def iter_jsonl(quiz):
+    """Yield a quiz's questions as JSON Lines, one question per line"""
+    for question in _export_questions(quiz):
+        yield json.dumps({
+            'question_text': question.question_text,
+            'question_type': question.question_type,
+            'points': question.points,
+            'explanation': question.explanation,
+            'accepted_answers': question.accepted_answers,
+            'answers': [
+                {'answer_text': answer.answer_text, 'is_correct': answer.is_correct}
+                for answer in question.answers.all()
+            ],
+        }, ensure_ascii=False) + '\n'
+
+
+def iter_qti(quiz):
+    """Yield a quiz's questions as the QTI-like XML read by read_qti"""
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n<questestinterop>\n'
+    for question in _export_questions(quiz):
+        parts = [
+            f'  <item ident="q{question.id}" type={quoteattr(question.question_type)} points="{question.points}">\n',
+            '    <presentation>\n',
+            f'      <material><mattext>{escape(question.question_text)}</mattext></material>\n',
+        ]
+        answers = list(question.answers.all())
+        if answers:
+            parts.append('      <response_lid><render_choice>\n')
+            for answer in answers:
+                correct = ' correct="true"' if answer.is_correct else ''
+                parts.append(f'        <response_label ident="a{answer.id}"{correct}>{escape(answer.answer_text)}</response_label>\n')
+            parts.append('      </render_choice></response_lid>\n')
+        if question.accepted_answers:
+            parts.append('      <response_str>\n')
+            for spec in question.accepted_answers:
+                attributes = ''.join(
+                    f' {name}={quoteattr(str(value).lower() if isinstance(value, bool) else str(value))}'
+                    for name, value in spec.items() if name != 'value'
+                )
+                parts.append(f'        <accepted_answer{attributes}>{escape(str(spec.get("value", "")))}</accepted_answer>\n')
+            parts.append('      </response_str>\n')
+        parts.append('    </presentation>\n')
+        if question.explanation:
+            parts.append(f'    <itemfeedback><mattext>{escape(question.explanation)}</mattext></itemfeedback>\n')
+        parts.append('  </item>\n')
+        yield ''.join(parts)
+    yield '</questestinterop>\n'
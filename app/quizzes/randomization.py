@@ -0,0 +1,118 @@
+import hashlib
+
+from django.core.cache import cache
+
+CACHE_PREFIX = 'quizzes:layout:'
+
+
+def get_quiz_layout(quiz_id):
+    """
+    A quiz's questions in order as [(question_id, [answer_id, ...]), ...].
+
+    Cached until a question or answer of the quiz changes, so laying out
+    an attempt doesn't need to query.
+    """
+    from .models import Answer, Question
+
+    key = f"{CACHE_PREFIX}{quiz_id}"
+    layout = cache.get(key)
+    if layout is not None:
+        return layout
+
+    answers = {}
+    for question_id, answer_id in Answer.objects.filter(
+        question__quiz_id=quiz_id
+    ).order_by('order').values_list('question_id', 'id'):
+        answers.setdefault(question_id, []).append(answer_id)
+
+    layout = [
+        (question_id, answers.get(question_id, []))
+        for question_id in Question.objects.filter(quiz_id=quiz_id).order_by('order').values_list('id', flat=True)
+    ]
+    cache.set(key, layout, None)
+    return layout
+
+
+def forget_quiz_layout(quiz_id):
+    cache.delete(f"{CACHE_PREFIX}{quiz_id}")
+
+
+def _rank(attempt_id, kind, item_id):
+    digest = hashlib.blake2b(f"{kind}:{attempt_id}:{item_id}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def attempt_layout(attempt):
+    """
+    The questions and answer choices an attempt sees, in the order it sees them.
+
+    Each item is ranked by a hash of the attempt id and its own id, which
+    is a seeded permutation: it comes out the same on every reload and at
+    grading time. With questions_per_attempt set, the attempt gets that
+    many questions drawn from the bank. The drawn questions are stored on
+    the attempt by freeze_attempt_layout when it starts, so questions
+    added to or removed from the bank later don't change what it asks;
+    a question deleted outright just drops out.
+    """
+    quiz = attempt.quiz
+    layout = get_quiz_layout(quiz.id)
+
+    if attempt.question_ids is not None:
+        answers = dict(layout)
+        layout = [
+            (question_id, answers[question_id])
+            for question_id in attempt.question_ids if question_id in answers
+        ]
+    else:
+        if quiz.questions_per_attempt and quiz.questions_per_attempt < len(layout):
+            drawn = sorted(layout, key=lambda item: _rank(attempt.id, 'draw', item[0]))
+            drawn = {question_id for question_id, _ in drawn[:quiz.questions_per_attempt]}
+            layout = [item for item in layout if item[0] in drawn]
+
+        if quiz.randomize_questions:
+            layout = sorted(layout, key=lambda item: _rank(attempt.id, 'question', item[0]))
+
+    if quiz.shuffle_answers:
+        layout = [
+            (question_id, sorted(answer_ids, key=lambda answer_id: _rank(attempt.id, 'answer', answer_id)))
+            for question_id, answer_ids in layout
+        ]
+
+    return layout
+
+
+def freeze_attempt_layout(attempt):
+    """Draw a new attempt's questions and store them on it"""
+    attempt.question_ids = [question_id for question_id, _ in attempt_layout(attempt)]
+    attempt.save(update_fields=['question_ids'])
+
+
+def attempt_question_ids(attempt):
+    """Ids of the questions an attempt is asked, in presentation order"""
+    return [question_id for question_id, _ in attempt_layout(attempt)]
+
+
+def attempt_questions(attempt):
+    """
+    Question instances for an attempt in presentation order.
+
+    Each question gets `attempt_answers`, its answer choices in the order
+    this attempt shows them.
+    """
+    layout = attempt_layout(attempt)
+    questions = {
+        question.id: question
+        for question in attempt.quiz.questions.filter(
+            id__in=[question_id for question_id, _ in layout]
+        ).prefetch_related('answers')
+    }
+
+    ordered = []
+    for question_id, answer_ids in layout:
+        question = questions.get(question_id)
+        if question is None:
+            continue
+        answers = {answer.id: answer for answer in question.answers.all()}
+        question.attempt_answers = [answers[answer_id] for answer_id in answer_ids if answer_id in answers]
+        ordered.append(question)
+    return ordered
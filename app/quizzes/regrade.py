@@ -0,0 +1,119 @@
+from django.db import transaction
+
+CHUNK_SIZE = 2000
+
+
+def regrade_quiz(quiz, chunk_size=CHUNK_SIZE, dry_run=False):
+    """
+    Recompute every completed attempt of a quiz against its current answer key.
+
+    The questions and answers are loaded once. Attempts are processed a
+    chunk at a time: their responses are fetched with one query, regraded
+    in memory, and only the responses and attempts whose result changed
+    are written back with bulk_update. Best-score summaries are rebuilt
+    afterwards. Returns a report of what changed, including attempts that
+    flipped between passed and failed.
+    """
+    from .grading import grade_response
+    from .item_analysis import invalidate_item_analysis
+    from .models import QuizAttempt, QuizResponse
+    from .randomization import attempt_question_ids
+    from .scores import rebuild_best_scores
+
+    questions = {
+        question.id: question
+        for question in quiz.questions.prefetch_related('answers')
+    }
+
+    report = {
+        'quiz_id': quiz.id,
+        'attempts_checked': 0,
+        'attempts_changed': 0,
+        'responses_changed': 0,
+        'failed_to_passed': [],
+        'passed_to_failed': [],
+    }
+
+    attempt_ids = QuizAttempt.objects.filter(
+        quiz=quiz,
+        is_completed=True
+    ).order_by('id').values_list('id', flat=True)
+
+    last_id = 0
+    while True:
+        chunk = list(attempt_ids.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            break
+        last_id = chunk[-1]
+
+        attempts = {
+            attempt.id: attempt
+            for attempt in QuizAttempt.objects.filter(id__in=chunk).only(
+                'id', 'quiz_id', 'question_ids', 'score', 'passed',
+                'total_points_earned', 'total_points_possible'
+            )
+        }
+        earned = dict.fromkeys(attempts, 0)
+
+        changed_responses = []
+        for response in QuizResponse.objects.filter(attempt_id__in=chunk).only(
+            'id', 'attempt_id', 'question_id', 'selected_answer_id', 'text_answer',
+            'is_correct', 'points_earned'
+        ):
+            question = questions.get(response.question_id)
+            if question is None:
+                continue
+            is_correct, points = grade_response(question, response.selected_answer_id, response.text_answer)
+            earned[response.attempt_id] += points
+            if (is_correct, points) != (response.is_correct, response.points_earned):
+                response.is_correct = is_correct
+                response.points_earned = points
+                changed_responses.append(response)
+
+        changed_attempts = []
+        for attempt in attempts.values():
+            attempt.quiz = quiz
+            possible = sum(
+                questions[question_id].points
+                for question_id in attempt_question_ids(attempt)
+                if question_id in questions
+            )
+            if possible <= 0:
+                continue
+
+            score = int(earned[attempt.id] / possible * 100)
+            passed = score >= quiz.passing_score
+            if (score, passed, earned[attempt.id], possible) == (
+                attempt.score, attempt.passed, attempt.total_points_earned, attempt.total_points_possible
+            ):
+                continue
+
+            if passed != attempt.passed:
+                report['failed_to_passed' if passed else 'passed_to_failed'].append(attempt.id)
+            attempt.score = score
+            attempt.passed = passed
+            attempt.total_points_earned = earned[attempt.id]
+            attempt.total_points_possible = possible
+            changed_attempts.append(attempt)
+
+        report['attempts_checked'] += len(attempts)
+        report['attempts_changed'] += len(changed_attempts)
+        report['responses_changed'] += len(changed_responses)
+
+        if not dry_run:
+            with transaction.atomic():
+                QuizResponse.objects.bulk_update(
+                    changed_responses, ['is_correct', 'points_earned'], batch_size=500
+                )
+                QuizAttempt.objects.bulk_update(
+                    changed_attempts,
+                    ['score', 'passed', 'total_points_earned', 'total_points_possible'],
+                    batch_size=500
+                )
+
+    if not dry_run:
+        if report['attempts_changed']:
+            rebuild_best_scores(quiz_ids=[quiz.id])
+        if report['responses_changed']:
+            invalidate_item_analysis(quiz.id)
+    return report
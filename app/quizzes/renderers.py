@@ -0,0 +1,18 @@
+from xml.sax.saxutils import escape
+
+from rest_framework.renderers import BaseRenderer
+
+
+class QTIRenderer(BaseRenderer):
+    """Lets clients ask for a QTI-like XML question bank; the view streams it"""
+
+    media_type = 'application/xml'
+    format = 'qti'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Only reached for error responses
+        if data is None:
+            return b''
+        message = data.get('detail') or data.get('error') if isinstance(data, dict) else data
+        return f'<error>{escape(str(message))}</error>'.encode(self.charset)
@@ -0,0 +1,136 @@
+from django.db import transaction
+from django.db.models import Count, Exists, F, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def reserve_attempt(quiz, student):
+    """
+    Take one of a student's attempts at a quiz.
+
+    A conditional UPDATE on the student's summary row bumps attempts_used
+    only while it is below max_attempts, so concurrent starts can't exceed
+    the limit. Call inside a transaction that creates the attempt. Returns
+    the new attempt number, or None if no attempts are left.
+    """
+    from .models import QuizBestScore
+
+    summary, _ = QuizBestScore.objects.get_or_create(student=student, quiz=quiz)
+    reserved = QuizBestScore.objects.filter(
+        pk=summary.pk,
+        attempts_used__lt=quiz.max_attempts
+    ).update(attempts_used=F('attempts_used') + 1, last_attempt_at=timezone.now())
+    if not reserved:
+        return None
+    return QuizBestScore.objects.filter(pk=summary.pk).values_list('attempts_used', flat=True).get()
+
+
+def record_graded_attempt(attempt):
+    """
+    Claim a graded attempt's completion and fold it into its student's summary.
+
+    The attempt is only counted if this call's claim_completion marks it
+    completed, so a second call for the same attempt, e.g. from a
+    concurrent submission or expiry, changes nothing. Call inside the
+    transaction that saves the graded attempt. Returns True if the attempt
+    was claimed and counted.
+    """
+    from .grading import claim_completion
+    from .leaderboard import record_leaderboard_score
+    from .models import QuizBestScore
+
+    if not claim_completion(attempt):
+        return False
+
+    summary, _ = QuizBestScore.objects.get_or_create(
+        student_id=attempt.student_id,
+        quiz_id=attempt.quiz_id,
+        defaults={'attempts_used': attempt.attempt_number, 'last_attempt_at': attempt.started_at}
+    )
+
+    changes = {'completed_attempts': F('completed_attempts') + 1}
+    if attempt.passed:
+        changes['passed'] = True
+    QuizBestScore.objects.filter(pk=summary.pk).update(**changes)
+
+    # Ties keep the earlier attempt as the best
+    improved = QuizBestScore.objects.filter(pk=summary.pk).filter(
+        Q(best_attempt__isnull=True) | Q(best_score__lt=attempt.score)
+    ).update(best_score=attempt.score, best_attempt=attempt, best_completed_at=attempt.completed_at)
+    if improved:
+        record_leaderboard_score(attempt.quiz, attempt.student_id)
+    return True
+
+
+def rebuild_best_scores(quiz_ids=None, student_ids=None):
+    """
+    Recompute best-score summaries from QuizAttempt.
+
+    One grouped query computes every (student, quiz) summary, which is then
+    upserted over the existing rows in the same transaction; summaries left
+    without any attempts are deleted. The affected leaderboards are
+    reloaded from them. Use after attempts were changed in
+    bulk, e.g. by regrading. Returns the number of rows.
+    """
+    from .leaderboard import invalidate_leaderboards
+    from .models import QuizAttempt, QuizBestScore
+
+    attempts = QuizAttempt.objects.all()
+    summaries = QuizBestScore.objects.all()
+    if quiz_ids is not None:
+        attempts = attempts.filter(quiz_id__in=quiz_ids)
+        summaries = summaries.filter(quiz_id__in=quiz_ids)
+    if student_ids is not None:
+        attempts = attempts.filter(student_id__in=student_ids)
+        summaries = summaries.filter(student_id__in=student_ids)
+
+    completed = Q(is_completed=True)
+    best_attempt = QuizAttempt.objects.filter(
+        student_id=OuterRef('student_id'),
+        quiz_id=OuterRef('quiz_id'),
+        is_completed=True
+    ).order_by('-score', 'completed_at', 'id')
+
+    rows = attempts.order_by().values('student_id', 'quiz_id').annotate(
+        used=Count('id'),
+        completed_count=Count('id', filter=completed),
+        top_score=Coalesce(Max('score', filter=completed), 0),
+        passed_count=Count('id', filter=completed & Q(passed=True)),
+        last_started=Max('started_at'),
+        top_attempt=Subquery(best_attempt.values('id')[:1]),
+        top_completed_at=Subquery(best_attempt.values('completed_at')[:1])
+    )
+
+    rebuilt = [
+        QuizBestScore(
+            student_id=row['student_id'],
+            quiz_id=row['quiz_id'],
+            best_attempt_id=row['top_attempt'],
+            best_score=row['top_score'],
+            best_completed_at=row['top_completed_at'],
+            attempts_used=row['used'],
+            completed_attempts=row['completed_count'],
+            passed=row['passed_count'] > 0,
+            last_attempt_at=row['last_started']
+        )
+        for row in rows.iterator()
+    ]
+
+    with transaction.atomic():
+        QuizBestScore.objects.bulk_create(
+            rebuilt,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['student', 'quiz'],
+            update_fields=[
+                'best_attempt', 'best_score', 'best_completed_at', 'attempts_used',
+                'completed_attempts', 'passed', 'last_attempt_at', 'updated_at',
+            ]
+        )
+        # Summaries whose attempts are all gone
+        summaries.filter(~Exists(QuizAttempt.objects.filter(
+            student_id=OuterRef('student_id'),
+            quiz_id=OuterRef('quiz_id')
+        ))).delete()
+        invalidate_leaderboards(quiz_ids)
+    return len(rebuilt)
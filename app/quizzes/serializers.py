@@ -1,5 +1,8 @@
+from django.db import transaction
 from rest_framework import serializers
 from .models import Quiz, Question, Answer, QuizAttempt, QuizResponse
+from .randomization import forget_quiz_layout
+from .short_answers import AcceptedAnswerError, compile_accepted_answers
 
 
 class AnswerSerializer(serializers.ModelSerializer):
@@ -12,10 +15,12 @@ class AnswerSerializer(serializers.ModelSerializer):
 
 class AnswerCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating answer choices (includes is_correct for instructors)"""
+    # Identifies an existing answer when a question is edited
+    id = serializers.IntegerField(required=False)
     
     class Meta:
         model = Answer
-        fields = ['answer_text', 'is_correct', 'order']
+        fields = ['id', 'answer_text', 'is_correct', 'order']
 
 
 class QuestionSerializer(serializers.ModelSerializer):
@@ -30,6 +35,11 @@ class QuestionSerializer(serializers.ModelSerializer):
         ]
 
 
+class AttemptQuestionSerializer(QuestionSerializer):
+    """Serializer for a question as laid out for one attempt (student view)"""
+    answers = AnswerSerializer(source='attempt_answers', many=True, read_only=True)
+
+
 class QuestionDetailSerializer(serializers.ModelSerializer):
     """Serializer for question details (instructor view)"""
     answers = AnswerCreateSerializer(many=True, read_only=True)
@@ -38,7 +48,8 @@ class QuestionDetailSerializer(serializers.ModelSerializer):
         model = Question
         fields = [
             'id', 'question_text', 'question_type', 'points',
-            'order', 'explanation', 'answers', 'created_at', 'updated_at'
+            'order', 'explanation', 'accepted_answers', 'answers',
+            'created_at', 'updated_at'
         ]
 
 
@@ -50,35 +61,132 @@ class QuestionCreateUpdateSerializer(serializers.ModelSerializer):
         model = Question
         fields = [
             'question_text', 'question_type', 'points', 'order',
-            'explanation', 'answers'
+            'explanation', 'accepted_answers', 'answers'
         ]
+
+    def validate_answers(self, value):
+        if self.instance is None:
+            # New answers without an order get the field default
+            default = Answer._meta.get_field('order').default
+            orders = [answer.get('order', default) for answer in value]
+        else:
+            # Edits keep the stored order of answers sent without one; the
+            # final orders are checked once they are matched in _sync_answers
+            orders = [answer['order'] for answer in value if 'order' in answer]
+        if len(orders) != len(set(orders)):
+            raise serializers.ValidationError("Answer orders must be unique")
+        ids = [answer['id'] for answer in value if 'id' in answer]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError("Each answer can only be listed once")
+        return value
+
+    def validate_accepted_answers(self, value):
+        try:
+            compile_accepted_answers(value)
+        except AcceptedAnswerError as e:
+            raise serializers.ValidationError(str(e))
+        return value
     
     def create(self, validated_data):
         answers_data = validated_data.pop('answers', [])
-        question = Question.objects.create(**validated_data)
-        
-        for answer_data in answers_data:
-            Answer.objects.create(question=question, **answer_data)
-        
+
+        with transaction.atomic():
+            question = Question.objects.create(**validated_data)
+            Answer.objects.bulk_create([
+                Answer(question=question, **self._answer_fields(answer_data))
+                for answer_data in answers_data
+            ])
+        forget_quiz_layout(question.quiz_id)
+
         return question
     
     def update(self, instance, validated_data):
         answers_data = validated_data.pop('answers', [])
-        
-        # Update question fields
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
-        
-        # Update answers
-        if answers_data:
-            # Delete existing answers and create new ones
-            instance.answers.all().delete()
-            for answer_data in answers_data:
-                Answer.objects.create(question=instance, **answer_data)
-        
+
+        with transaction.atomic():
+            # Update question fields
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save()
+
+            # Update answers
+            if answers_data:
+                self._sync_answers(instance, answers_data)
+        forget_quiz_layout(instance.quiz_id)
+
         return instance
 
+    @staticmethod
+    def _answer_fields(answer_data):
+        return {field: value for field, value in answer_data.items() if field != 'id'}
+
+    def _sync_answers(self, question, answers_data):
+        """
+        Make a question's answers match the submitted list with as few writes as possible.
+
+        Answers are matched by id, or else by order, so unchanged choices
+        keep their primary keys and the responses that selected them.
+        Changed answers are saved with bulk_update, new ones with
+        bulk_create, and only answers missing from the list are deleted.
+        Raises ValidationError, before writing anything, if two answers
+        would end up with the same order.
+        """
+        existing = {answer.id: answer for answer in question.answers.all()}
+
+        matched, new = [], []
+        for answer_data in answers_data:
+            if 'id' in answer_data:
+                answer = existing.pop(answer_data['id'], None)
+                if answer is None:
+                    raise serializers.ValidationError(
+                        {'answers': f"Answer {answer_data['id']} does not belong to this question"}
+                    )
+                matched.append((answer, answer_data))
+
+        # Answers sent without an id take over the unclaimed answer at their order
+        by_order = {answer.order: answer for answer in existing.values()}
+        for answer_data in answers_data:
+            if 'id' in answer_data:
+                continue
+            answer = by_order.pop(answer_data.get('order'), None)
+            if answer is None:
+                new.append(Answer(question=question, **self._answer_fields(answer_data)))
+            else:
+                matched.append((answer, answer_data))
+
+        # Answers sent without an order keep theirs, so check the orders they all end up with
+        final_orders = [answer_data.get('order', answer.order) for answer, answer_data in matched]
+        final_orders += [answer.order for answer in new]
+        if len(final_orders) != len(set(final_orders)):
+            raise serializers.ValidationError({'answers': "Answer orders must be unique"})
+
+        kept = {answer.id for answer, _ in matched}
+        question.answers.exclude(id__in=kept).delete()
+
+        top = max([answer.order for answer, _ in matched] + [0])
+        changed, reordered = [], []
+        for answer, answer_data in matched:
+            fields = self._answer_fields(answer_data)
+            if any(getattr(answer, field) != value for field, value in fields.items()):
+                if fields.get('order', answer.order) != answer.order:
+                    reordered.append(answer)
+                for field, value in fields.items():
+                    setattr(answer, field, value)
+                changed.append(answer)
+
+        if reordered:
+            # Park moved answers on free orders first so swaps don't trip (question, order) uniqueness
+            top = max([top] + [answer.order for answer in changed])
+            final_orders = [answer.order for answer in reordered]
+            for offset, answer in enumerate(reordered, 1):
+                answer.order = top + offset
+            Answer.objects.bulk_update(reordered, ['order'])
+            for answer, order in zip(reordered, final_orders):
+                answer.order = order
+
+        Answer.objects.bulk_update(changed, ['answer_text', 'is_correct', 'order'])
+        Answer.objects.bulk_create(new)
+
 
 class QuizListSerializer(serializers.ModelSerializer):
     """Serializer for quiz list view"""
@@ -91,7 +199,8 @@ class QuizListSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'title', 'description', 'course_title',
             'time_limit_minutes', 'passing_score', 'max_attempts',
-            'question_count', 'total_points', 'is_active', 'created_at'
+            'questions_per_attempt', 'question_count', 'total_points',
+            'is_active', 'created_at'
         ]
 
 
@@ -107,8 +216,8 @@ class QuizDetailSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'title', 'description', 'course_title',
             'time_limit_minutes', 'passing_score', 'max_attempts',
-            'randomize_questions', 'show_results_immediately',
-            'questions', 'question_count', 'total_points',
+            'randomize_questions', 'shuffle_answers', 'questions_per_attempt',
+            'show_results_immediately', 'questions', 'question_count', 'total_points',
             'is_active', 'created_at', 'updated_at'
         ]
 
@@ -120,8 +229,8 @@ class QuizCreateUpdateSerializer(serializers.ModelSerializer):
         model = Quiz
         fields = [
             'title', 'description', 'time_limit_minutes', 'passing_score',
-            'max_attempts', 'randomize_questions', 'show_results_immediately',
-            'is_active'
+            'max_attempts', 'randomize_questions', 'shuffle_answers',
+            'questions_per_attempt', 'show_results_immediately', 'is_active'
         ]
 
 
@@ -142,8 +251,8 @@ class QuizAttemptSerializer(serializers.ModelSerializer):
         model = QuizAttempt
         fields = [
             'id', 'quiz_title', 'student_name', 'attempt_number',
-            'started_at', 'completed_at', 'score', 'total_points_earned',
-            'total_points_possible', 'is_completed', 'passed'
+            'started_at', 'completed_at', 'deadline', 'score', 'total_points_earned',
+            'total_points_possible', 'is_completed', 'passed', 'timed_out'
         ]
 
 
@@ -156,15 +265,21 @@ class QuizAttemptDetailSerializer(serializers.ModelSerializer):
         model = QuizAttempt
         fields = [
             'id', 'quiz', 'attempt_number', 'started_at', 'completed_at',
-            'score', 'total_points_earned', 'total_points_possible',
-            'is_completed', 'passed', 'responses'
+            'deadline', 'score', 'total_points_earned', 'total_points_possible',
+            'is_completed', 'passed', 'timed_out', 'responses'
         ]
 
 
 class QuizSubmissionSerializer(serializers.Serializer):
     """Serializer for quiz submission"""
+    # May be empty when the answers were autosaved
+    responses = QuizResponseSerializer(many=True, required=False)
+
+
+class QuizAutosaveSerializer(serializers.Serializer):
+    """Serializer for autosaving part of an attempt"""
     responses = QuizResponseSerializer(many=True)
-    
+
     def validate_responses(self, value):
         if not value:
             raise serializers.ValidationError("At least one response is required")
@@ -0,0 +1,160 @@
+import re
+import threading
+import unicodedata
+
+MATCHERS = {}
+MAX_CACHED_QUESTIONS = 4096
+
+_WHITESPACE = re.compile(r'\s+')
+_compiled = {}
+_compiled_lock = threading.Lock()
+
+
+class AcceptedAnswerError(ValueError):
+    """Raised when an accepted-answer spec can't be compiled"""
+
+
+def register_matcher(name):
+    """
+    Register a matcher type for accepted answers.
+
+    The decorated callable receives the spec dict and returns a predicate
+    taking the student's raw answer. It should raise AcceptedAnswerError
+    (or ValueError) for a spec it can't use.
+    """
+    def decorator(factory):
+        MATCHERS[name] = factory
+        return factory
+    return decorator
+
+
+def normalize(text, case_sensitive=False):
+    """Unicode-normalize, collapse whitespace and, unless case sensitive, casefold"""
+    text = _WHITESPACE.sub(' ', unicodedata.normalize('NFKC', text or '')).strip()
+    return text if case_sensitive else text.casefold()
+
+
+def bounded_edit_distance(a, b, limit):
+    """
+    Levenshtein distance between a and b, or limit + 1 once it exceeds limit.
+
+    Stops as soon as every cell of a row is over the limit, so comparing
+    unrelated strings costs little more than their length difference check.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if len(a) < len(b):
+        a, b = b, a
+
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return min(previous[-1], limit + 1)
+
+
+@register_matcher('text')
+def text_matcher(spec):
+    case_sensitive = spec.get('case_sensitive', False)
+    expected = normalize(str(spec['value']), case_sensitive)
+    return lambda answer: normalize(answer, case_sensitive) == expected
+
+
+@register_matcher('numeric')
+def numeric_matcher(spec):
+    expected = float(spec['value'])
+    tolerance = abs(float(spec.get('tolerance', 0)))
+
+    def matches(answer):
+        try:
+            value = float(normalize(answer).replace(',', '').replace(' ', ''))
+        except ValueError:
+            return False
+        # Slack for binary floating point, so 3.13 is within 0.01 of 3.14
+        return abs(value - expected) <= tolerance + 1e-9 * max(1.0, abs(expected))
+    return matches
+
+
+@register_matcher('regex')
+def regex_matcher(spec):
+    flags = 0 if spec.get('case_sensitive', False) else re.IGNORECASE
+    try:
+        pattern = re.compile(str(spec['value']), flags)
+    except re.error as e:
+        raise AcceptedAnswerError(f"Invalid pattern: {e}")
+    return lambda answer: pattern.fullmatch(_WHITESPACE.sub(' ', answer or '').strip()) is not None
+
+
+@register_matcher('fuzzy')
+def fuzzy_matcher(spec):
+    case_sensitive = spec.get('case_sensitive', False)
+    expected = normalize(str(spec['value']), case_sensitive)
+    limit = int(spec.get('max_distance', 1))
+    if limit < 0:
+        raise AcceptedAnswerError('max_distance must not be negative')
+    return lambda answer: bounded_edit_distance(normalize(answer, case_sensitive), expected, limit) <= limit
+
+
+def compile_accepted_answers(specs):
+    """
+    Turn a question's accepted_answers list into predicates.
+
+    Each spec is a dict with a `type` (text, numeric, regex, fuzzy or any
+    registered matcher) and a `value`, plus the options of its type.
+    Raises AcceptedAnswerError describing the first unusable spec.
+    """
+    if not isinstance(specs, list):
+        raise AcceptedAnswerError('Accepted answers must be a list')
+
+    matchers = []
+    for index, spec in enumerate(specs):
+        if not isinstance(spec, dict) or 'value' not in spec:
+            raise AcceptedAnswerError(f"Accepted answer {index + 1} needs a value")
+        factory = MATCHERS.get(spec.get('type', 'text'))
+        if factory is None:
+            raise AcceptedAnswerError(f"Accepted answer {index + 1} has an unknown type")
+        try:
+            matchers.append(factory(spec))
+        except (TypeError, ValueError) as e:
+            raise AcceptedAnswerError(f"Accepted answer {index + 1}: {e}")
+    return matchers
+
+
+def get_matchers(question):
+    """
+    Compiled accepted answers of a question, cached per question version.
+
+    The version is the question's updated_at, so editing a question
+    compiles it afresh while bulk grading compiles each question once.
+    """
+    if question.pk is None:
+        return compile_accepted_answers(question.accepted_answers)
+
+    key = (question.pk, question.updated_at)
+    matchers = _compiled.get(key)
+    if matchers is None:
+        matchers = compile_accepted_answers(question.accepted_answers)
+        with _compiled_lock:
+            if len(_compiled) >= MAX_CACHED_QUESTIONS:
+                _compiled.clear()
+            _compiled[key] = matchers
+    return matchers
+
+
+def matches_accepted_answer(question, answer):
+    """Whether a short answer matches any of the question's accepted answers"""
+    if not (answer or '').strip():
+        return False
+    try:
+        matchers = get_matchers(question)
+    except AcceptedAnswerError:
+        return False
+    return any(matcher(answer) for matcher in matchers)
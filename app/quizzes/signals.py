@@ -0,0 +1,32 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from courses.models import Course
+from .leaderboard import invalidate_leaderboards
+from .models import Answer, Question, Quiz, QuizAttempt, QuizBestScore
+from .randomization import forget_quiz_layout
+
+
+@receiver([post_save, post_delete], sender=Question)
+def forget_layout_for_question(sender, instance, **kwargs):
+    """Questions added, reordered or removed change the cached quiz layout"""
+    forget_quiz_layout(instance.quiz_id)
+
+
+@receiver([post_save, post_delete], sender=Answer)
+def forget_layout_for_answer(sender, instance, **kwargs):
+    """Answer choices added or removed change the cached quiz layout"""
+    quiz_id = Question.objects.filter(pk=instance.question_id).values_list('quiz_id', flat=True).first()
+    if quiz_id is not None:
+        forget_quiz_layout(quiz_id)
+
+
+@receiver(post_delete, sender=QuizAttempt)
+@receiver(post_delete, sender=QuizBestScore)
+def invalidate_leaderboard_for_deletion(sender, instance, origin=None, **kwargs):
+    """Deleted attempts and best-score rows can take students off a leaderboard"""
+    if isinstance(origin, (Quiz, Course)):
+        # The quiz itself is going, which moves its course's leaderboard on
+        return
+    if sender is QuizAttempt and not instance.is_completed:
+        return
+    invalidate_leaderboards([instance.quiz_id])
@@ -1,12 +1,34 @@
-from django.test import TestCase
+import json
+import os
+import statistics
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import RefreshToken
 from decimal import Decimal
+from django.utils import timezone
 from courses.models import Course, Enrollment
-from .models import Quiz, Question, Answer, QuizAttempt, QuizResponse
+from .item_analysis import compute_item_analysis
+from .leaderboard import COURSE, QUIZ, get_leaderboard, leaderboard_standing
+from .randomization import attempt_layout, attempt_question_ids
+from .short_answers import bounded_edit_distance, compile_accepted_answers
+from unittest import mock
+from .deadlines import expire_attempt, expire_due_attempts
+from .grading import complete_attempt, grade_response
+from .regrade import regrade_quiz
+from .scores import record_graded_attempt
+from .models import Quiz, Question, Answer, QuizAttempt, QuizBestScore, QuizResponse
 
 User = get_user_model()
 
@@ -270,3 +292,1346 @@ class QuizAttemptTest(TestCase):
         self.assertFalse(is_correct)
         self.assertFalse(response.is_correct)
         self.assertEqual(response.points_earned, 0)
+
+
+class QuizItemAnalysisTest(APITestCase):
+    """Test quiz item analysis statistics and endpoint"""
+
+    # Rows are attempts, columns the chosen answer index per question (0 is correct, None unanswered)
+    CHOICES = [
+        [0, 0, 0],
+        [0, 0, 1],
+        [0, 1, 0],
+        [1, 0, None],
+        [1, 1, 1],
+    ]
+
+    def setUp(self):
+        cache.clear()
+        self.instructor = User.objects.create_user(username='instructor', user_type='instructor')
+        self.course = Course.objects.create(
+            title='Python Basics',
+            description='Learn Python programming',
+            instructor=self.instructor,
+            price=Decimal('0.00'),
+            is_free=True,
+            duration_hours=10
+        )
+        self.quiz = Quiz.objects.create(course=self.course, title='Quiz')
+        self.questions = []
+        for order in range(1, 4):
+            question = Question.objects.create(quiz=self.quiz, question_text=f'Q{order}', order=order, points=order)
+            for answer_order in range(1, 3):
+                Answer.objects.create(
+                    question=question,
+                    answer_text=f'A{answer_order}',
+                    is_correct=answer_order == 1,
+                    order=answer_order
+                )
+            self.questions.append(question)
+
+        for index, choices in enumerate(self.CHOICES):
+            self.take_quiz(User.objects.create_user(username=f'student{index}'), choices)
+
+        self.url = reverse('quizzes:quiz_item_analysis', kwargs={
+            'course_id': self.course.id,
+            'quiz_id': self.quiz.id
+        })
+
+    def tearDown(self):
+        cache.clear()
+
+    def take_quiz(self, student, choices):
+        attempt = QuizAttempt.objects.create(quiz=self.quiz, student=student)
+        for question, choice in zip(self.questions, choices):
+            if choice is None:
+                continue
+            response = QuizResponse.objects.create(
+                attempt=attempt,
+                question=question,
+                selected_answer=question.answers.all()[choice]
+            )
+            response.check_answer()
+        attempt.is_completed = True
+        attempt.completed_at = timezone.now()
+        attempt.save()
+        return attempt
+
+    def score_matrix(self):
+        return [
+            [
+                question.points if choice == 0 else 0
+                for question, choice in zip(self.questions, choices)
+            ]
+            for choices in self.CHOICES
+        ]
+
+    def test_difficulty_and_distractors(self):
+        """Test difficulty, omit and selection rates per question"""
+        analysis = compute_item_analysis(self.quiz)
+        self.assertEqual(analysis['attempt_count'], 5)
+
+        first, _, third = analysis['items']
+        self.assertEqual(first['difficulty'], 0.6)
+        self.assertEqual(third['difficulty'], 0.4)
+        self.assertEqual(third['omit_rate'], 0.2)
+        self.assertEqual([option['selection_rate'] for option in first['options']], [0.6, 0.4])
+        # The distractor is picked by the weaker attempts
+        correct, distractor = first['options']
+        self.assertGreater(correct['mean_total_score'], distractor['mean_total_score'])
+
+    def test_matches_direct_computation(self):
+        """Test discrimination and alpha agree with statistics computed on the full matrix"""
+        matrix = self.score_matrix()
+        totals = [sum(row) for row in matrix]
+        columns = list(zip(*matrix))
+
+        analysis = compute_item_analysis(self.quiz)
+        for column, item in zip(columns, analysis['items']):
+            rest = [total - score for total, score in zip(totals, column)]
+            self.assertAlmostEqual(item['discrimination'], statistics.correlation(column, rest), places=4)
+
+        k = len(columns)
+        expected_alpha = k / (k - 1) * (
+            1 - sum(statistics.variance(column) for column in columns) / statistics.variance(totals)
+        )
+        self.assertAlmostEqual(analysis['cronbach_alpha'], expected_alpha, places=4)
+
+    def test_questions_not_drawn_are_left_out(self):
+        """Test a question is measured only over the attempts that were asked it"""
+        first, second, third = self.questions
+        for index in range(4):
+            attempt = self.take_quiz(User.objects.create_user(username=f'drawn{index}'), [0, 0, None])
+            attempt.question_ids = [first.id, second.id]
+            attempt.save()
+
+        items = compute_item_analysis(self.quiz)['items']
+        self.assertEqual([item['shown_count'] for item in items], [9, 9, 5])
+        self.assertEqual(items[2]['difficulty'], 0.4)
+        self.assertEqual(items[2]['omit_rate'], 0.2)
+        self.assertAlmostEqual(items[0]['difficulty'], 7 / 9)
+        self.assertIsNone(compute_item_analysis(self.quiz)['cronbach_alpha'])
+
+    def test_attempt_completed_between_queries(self):
+        """Test an attempt seen only by the response query doesn't shift later attempts' responses"""
+        first = self.quiz.attempts.order_by('id').first()
+        filter_attempts = QuizAttempt.objects.filter
+
+        def attempts_read_before_completion(*args, **kwargs):
+            # The attempt stream was read before the first attempt completed
+            return filter_attempts(*args, **kwargs).exclude(pk=first.pk)
+
+        with mock.patch.object(QuizAttempt.objects, 'filter', side_effect=attempts_read_before_completion):
+            analysis = compute_item_analysis(self.quiz)
+
+        self.assertEqual(analysis['attempt_count'], 4)
+        self.assertEqual([item['response_count'] for item in analysis['items']], [4, 4, 3])
+        self.assertEqual(analysis['items'][0]['difficulty'], 0.5)
+
+    def test_endpoint_caches_until_new_attempt(self):
+        """Test results are cached and refreshed after another completed attempt"""
+        self.client.force_authenticate(self.instructor)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['attempt_count'], 5)
+
+        # Quiz lookup plus the two fingerprint aggregates, no response scan
+        with self.assertNumQueries(3):
+            self.client.get(self.url)
+
+        self.take_quiz(User.objects.create_user(username='late'), [0, 0, 0])
+        self.assertEqual(self.client.get(self.url).data['attempt_count'], 6)
+
+    def test_only_course_instructor(self):
+        """Test other users can't see a quiz's item analysis"""
+        other = User.objects.create_user(username='other', user_type='instructor')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(QUIZ_AUTOSAVE_MIN_INTERVAL=0)
+class QuizAutosaveTest(APITestCase):
+    """Test autosaving answers of an in-progress attempt"""
+
+    def setUp(self):
+        cache.clear()
+        instructor = User.objects.create_user(username='instructor', user_type='instructor')
+        self.student = User.objects.create_user(username='student')
+        self.course = Course.objects.create(
+            title='Python Basics',
+            description='Learn Python programming',
+            instructor=instructor,
+            price=Decimal('0.00'),
+            is_free=True,
+            duration_hours=10
+        )
+        Enrollment.objects.create(student=self.student, course=self.course)
+        self.quiz = Quiz.objects.create(course=self.course, title='Quiz', passing_score=50)
+        self.questions, self.correct, self.wrong = [], [], []
+        for order in range(1, 3):
+            question = Question.objects.create(quiz=self.quiz, question_text=f'Q{order}', order=order, points=5)
+            self.correct.append(Answer.objects.create(question=question, answer_text='Yes', is_correct=True, order=1))
+            self.wrong.append(Answer.objects.create(question=question, answer_text='No', order=2))
+            self.questions.append(question)
+        self.attempt = QuizAttempt.objects.create(quiz=self.quiz, student=self.student)
+
+        self.client.force_authenticate(self.student)
+        kwargs = {'course_id': self.course.id, 'quiz_id': self.quiz.id, 'attempt_id': self.attempt.id}
+        self.autosave_url = reverse('quizzes:autosave_quiz', kwargs=kwargs)
+        self.submit_url = reverse('quizzes:submit_quiz', kwargs=kwargs)
+
+    def tearDown(self):
+        cache.clear()
+
+    def save(self, index, answer):
+        return self.client.post(self.autosave_url, {
+            'responses': [{'question': self.questions[index].id, 'selected_answer': answer.id}]
+        }, format='json')
+
+    def test_saves_write_through(self):
+        """Test every save reaches the database and later saves replace earlier ones"""
+        response = self.save(0, self.wrong[0])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['saved'], 1)
+        self.assertEqual(self.attempt.responses.get().selected_answer, self.wrong[0])
+
+        self.save(0, self.correct[0])
+        self.save(1, self.correct[1])
+        self.assertEqual(
+            set(self.attempt.responses.values_list('question_id', 'selected_answer_id')),
+            {(self.questions[0].id, self.correct[0].id), (self.questions[1].id, self.correct[1].id)}
+        )
+
+        # Resuming sees the saved answers
+        saved = self.client.get(self.autosave_url).data['responses']
+        self.assertEqual(
+            [(row['question'], row['selected_answer']) for row in saved],
+            [(self.questions[0].id, self.correct[0].id), (self.questions[1].id, self.correct[1].id)]
+        )
+
+    def test_save_after_submission_keeps_grades(self):
+        """Test a save racing the submission doesn't overwrite the graded responses"""
+        from .autosave import save_answers
+
+        stale = QuizAttempt.objects.get(pk=self.attempt.pk)
+        self.client.post(self.submit_url, {
+            'responses': [{'question': self.questions[0].id, 'selected_answer': self.correct[0].id}]
+        }, format='json')
+
+        self.assertFalse(save_answers(stale, {self.questions[0].id: (self.wrong[0].id, '')}))
+        response = self.attempt.responses.get()
+        self.assertEqual(response.selected_answer, self.correct[0])
+        self.assertTrue(response.is_correct)
+        self.assertEqual(response.points_earned, 5)
+
+    def test_save_leaves_grading_fields(self):
+        """Test autosave upserts only touch the answer fields"""
+        from .autosave import save_answers
+
+        QuizResponse.objects.create(
+            attempt=self.attempt, question=self.questions[0],
+            selected_answer=self.correct[0], is_correct=True, points_earned=5
+        )
+        save_answers(self.attempt, {self.questions[0].id: (self.wrong[0].id, '')})
+
+        response = self.attempt.responses.get()
+        self.assertEqual(response.selected_answer, self.wrong[0])
+        self.assertTrue(response.is_correct)
+        self.assertEqual(response.points_earned, 5)
+
+    def test_submit_grades_merged_answers(self):
+        """Test submission grades autosaved and submitted answers together"""
+        self.save(0, self.correct[0])
+        self.save(1, self.correct[1])
+
+        response = self.client.post(self.submit_url, {
+            'responses': [{'question': self.questions[1].id, 'selected_answer': self.wrong[1].id}]
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['score'], 50)
+        self.assertTrue(response.data['passed'])
+        self.assertEqual(self.attempt.responses.count(), 2)
+        self.assertEqual(
+            set(self.attempt.responses.values_list('points_earned', flat=True)), {0, 5}
+        )
+
+    def test_submit_from_saved_only(self):
+        """Test an empty submission grades the autosaved answers"""
+        self.save(0, self.correct[0])
+        self.save(1, self.correct[1])
+
+        response = self.client.post(self.submit_url, {'responses': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['score'], 100)
+
+        self.assertEqual(self.client.get(self.autosave_url).status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(QUIZ_AUTOSAVE_MIN_INTERVAL=5)
+    def test_rapid_saves_coalesced(self):
+        """Test saves within the interval are refused with a retry hint instead of written"""
+        self.assertEqual(self.save(0, self.wrong[0]).status_code, status.HTTP_200_OK)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.save(0, self.correct[0])
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response.data['retry_after'], 5)
+        self.assertEqual(response['Retry-After'], '5')
+        self.assertFalse(any('quizzes_quizresponse' in q['sql'] and 'INSERT' in q['sql'] for q in queries))
+        self.assertEqual(self.attempt.responses.get().selected_answer, self.wrong[0])
+
+        QuizAttempt.objects.filter(pk=self.attempt.pk).update(
+            autosaved_at=timezone.now() - timedelta(seconds=5)
+        )
+        self.assertEqual(self.save(0, self.correct[0]).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.attempt.responses.get().selected_answer, self.correct[0])
+
+        # Answers the client still holds go in with the submission
+        response = self.client.post(self.submit_url, {
+            'responses': [{'question': self.questions[1].id, 'selected_answer': self.correct[1].id}]
+        }, format='json')
+        self.assertEqual(response.data['score'], 100)
+
+    def test_empty_submission_rejected(self):
+        """Test submitting without any saved or submitted answers fails"""
+        response = self.client.post(self.submit_url, {'responses': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_foreign_question_rejected(self):
+        """Test answers to questions of another quiz aren't saved"""
+        other_quiz = Quiz.objects.create(course=self.course, title='Other')
+        other = Question.objects.create(quiz=other_quiz, question_text='Other', order=1)
+        response = self.client.post(self.autosave_url, {
+            'responses': [{'question': other.id, 'text_answer': 'x'}]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_answer_from_other_question_not_correct(self):
+        """Test a correct answer of another question scores nothing"""
+        response = self.client.post(self.submit_url, {
+            'responses': [{'question': self.questions[0].id, 'selected_answer': self.correct[1].id}]
+        }, format='json')
+        self.assertEqual(response.data['score'], 0)
+
+
+class QuizRandomizationTest(APITestCase):
+    """Test per-attempt question draws and ordering"""
+
+    def setUp(self):
+        cache.clear()
+        instructor = User.objects.create_user(username='instructor', user_type='instructor')
+        self.student = User.objects.create_user(username='student')
+        self.course = Course.objects.create(
+            title='Python Basics',
+            description='Learn Python programming',
+            instructor=instructor,
+            price=Decimal('0.00'),
+            is_free=True,
+            duration_hours=10
+        )
+        Enrollment.objects.create(student=self.student, course=self.course)
+        self.quiz = Quiz.objects.create(
+            course=self.course,
+            title='Quiz',
+            max_attempts=10,
+            randomize_questions=True,
+            shuffle_answers=True
+        )
+        for order in range(1, 11):
+            question = Question.objects.create(quiz=self.quiz, question_text=f'Q{order}', order=order)
+            for answer_order in range(1, 5):
+                Answer.objects.create(
+                    question=question,
+                    answer_text=f'A{answer_order}',
+                    is_correct=answer_order == 1,
+                    order=answer_order
+                )
+        self.client.force_authenticate(self.student)
+
+    def tearDown(self):
+        cache.clear()
+
+    def start(self):
+        url = reverse('quizzes:start_quiz', kwargs={'course_id': self.course.id, 'quiz_id': self.quiz.id})
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return QuizAttempt.objects.get(id=response.data['attempt_id']), response.data['questions']
+
+    def test_layout_is_stable_per_attempt(self):
+        """Test an attempt sees the same order on reload and another attempt a different one"""
+        attempt, questions = self.start()
+        url = reverse('quizzes:quiz_attempt_questions', kwargs={
+            'course_id': self.course.id, 'quiz_id': self.quiz.id, 'attempt_id': attempt.id
+        })
+
+        with self.assertNumQueries(4):
+            reloaded = self.client.get(url).data['questions']
+        self.assertEqual(reloaded, questions)
+
+        ids = [question['id'] for question in questions]
+        self.assertEqual(sorted(ids), list(self.quiz.questions.values_list('id', flat=True)))
+        self.assertNotEqual(ids, sorted(ids))
+        answer_orders = [[answer['order'] for answer in question['answers']] for question in questions]
+        self.assertTrue(any(order != [1, 2, 3, 4] for order in answer_orders))
+
+        _, other = self.start()
+        self.assertNotEqual([question['id'] for question in other], ids)
+
+    def test_unrandomized_quiz_keeps_order(self):
+        """Test quizzes without randomization are laid out in question order"""
+        self.quiz.randomize_questions = False
+        self.quiz.shuffle_answers = False
+        self.quiz.save()
+
+        attempt, _ = self.start()
+        layout = attempt_layout(attempt)
+        self.assertEqual([question_id for question_id, _ in layout], list(self.quiz.questions.values_list('id', flat=True)))
+        self.assertEqual(layout[0][1], list(self.quiz.questions.first().answers.values_list('id', flat=True)))
+
+    def test_draw_from_bank(self):
+        """Test attempts draw N questions and are graded out of those only"""
+        self.quiz.questions_per_attempt = 3
+        self.quiz.save()
+
+        attempt, questions = self.start()
+        self.assertEqual(len(questions), 3)
+        drawn = attempt_question_ids(attempt)
+        self.assertEqual([question['id'] for question in questions], drawn)
+
+        submit_url = reverse('quizzes:submit_quiz', kwargs={
+            'course_id': self.course.id, 'quiz_id': self.quiz.id, 'attempt_id': attempt.id
+        })
+        undrawn = self.quiz.questions.exclude(id__in=drawn).first()
+        response = self.client.post(submit_url, {
+            'responses': [{'question': undrawn.id, 'text_answer': 'x'}]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        first = Question.objects.get(id=drawn[0])
+        response = self.client.post(submit_url, {
+            'responses': [{'question': first.id, 'selected_answer': first.answers.get(is_correct=True).id}]
+        }, format='json')
+        self.assertEqual(response.data['total_points_possible'], 3)
+        self.assertEqual(response.data['score'], 33)
+
+    def test_layout_cache_follows_question_changes(self):
+        """Test new questions show up in the layout of attempts started afterwards"""
+        self.start()
+        question = Question.objects.create(quiz=self.quiz, question_text='Q11', order=11)
+        attempt, questions = self.start()
+        self.assertIn(question.id, attempt_question_ids(attempt))
+        self.assertEqual(len(questions), 11)
+
+    def test_bank_edits_during_open_attempt(self):
+        """Test an open attempt keeps its draw while questions are added and removed"""
+        self.quiz.questions_per_attempt = 3
+        self.quiz.save()
+        attempt, questions = self.start()
+        drawn = [question['id'] for question in questions]
+
+        Question.objects.create(quiz=self.quiz, question_text='Q11', order=11)
+        self.quiz.questions.exclude(id__in=drawn).first().delete()
+        attempt.refresh_from_db()
+        self.assertEqual(attempt_question_ids(attempt), drawn)
+
+        submit_url = reverse('quizzes:submit_quiz', kwargs={
+            'course_id': self.course.id, 'quiz_id': self.quiz.id, 'attempt_id': attempt.id
+        })
+        response = self.client.post(submit_url, {'responses': [
+            {'question': question_id, 'selected_answer': Answer.objects.get(question_id=question_id, is_correct=True).id}
+            for question_id in drawn
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['score'], response.data['total_points_possible']), (100, 3))
+
+        # Regrading after further edits still grades against the drawn questions
+        Question.objects.create(quiz=self.quiz, question_text='Q12', order=12)
+        report = regrade_quiz(self.quiz)
+        self.assertEqual(report['attempts_changed'], 0)
+
+        # A drawn question deleted outright drops out of the attempt
+        Question.objects.filter(id=drawn[0]).delete()
+        self.assertEqual(attempt_question_ids(attempt), drawn[1:])
+
+
+class QuizTimeLimitTest(APITestCase):
+    """Test quiz time limits, lazy expiry and the expiry sweep"""
+
+    def setUp(self):
+        cache.clear()
+        instructor = User.objects.create_user(username='instructor', user_type='instructor')
+        self.student = User.objects.create_user(username='student')
+        self.course = Course.objects.create(
+            title='Python Basics',
+            description='Learn Python programming',
+            instructor=instructor,
+            price=Decimal('0.00'),
+            is_free=True,
+            duration_hours=10
+        )
+        Enrollment.objects.create(student=self.student, course=self.course)
+        self.quiz = Quiz.objects.create(course=self.course, title='Quiz', time_limit_minutes=10, passing_score=50)
+        self.question = Question.objects.create(quiz=self.quiz, question_text='Q1', order=1)
+        self.correct = Answer.objects.create(question=self.question, answer_text='Yes', is_correct=True, order=1)
+        self.client.force_authenticate(self.student)
+
+    def tearDown(self):
+        cache.clear()
+
+    def start(self):
+        url = reverse('quizzes:start_quiz', kwargs={'course_id': self.course.id, 'quiz_id': self.quiz.id})
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return QuizAttempt.objects.get(id=response.data['attempt_id'])
+
+    def url(self, name, attempt):
+        return reverse(f'quizzes:{name}', kwargs={
+            'course_id': self.course.id, 'quiz_id': self.quiz.id, 'attempt_id': attempt.id
+        })
+
+    def expire(self, attempt):
+        attempt.deadline = timezone.now() - timedelta(minutes=5)
+        attempt.save(update_fields=['deadline'])
+
+    def test_deadline_set_at_start(self):
+        """Test attempts get a deadline from the quiz time limit"""
+        attempt = self.start()
+        self.assertAlmostEqual(
+            attempt.deadline, attempt.started_at + timedelta(minutes=10), delta=timedelta(seconds=5)
+        )
+
+        self.quiz.time_limit_minutes = None
+        self.quiz.save()
+        self.assertIsNone(self.start().deadline)
+
+    def test_late_submission_submits_saved_answers(self):
+        """Test submitting after the deadline grades only what was saved in time"""
+        attempt = self.start()
+        self.client.post(self.url('autosave_quiz', attempt), {
+            'responses': [{'question': self.question.id, 'selected_answer': self.correct.id}]
+        }, format='json')
+        self.expire(attempt)
+
+        response = self.client.post(self.url('submit_quiz', attempt), {
+            'responses': [{'question': self.question.id, 'text_answer': 'late'}]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        attempt.refresh_from_db()
+        self.assertTrue(attempt.is_completed)
+        self.assertTrue(attempt.timed_out)
+        self.assertEqual(attempt.completed_at, attempt.deadline)
+        self.assertEqual(attempt.score, 100)
+
+    def test_submission_within_grace_period(self):
+        """Test submissions just after the deadline are still accepted"""
+        attempt = self.start()
+        attempt.deadline = timezone.now() - timedelta(seconds=5)
+        attempt.save(update_fields=['deadline'])
+
+        response = self.client.post(self.url('submit_quiz', attempt), {
+            'responses': [{'question': self.question.id, 'selected_answer': self.correct.id}]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_starting_again_expires_abandoned_attempt(self):
+        """Test an abandoned attempt is closed when the student starts another"""
+        abandoned = self.start()
+        self.expire(abandoned)
+
+        self.start()
+        abandoned.refresh_from_db()
+        self.assertTrue(abandoned.timed_out)
+        self.assertEqual(abandoned.score, 0)
+
+    def test_sweep_command(self):
+        """Test the sweep grades expired attempts in batches and leaves the rest open"""
+        expired = []
+        for index in range(3):
+            student = User.objects.create_user(username=f'student{index}')
+            attempt = QuizAttempt.objects.create(
+                quiz=self.quiz,
+                student=student,
+                deadline=timezone.now() - timedelta(hours=1)
+            )
+            expired.append(attempt)
+        QuizResponse.objects.create(attempt=expired[0], question=self.question, selected_answer=self.correct)
+        running = self.start()
+
+        out = StringIO()
+        call_command('expire_quiz_attempts', batch_size=2, stdout=out)
+        self.assertIn('Expired 3', out.getvalue())
+
+        self.assertEqual(QuizAttempt.objects.filter(is_completed=False).get(), running)
+        scores = dict(QuizAttempt.objects.filter(timed_out=True).values_list('id', 'score'))
+        self.assertEqual(scores, {expired[0].id: 100, expired[1].id: 0, expired[2].id: 0})
+        self.assertTrue(QuizResponse.objects.get(attempt=expired[0]).is_correct)
+
+
+    def test_sweep_skips_attempts_completed_meanwhile(self):
+        """Test an attempt expired lazily while the sweep grades it is graded once"""
+        from . import grading
+
+        attempt = QuizAttempt.objects.create(
+            quiz=self.quiz, student=self.student, attempt_number=1,
+            deadline=timezone.now() - timedelta(hours=1)
+        )
+        QuizResponse.objects.create(attempt=attempt, question=self.question, selected_answer=self.correct)
+        grade = grading.grade_attempt
+
+        def racing_grade(swept, answers, questions=None):
+            # The student's own request expires the attempt first
+            with mock.patch.object(grading, 'grade_attempt', grade):
+                expire_attempt(QuizAttempt.objects.select_related('quiz').get(pk=swept.pk))
+            return grade(swept, answers, questions)
+
+        with mock.patch.object(grading, 'grade_attempt', racing_grade):
+            self.assertEqual(expire_due_attempts(), 0)
+
+        summary = QuizBestScore.objects.get(student=self.student, quiz=self.quiz)
+        self.assertEqual(summary.completed_attempts, 1)
+        self.assertEqual(summary.best_score, 100)
+
+    def test_completing_twice_grades_once(self):
+        """Test a second completion of the same attempt writes nothing"""
+        attempt = self.start()
+        stale = QuizAttempt.objects.select_related('quiz').get(pk=attempt.pk)
+        response = self.client.post(self.url('submit_quiz', attempt), {
+            'responses': [{'question': self.question.id, 'selected_answer': self.correct.id}]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with transaction.atomic():
+            self.assertFalse(complete_attempt(stale, {self.question.id: (None, 'wrong')}))
+
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.score, 100)
+        self.assertTrue(QuizResponse.objects.get(attempt=attempt).is_correct)
+        summary = QuizBestScore.objects.get(student=self.student, quiz=self.quiz)
+        self.assertEqual(summary.completed_attempts, 1)
+
+class QuizBestScoreTest(APITestCase):
+    """Test the maintained per-student best-score summary"""
+
+    def setUp(self):
+        cache.clear()
+        instructor = User.objects.create_user(username='instructor', user_type='instructor')
+        self.student = User.objects.create_user(username='student')
+        self.course = Course.objects.create(
+            title='Python Basics',
+            description='Learn Python programming',
+            instructor=instructor,
+            price=Decimal('0.00'),
+            is_free=True,
+            duration_hours=10
+        )
+        Enrollment.objects.create(student=self.student, course=self.course)
+        self.quiz = Quiz.objects.create(course=self.course, title='Quiz', max_attempts=2, passing_score=50)
+        self.questions = []
+        for order in range(1, 3):
+            question = Question.objects.create(quiz=self.quiz, question_text=f'Q{order}', order=order)
+            Answer.objects.create(question=question, answer_text='Yes', is_correct=True, order=1)
+            Answer.objects.create(question=question, answer_text='No', order=2)
+            self.questions.append(question)
+        self.client.force_authenticate(self.student)
+        self.start_url = reverse('quizzes:start_quiz', kwargs={'course_id': self.course.id, 'quiz_id': self.quiz.id})
+
+    def tearDown(self):
+        cache.clear()
+
+    def take(self, correct):
+        attempt_id = self.client.post(self.start_url).data['attempt_id']
+        url = reverse('quizzes:submit_quiz', kwargs={
+            'course_id': self.course.id, 'quiz_id': self.quiz.id, 'attempt_id': attempt_id
+        })
+        self.client.post(url, {'responses': [
+            {'question': question.id, 'selected_answer': question.answers.get(is_correct=index < correct).id}
+            for index, question in enumerate(self.questions)
+        ]}, format='json')
+        return QuizAttempt.objects.get(id=attempt_id)
+
+    def summary(self):
+        return QuizBestScore.objects.get(student=self.student, quiz=self.quiz)
+
+    def test_summary_follows_grading(self):
+        """Test the summary keeps the best attempt and counts attempts"""
+        best = self.take(correct=2)
+        self.take(correct=1)
+
+        summary = self.summary()
+        self.assertEqual(summary.best_score, 100)
+        self.assertEqual(summary.best_attempt, best)
+        self.assertEqual(summary.attempts_used, 2)
+        self.assertEqual(summary.completed_attempts, 2)
+        self.assertTrue(summary.passed)
+
+    def test_recording_an_attempt_twice_counts_it_once(self):
+        """Test record_graded_attempt only folds in an attempt it completed itself"""
+        attempt = self.take(correct=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertFalse(record_graded_attempt(attempt))
+
+        summary = self.summary()
+        self.assertEqual(summary.completed_attempts, 1)
+        self.assertEqual(summary.best_score, 50)
+
+    def test_attempt_limit_uses_summary(self):
+        """Test starts are limited by the summary's attempt count"""
+        self.take(correct=0)
+        self.take(correct=0)
+        response = self.client.post(self.start_url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(self.summary().passed)
+        self.assertEqual(QuizAttempt.objects.filter(student=self.student).count(), 2)
+
+    def test_rebuild_command(self):
+        """Test the rebuild reproduces the maintained summary"""
+        self.take(correct=1)
+        best = self.take(correct=2)
+        QuizBestScore.objects.all().delete()
+
+        out = StringIO()
+        call_command('rebuild_quiz_best_scores', stdout=out)
+        self.assertIn('Rebuilt 1', out.getvalue())
+
+        summary = self.summary()
+        self.assertEqual(summary.best_score, 100)
+        self.assertEqual(summary.best_attempt, best)
+        self.assertEqual(summary.attempts_used, 2)
+        self.assertEqual(summary.completed_attempts, 2)
+        self.assertTrue(summary.passed)
+
+
+class ShortAnswerGradingTest(APITestCase):
+    """Test short answer matching rules"""
+
+    def setUp(self):
+        self.instructor = User.objects.create_user(username='instructor', user_type='instructor')
+        self.course = Course.objects.create(
+            title='Python Basics',
+            description='Learn Python programming',
+            instructor=self.instructor,
+            price=Decimal('0.00'),
+            is_free=True,
+            duration_hours=10
+        )
+        self.quiz = Quiz.objects.create(course=self.course, title='Quiz')
+
+    def question(self, *accepted):
+        return Question.objects.create(
+            quiz=self.quiz,
+            question_text='?',
+            question_type='short_answer',
+            points=2,
+            order=Question.objects.filter(quiz=self.quiz).count() + 1,
+            accepted_answers=list(accepted)
+        )
+
+    def grade(self, question, text):
+        return grade_response(question, None, text)[0]
+
+    def test_text_ignores_case_and_whitespace(self):
+        question = self.question({'type': 'text', 'value': 'New  York'})
+        self.assertTrue(self.grade(question, '  new york '))
+        self.assertFalse(self.grade(question, 'York'))
+        self.assertEqual(grade_response(question, None, 'NEW YORK'), (True, 2))
+
+    def test_case_sensitive_text(self):
+        question = self.question({'type': 'text', 'value': 'NaCl', 'case_sensitive': True})
+        self.assertTrue(self.grade(question, 'NaCl'))
+        self.assertFalse(self.grade(question, 'nacl'))
+
+    def test_numeric_tolerance(self):
+        question = self.question({'type': 'numeric', 'value': 3.14, 'tolerance': 0.01})
+        self.assertTrue(self.grade(question, '3.149'))
+        self.assertTrue(self.grade(question, ' 3.13 '))
+        self.assertFalse(self.grade(question, '3.2'))
+        self.assertFalse(self.grade(question, 'pi'))
+
+    def test_regex(self):
+        question = self.question({'type': 'regex', 'value': r'colou?r'})
+        self.assertTrue(self.grade(question, 'Color'))
+        self.assertTrue(self.grade(question, 'colour'))
+        self.assertFalse(self.grade(question, 'colors'))
+
+    def test_fuzzy(self):
+        question = self.question({'type': 'fuzzy', 'value': 'photosynthesis', 'max_distance': 2})
+        self.assertTrue(self.grade(question, 'Photosynthesis'))
+        self.assertTrue(self.grade(question, 'fotosynthesis'))
+        self.assertFalse(self.grade(question, 'respiration'))
+        self.assertEqual(bounded_edit_distance('kitten', 'sitting', 5), 3)
+        self.assertEqual(bounded_edit_distance('kitten', 'sitting', 1), 2)
+
+    def test_no_accepted_answers_not_correct(self):
+        """Test a non-empty answer alone no longer earns the points"""
+        question = self.question()
+        self.assertFalse(self.grade(question, 'anything'))
+
+    def test_compiled_once_per_version(self):
+        """Test bulk grading compiles a question's rules once until it changes"""
+        question = self.question({'type': 'regex', 'value': r'\d+'})
+        with mock.patch('quizzes.short_answers.compile_accepted_answers', wraps=compile_accepted_answers) as compiled:
+            for answer in range(100):
+                self.assertTrue(self.grade(question, str(answer)))
+            self.assertEqual(compiled.call_count, 1)
+
+            question.accepted_answers = [{'type': 'text', 'value': 'none'}]
+            question.save()
+            self.assertFalse(self.grade(question, '5'))
+            self.assertEqual(compiled.call_count, 2)
+
+    def test_invalid_rules_rejected(self):
+        """Test the question API validates accepted answers"""
+        self.client.force_authenticate(self.instructor)
+        url = reverse('quizzes:quiz_questions', kwargs={'course_id': self.course.id, 'quiz_id': self.quiz.id})
+        response = self.client.post(url, {
+            'question_text': '?',
+            'question_type': 'short_answer',
+            'order': 1,
+            'accepted_answers': [{'type': 'regex', 'value': '('}]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('accepted_answers', response.data)
+
+
+class QuizRegradeTest(APITestCase):
+    """Test regrading attempts after answer key corrections"""
+
+    def setUp(self):
+        cache.clear()
+        self.instructor = User.objects.create_user(username='instructor', user_type='instructor')
+        self.course = Course.objects.create(
+            title='Python Basics',
+            description='Learn Python programming',
+            instructor=self.instructor,
+            price=Decimal('0.00'),
+            is_free=True,
+            duration_hours=10
+        )
+        self.quiz = Quiz.objects.create(course=self.course, title='Quiz', passing_score=50)
+        self.question = Question.objects.create(quiz=self.quiz, question_text='Q1', order=1, points=1)
+        self.keyed = Answer.objects.create(question=self.question, answer_text='A', is_correct=True, order=1)
+        self.actual = Answer.objects.create(question=self.question, answer_text='B', order=2)
+        self.other = Question.objects.create(quiz=self.quiz, question_text='Q2', order=2, points=1)
+        self.other_answer = Answer.objects.create(question=self.other, answer_text='Yes', is_correct=True, order=1)
+
+        self.attempts = {}
+        for name, answer in (('picked_a', self.keyed), ('picked_b', self.actual)):
+            student = User.objects.create_user(username=name)
+            attempt = QuizAttempt.objects.create(quiz=self.quiz, student=student)
+            for question, selected in ((self.question, answer), (self.other, None)):
+                QuizResponse.objects.create(attempt=attempt, question=question, selected_answer=selected).check_answer()
+            attempt.is_completed = True
+            attempt.save()
+            attempt.calculate_score()
+            self.attempts[name] = attempt
+
+        # The key was wrong: B is the right answer
+        Answer.objects.filter(pk=self.keyed.pk).update(is_correct=False)
+        Answer.objects.filter(pk=self.actual.pk).update(is_correct=True)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_regrade_flips_results(self):
+        """Test attempts are rescored and pass/fail flips reported"""
+        report = regrade_quiz(self.quiz, chunk_size=1)
+
+        self.assertEqual(report['attempts_checked'], 2)
+        self.assertEqual(report['attempts_changed'], 2)
+        self.assertEqual(report['responses_changed'], 2)
+        self.assertEqual(report['failed_to_passed'], [self.attempts['picked_b'].id])
+        self.assertEqual(report['passed_to_failed'], [self.attempts['picked_a'].id])
+
+        picked_b = QuizAttempt.objects.get(pk=self.attempts['picked_b'].pk)
+        self.assertEqual((picked_b.score, picked_b.passed), (50, True))
+        self.assertTrue(QuizBestScore.objects.get(student=picked_b.student, quiz=self.quiz).passed)
+
+        self.assertEqual(regrade_quiz(self.quiz)['attempts_changed'], 0)
+
+    def test_points_change(self):
+        """Test changed question points rescale scores"""
+        Answer.objects.filter(pk=self.actual.pk).update(is_correct=False)
+        Answer.objects.filter(pk=self.keyed.pk).update(is_correct=True)
+        Question.objects.filter(pk=self.question.pk).update(points=3)
+
+        regrade_quiz(self.quiz)
+        picked_a = QuizAttempt.objects.get(pk=self.attempts['picked_a'].pk)
+        self.assertEqual((picked_a.total_points_earned, picked_a.total_points_possible, picked_a.score), (3, 4, 75))
+
+    def test_dry_run_endpoint(self):
+        """Test the endpoint reports without saving on a dry run, then regrades"""
+        self.client.force_authenticate(self.instructor)
+        url = reverse('quizzes:regrade_quiz', kwargs={'course_id': self.course.id, 'quiz_id': self.quiz.id})
+
+        response = self.client.post(url, {'dry_run': True}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['attempts_changed'], 2)
+        self.assertFalse(QuizAttempt.objects.get(pk=self.attempts['picked_b'].pk).passed)
+
+        response = self.client.post(url, {}, format='json')
+        self.assertFalse(response.data['dry_run'])
+        self.assertTrue(QuizAttempt.objects.get(pk=self.attempts['picked_b'].pk).passed)
+
+    def test_regrade_command(self):
+        """Test the command regrades every quiz of a course"""
+        out = StringIO()
+        call_command('regrade_quizzes', course=[self.course.id], stdout=out)
+        self.assertIn('1 now passing, 1 now failing', out.getvalue())
+        self.assertTrue(QuizAttempt.objects.get(pk=self.attempts['picked_b'].pk).passed)
+
+
+class QuestionAnswerEditTest(APITestCase):
+    """Test editing a question's answers in place"""
+
+    def setUp(self):
+        cache.clear()
+        self.instructor = User.objects.create_user(username='instructor', user_type='instructor')
+        course = Course.objects.create(
+            title='Python Basics',
+            description='Learn Python programming',
+            instructor=self.instructor,
+            price=Decimal('0.00'),
+            is_free=True,
+            duration_hours=10
+        )
+        quiz = Quiz.objects.create(course=course, title='Quiz')
+        self.question = Question.objects.create(quiz=quiz, question_text='Q1', order=1)
+        self.a = Answer.objects.create(question=self.question, answer_text='A', is_correct=True, order=1)
+        self.b = Answer.objects.create(question=self.question, answer_text='B', order=2)
+        self.c = Answer.objects.create(question=self.question, answer_text='C', order=3)
+
+        attempt = QuizAttempt.objects.create(quiz=quiz, student=User.objects.create_user(username='student'))
+        self.response = QuizResponse.objects.create(attempt=attempt, question=self.question, selected_answer=self.b)
+
+        self.client.force_authenticate(self.instructor)
+        self.url = reverse('quizzes:question_detail', kwargs={
+            'course_id': course.id, 'quiz_id': quiz.id, 'pk': self.question.id
+        })
+
+    def tearDown(self):
+        cache.clear()
+
+    def patch(self, answers):
+        return self.client.patch(self.url, {'answers': answers}, format='json')
+
+    def answers(self):
+        return list(self.question.answers.order_by('order').values_list('id', 'answer_text', 'is_correct', 'order'))
+
+    def test_edit_keeps_answer_ids_and_responses(self):
+        """Test fixing the key and swapping orders updates rows in place"""
+        response = self.patch([
+            {'id': self.a.id, 'answer_text': 'A', 'is_correct': False, 'order': 2},
+            {'id': self.b.id, 'answer_text': 'B', 'is_correct': True, 'order': 1},
+            {'id': self.c.id, 'answer_text': 'C', 'order': 3},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.answers(), [
+            (self.b.id, 'B', True, 1),
+            (self.a.id, 'A', False, 2),
+            (self.c.id, 'C', False, 3),
+        ])
+        self.response.refresh_from_db()
+        self.assertEqual(self.response.selected_answer_id, self.b.id)
+
+    def test_match_by_order_add_and_remove(self):
+        """Test answers without ids match by order, extras are added and missing ones removed"""
+        response = self.patch([
+            {'answer_text': 'A!', 'is_correct': True, 'order': 1},
+            {'answer_text': 'B', 'order': 2},
+            {'answer_text': 'D', 'order': 4},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        answers = self.answers()
+        self.assertEqual([row[0] for row in answers[:2]], [self.a.id, self.b.id])
+        self.assertEqual(answers[0][1], 'A!')
+        self.assertEqual(answers[2][1:], ('D', False, 4))
+        self.assertFalse(Answer.objects.filter(id=self.c.id).exists())
+        self.assertTrue(QuizResponse.objects.filter(id=self.response.id).exists())
+
+    def test_unchanged_edit_writes_nothing_to_answers(self):
+        """Test resubmitting the same answers issues no answer writes"""
+        payload = [
+            {'id': answer.id, 'answer_text': answer.answer_text, 'is_correct': answer.is_correct, 'order': answer.order}
+            for answer in (self.a, self.b, self.c)
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            self.patch(payload)
+        writes = [
+            query['sql'] for query in queries.captured_queries
+            if 'quizzes_answer' in query['sql'] and not query['sql'].startswith('SELECT')
+        ]
+        self.assertEqual(writes, [])
+
+    def test_invalid_answer_lists_rejected(self):
+        """Test foreign ids and duplicate orders are rejected without changes"""
+        other = Question.objects.create(quiz=self.question.quiz, question_text='Q2', order=2)
+        foreign = Answer.objects.create(question=other, answer_text='X', order=1)
+        before = self.answers()
+
+        self.assertEqual(self.patch([{'id': foreign.id, 'answer_text': 'X', 'order': 1}]).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.patch([
+            {'answer_text': 'A', 'order': 1},
+            {'answer_text': 'B', 'order': 1},
+        ]).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.answers(), before)
+
+    def test_kept_order_collision_rejected(self):
+        """Test an answer sent without an order keeps its own, which a new answer can't take"""
+        before = self.answers()
+        response = self.patch([
+            {'id': self.a.id, 'answer_text': 'A2'},
+            {'answer_text': 'C', 'order': 1},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('answers', response.data)
+        self.assertEqual(self.answers(), before)
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.question_text, 'Q1')
+
+    def test_create_without_orders_rejected(self):
+        """Test new answers that would all default to order 1 are rejected"""
+        url = reverse('quizzes:quiz_questions', kwargs={
+            'course_id': self.question.quiz.course_id, 'quiz_id': self.question.quiz_id
+        })
+        response = self.client.post(url, {
+            'question_text': 'Q2', 'question_type': 'multiple_choice', 'points': 1, 'order': 2,
+            'answers': [{'answer_text': 'A'}, {'answer_text': 'B'}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Question.objects.filter(question_text='Q2').exists())
+
+
+class QuestionBankTest(APITestCase):
+    """Test question bank import and export"""
+
+    def setUp(self):
+        cache.clear()
+        self.instructor = User.objects.create_user(username='instructor', user_type='instructor')
+        course = Course.objects.create(
+            title='Python Basics',
+            description='Learn Python programming',
+            instructor=self.instructor,
+            price=Decimal('0.00'),
+            is_free=True,
+            duration_hours=10
+        )
+        self.quiz = Quiz.objects.create(course=course, title='Quiz')
+        Question.objects.create(quiz=self.quiz, question_text='Existing', order=1)
+        self.client.force_authenticate(self.instructor)
+        kwargs = {'course_id': course.id, 'quiz_id': self.quiz.id}
+        self.import_url = reverse('quizzes:import_question_bank', kwargs=kwargs)
+        self.export_url = reverse('quizzes:export_question_bank', kwargs=kwargs)
+
+    def tearDown(self):
+        cache.clear()
+
+    def bank(self, count=2):
+        records = []
+        for i in range(count):
+            records.append({
+                'question_text': f'Q{i} <&>',
+                'points': 2,
+                'explanation': 'Because',
+                'answers': [{'answer_text': 'Yes', 'is_correct': True}, {'answer_text': 'No'}]
+            })
+        records.append({
+            'question_text': 'Pi?',
+            'question_type': 'short_answer',
+            'accepted_answers': [
+                {'type': 'numeric', 'value': 3.14, 'tolerance': 0.005},
+                {'type': 'text', 'value': 'pi', 'case_sensitive': True}
+            ]
+        })
+        return records
+
+    def upload(self, name, content, **data):
+        return self.client.post(
+            self.import_url,
+            {'file': SimpleUploadedFile(name, content.encode('utf-8')), **data},
+            format='multipart'
+        )
+
+    def snapshot(self):
+        return [
+            (
+                question.question_text, question.question_type, question.points, question.explanation,
+                question.accepted_answers,
+                list(question.answers.values_list('answer_text', 'is_correct', 'order'))
+            )
+            for question in self.quiz.questions.exclude(question_text='Existing').order_by('order')
+        ]
+
+    def test_jsonl_import_appends_questions(self):
+        """Test a JSON Lines upload adds questions after the existing ones"""
+        content = '\n'.join(json.dumps(record) for record in self.bank()) + '\n\n'
+        response = self.upload('bank.jsonl', content)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['imported'], 3)
+        self.assertEqual(list(self.quiz.questions.values_list('order', flat=True)), [1, 2, 3, 4])
+        self.assertEqual(self.snapshot()[0], (
+            'Q0 <&>', 'multiple_choice', 2, 'Because', [], [('Yes', True, 1), ('No', False, 2)]
+        ))
+
+    def test_invalid_records_import_nothing(self):
+        """Test every invalid line is reported and no question is created"""
+        records = self.bank()
+        records[1]['points'] = 0
+        records[2]['accepted_answers'] = [{'type': 'regex', 'value': '('}]
+        content = '\n'.join(json.dumps(record) for record in records) + '\nnot json\n'
+        response = self.upload('bank.jsonl', content)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([error['line'] for error in response.data['errors']], [2, 3, 4])
+        self.assertEqual(self.quiz.questions.count(), 1)
+
+    def test_json_body_import(self):
+        """Test a "questions" list in the body is imported like a file"""
+        response = self.client.post(self.import_url, {'questions': self.bank(1)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['total_questions'], 3)
+
+        response = self.client.post(self.import_url, {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_round_trips_in_both_formats(self):
+        """Test exported JSON Lines and QTI XML import back to the same questions"""
+        self.client.post(self.import_url, {'questions': self.bank()}, format='json')
+        self.quiz.questions.filter(question_text='Existing').delete()
+        expected = self.snapshot()
+
+        for query, name in (('', 'bank.jsonl'), ('?format=qti', 'bank.xml')):
+            response = self.client.get(self.export_url + query)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            content = b''.join(response.streaming_content).decode('utf-8')
+
+            self.quiz.questions.all().delete()
+            self.assertEqual(self.upload(name, content).status_code, status.HTTP_201_CREATED)
+            self.assertEqual(self.snapshot(), expected)
+
+    def test_malformed_xml_rejected(self):
+        """Test broken XML returns 400"""
+        response = self.upload('bank.xml', '<questestinterop><item>')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.quiz.questions.count(), 1)
+
+    def test_unknown_file_format_rejected(self):
+        """Test a file_format other than jsonl or qti returns 400"""
+        content = json.dumps(self.bank(1)[0])
+        response = self.upload('bank.jsonl', content, file_format='csv')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.quiz.questions.count(), 1)
+
+    def test_conflicting_import_returns_conflict(self):
+        """Test an import whose question orders collide with another one returns 409"""
+        with mock.patch.object(Question.objects, 'bulk_create', side_effect=IntegrityError):
+            response = self.client.post(self.import_url, {'questions': self.bank(1)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.quiz.questions.count(), 1)
+
+    def test_large_import_uses_bulk_inserts(self):
+        """Test a large bank is inserted in a handful of queries"""
+        content = '\n'.join(json.dumps(record) for record in self.bank(3000))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.upload('bank.jsonl', content)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.quiz.questions.count(), 3002)
+        self.assertEqual(Answer.objects.filter(question__quiz=self.quiz).count(), 6000)
+        # SQLite splits batches to stay under its variable limit
+        inserts = [query for query in queries.captured_queries if query['sql'].startswith('INSERT')]
+        self.assertLess(len(inserts), 100)
+
+    @override_settings(QUIZ_IMPORT_MAX_QUESTIONS=2)
+    def test_import_limit(self):
+        """Test banks over QUIZ_IMPORT_MAX_QUESTIONS are rejected"""
+        response = self.client.post(self.import_url, {'questions': self.bank()}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.quiz.questions.count(), 1)
+
+    def test_commands_round_trip(self):
+        """Test export_questions and import_questions read and write files"""
+        self.client.post(self.import_url, {'questions': self.bank()}, format='json')
+        other = Quiz.objects.create(course=self.quiz.course, title='Copy')
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bank.xml')
+            call_command('export_questions', self.quiz.id, path, stdout=StringIO())
+            call_command('import_questions', other.id, path, stdout=StringIO())
+
+        self.assertEqual(other.questions.count(), 4)
+        self.assertEqual(
+            list(other.questions.order_by('order').values_list('question_text', flat=True)),
+            list(self.quiz.questions.order_by('order').values_list('question_text', flat=True))
+        )
+
+
+class QuizLeaderboardTest(APITestCase):
+    """Test the incrementally maintained quiz and course leaderboards"""
+
+    def setUp(self):
+        cache.clear()
+        self.instructor = User.objects.create_user(username='instructor', user_type='instructor')
+        self.course = Course.objects.create(
+            title='Python Basics',
+            description='Learn Python programming',
+            instructor=self.instructor,
+            price=Decimal('0.00'),
+            is_free=True,
+            duration_hours=10
+        )
+        self.quiz = Quiz.objects.create(course=self.course, title='Quiz', max_attempts=5)
+        self.other_quiz = Quiz.objects.create(course=self.course, title='Other quiz', max_attempts=5)
+        self.students = [User.objects.create_user(username=f'student{i}') for i in range(4)]
+        for student in self.students[:3]:
+            Enrollment.objects.create(student=student, course=self.course)
+        self.start = timezone.now() - timedelta(hours=1)
+
+    def tearDown(self):
+        cache.clear()
+
+    def grade(self, student, score, minutes, quiz=None):
+        quiz = quiz or self.quiz
+        attempt = QuizAttempt.objects.create(
+            quiz=quiz,
+            student=student,
+            attempt_number=QuizAttempt.objects.filter(quiz=quiz, student=student).count() + 1,
+            score=score,
+            completed_at=self.start + timedelta(minutes=minutes)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            record_graded_attempt(attempt)
+        return attempt
+
+    def ranking(self, scope=QUIZ, scope_id=None):
+        standing = leaderboard_standing(scope, scope_id or self.quiz.id, 0, limit=100)
+        return [(row['student_id'], row['score']) for row in standing['results']]
+
+    def test_orders_by_best_score_then_completion(self):
+        """Test higher scores rank first and ties go to the earlier finisher"""
+        a, b, c, _ = self.students
+        self.grade(a, 80, minutes=5)
+        self.grade(b, 80, minutes=1)
+        self.grade(c, 90, minutes=9)
+        self.grade(c, 50, minutes=10)
+
+        self.assertEqual(self.ranking(), [(c.id, 90), (b.id, 80), (a.id, 80)])
+        standing = leaderboard_standing(QUIZ, self.quiz.id, a.id, limit=1)
+        self.assertEqual(standing['total'], 3)
+        self.assertEqual(standing['results'], [{'rank': 1, 'student_id': c.id, 'score': 90}])
+        self.assertEqual(standing['me'], {'rank': 3, 'student_id': a.id, 'score': 80})
+
+    def test_grading_updates_loaded_index_in_place(self):
+        """Test a new best score moves the student without reloading the leaderboard"""
+        a, b, _, _ = self.students
+        self.grade(a, 60, minutes=1)
+        self.grade(b, 70, minutes=2)
+        index = get_leaderboard(QUIZ, self.quiz.id)
+
+        self.grade(a, 100, minutes=3)
+        self.assertIs(get_leaderboard(QUIZ, self.quiz.id), index)
+        # Only the version check; ranks come from the index
+        with self.assertNumQueries(1):
+            standing = leaderboard_standing(QUIZ, self.quiz.id, a.id)
+        self.assertEqual(standing['me']['rank'], 1)
+        self.assertEqual(self.ranking(), [(a.id, 100), (b.id, 70)])
+
+    def test_changes_elsewhere_reload_the_index(self):
+        """Test an index behind the shared version is reloaded from the summaries"""
+        a, b, _, _ = self.students
+        self.grade(a, 60, minutes=1)
+        index = get_leaderboard(QUIZ, self.quiz.id)
+
+        # Another process graded b: its summary changed and the version moved on
+        attempt = QuizAttempt.objects.create(
+            quiz=self.quiz, student=b, is_completed=True, score=75, completed_at=self.start
+        )
+        QuizBestScore.objects.create(
+            student=b, quiz=self.quiz, best_attempt=attempt, best_score=75,
+            best_completed_at=attempt.completed_at, attempts_used=1, completed_attempts=1
+        )
+        Quiz.objects.filter(id=self.quiz.id).update(leaderboard_version=F('leaderboard_version') + 1)
+
+        self.assertIsNot(get_leaderboard(QUIZ, self.quiz.id), index)
+        self.assertEqual(self.ranking(), [(b.id, 75), (a.id, 60)])
+
+    def test_deletions_reload_the_index(self):
+        """Test deleting an attempt or a best-score row takes the student off both leaderboards"""
+        a, b, c, _ = self.students
+        best = self.grade(a, 90, minutes=1)
+        self.grade(b, 80, minutes=2)
+        self.grade(c, 70, minutes=3)
+        self.assertEqual(len(self.ranking(COURSE, self.course.id)), 3)
+
+        QuizAttempt.objects.filter(id=best.id).delete()
+        self.assertEqual(self.ranking(), [(b.id, 80), (c.id, 70)])
+        self.assertEqual(self.ranking(COURSE, self.course.id), [(b.id, 80), (c.id, 70)])
+
+        QuizBestScore.objects.filter(student=b).delete()
+        self.assertEqual(self.ranking(), [(c.id, 70)])
+
+    def test_stale_quiz_save_keeps_leaderboard_version(self):
+        """Test saving a stale quiz instance doesn't roll the version back"""
+        stale = Quiz.objects.get(id=self.quiz.id)
+        self.grade(self.students[0], 60, minutes=1)
+        version = Quiz.objects.values_list('leaderboard_version', flat=True).get(id=self.quiz.id)
+
+        stale.title = 'Renamed'
+        stale.save()
+        self.assertEqual(Quiz.objects.values_list('leaderboard_version', flat=True).get(id=self.quiz.id), version)
+
+    def test_rebuild_from_attempts(self):
+        """Test rebuilding the summaries rebuilds the leaderboard from QuizAttempt"""
+        a, b, _, _ = self.students
+        first = self.grade(a, 60, minutes=1)
+        self.grade(b, 70, minutes=2)
+        self.assertEqual(self.ranking(), [(b.id, 70), (a.id, 60)])
+
+        QuizAttempt.objects.filter(id=first.id).update(score=95)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('rebuild_quiz_best_scores', stdout=StringIO())
+        self.assertEqual(self.ranking(), [(a.id, 95), (b.id, 70)])
+        self.assertEqual(
+            QuizBestScore.objects.get(student=a, quiz=self.quiz).best_completed_at,
+            first.completed_at
+        )
+
+    def test_course_leaderboard_sums_best_scores(self):
+        """Test the course leaderboard ranks students by their total over quizzes"""
+        a, b, _, _ = self.students
+        self.grade(a, 90, minutes=1)
+        self.grade(b, 60, minutes=2)
+        self.assertEqual(self.ranking(COURSE, self.course.id), [(a.id, 90), (b.id, 60)])
+
+        self.grade(b, 50, minutes=3, quiz=self.other_quiz)
+        self.assertEqual(self.ranking(COURSE, self.course.id), [(b.id, 110), (a.id, 90)])
+
+    def test_leaderboard_endpoints(self):
+        """Test enrolled students and the instructor can page the leaderboards"""
+        a, b, c, outsider = self.students
+        self.grade(a, 90, minutes=1)
+        self.grade(b, 80, minutes=2)
+        self.grade(c, 70, minutes=3)
+        quiz_url = reverse('quizzes:quiz_leaderboard', kwargs={'course_id': self.course.id, 'quiz_id': self.quiz.id})
+        course_url = reverse('quizzes:course_leaderboard', kwargs={'course_id': self.course.id})
+
+        self.client.force_authenticate(c)
+        response = self.client.get(quiz_url, {'offset': 1, 'limit': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(response.data['results'], [
+            {'rank': 2, 'student_id': b.id, 'score': 80, 'username': 'student1'}
+        ])
+        self.assertEqual(response.data['me']['rank'], 3)
+        self.assertEqual(self.client.get(course_url).data['count'], 3)
+        self.assertEqual(self.client.get(quiz_url, {'limit': 'x'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.force_authenticate(self.instructor)
+        response = self.client.get(quiz_url)
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertIsNone(response.data['me'])
+
+        self.client.force_authenticate(outsider)
+        self.assertEqual(self.client.get(quiz_url).status_code, status.HTTP_403_FORBIDDEN)
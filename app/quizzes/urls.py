@@ -14,15 +14,23 @@ urlpatterns = [
     
     # Quiz taking (students)
     path('courses/<int:course_id>/quizzes/<int:quiz_id>/start/', views.start_quiz_attempt, name='start_quiz'),
+    path('courses/<int:course_id>/quizzes/<int:quiz_id>/attempts/<int:attempt_id>/questions/', views.quiz_attempt_questions, name='quiz_attempt_questions'),
+    path('courses/<int:course_id>/quizzes/<int:quiz_id>/attempts/<int:attempt_id>/autosave/', views.autosave_quiz_attempt, name='autosave_quiz'),
     path('courses/<int:course_id>/quizzes/<int:quiz_id>/attempts/<int:attempt_id>/submit/', views.submit_quiz_attempt, name='submit_quiz'),
     
     # Quiz attempts
     path('courses/<int:course_id>/quizzes/<int:quiz_id>/attempts/', views.StudentQuizAttemptListView.as_view(), name='student_quiz_attempts'),
+    path('courses/<int:course_id>/quizzes/<int:quiz_id>/leaderboard/', views.quiz_leaderboard, name='quiz_leaderboard'),
+    path('courses/<int:course_id>/leaderboard/', views.course_leaderboard, name='course_leaderboard'),
     path('attempts/<int:pk>/', views.QuizAttemptDetailView.as_view(), name='quiz_attempt_detail'),
     
     # Instructor views
     path('instructor/courses/<int:course_id>/quiz-attempts/', views.InstructorQuizAttemptListView.as_view(), name='instructor_quiz_attempts'),
     path('instructor/courses/<int:course_id>/quizzes/<int:quiz_id>/attempts/', views.InstructorQuizAttemptListView.as_view(), name='instructor_quiz_attempts_by_quiz'),
+    path('instructor/courses/<int:course_id>/quizzes/<int:quiz_id>/item-analysis/', views.quiz_item_analysis, name='quiz_item_analysis'),
+    path('instructor/courses/<int:course_id>/quizzes/<int:quiz_id>/regrade/', views.regrade_quiz_attempts, name='regrade_quiz'),
+    path('instructor/courses/<int:course_id>/quizzes/<int:quiz_id>/questions/import/', views.import_question_bank, name='import_question_bank'),
+    path('instructor/courses/<int:course_id>/quizzes/<int:quiz_id>/questions/export/', views.export_question_bank, name='export_question_bank'),
     
     # Student dashboard
     path('my-attempts/', views.StudentQuizAttemptListView.as_view(), name='my_quiz_attempts'),
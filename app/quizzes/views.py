@@ -1,17 +1,33 @@
 from rest_framework import generics, status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.settings import api_settings
+from django.contrib.auth import get_user_model
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from certificates.renderers import NDJSONRenderer
 from courses.models import Course
-from .models import Quiz, Question, QuizAttempt, QuizResponse
+from .autosave import AutosaveThrottled, save_answers, saved_answers
+from .deadlines import attempt_deadline, expire_attempt, expire_student_attempts
+from .grading import complete_attempt
+from .item_analysis import get_item_analysis
+from .leaderboard import COURSE, QUIZ, leaderboard_standing
+from .question_bank import (
+    QuestionBankError, guess_format, import_questions, iter_jsonl, iter_qti, read_question_bank
+)
+from .randomization import attempt_question_ids, attempt_questions, freeze_attempt_layout
+from .regrade import regrade_quiz
+from .renderers import QTIRenderer
+from .scores import reserve_attempt
+from .models import Quiz, Question, QuizAttempt
 from .serializers import (
     QuizListSerializer, QuizDetailSerializer, QuizCreateUpdateSerializer,
-    QuestionDetailSerializer, QuestionCreateUpdateSerializer,
+    QuestionDetailSerializer, QuestionCreateUpdateSerializer, AttemptQuestionSerializer,
     QuizAttemptSerializer, QuizAttemptDetailSerializer,
-    QuizSubmissionSerializer
+    QuizSubmissionSerializer, QuizAutosaveSerializer
 )
 
 
@@ -116,35 +132,117 @@ def start_quiz_attempt(request, course_id, quiz_id):
             status=status.HTTP_403_FORBIDDEN
         )
 
-    # Check attempt limit
-    existing_attempts = QuizAttempt.objects.filter(
-        quiz=quiz,
-        student=request.user
-    ).count()
+    # Attempts left open past their time limit are submitted before counting
+    expire_student_attempts(quiz, request.user)
 
-    if existing_attempts >= quiz.max_attempts:
-        return Response(
-            {'error': 'Maximum attempts reached'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
+    with transaction.atomic():
+        # Check attempt limit against the student's summary row
+        attempt_number = reserve_attempt(quiz, request.user)
+        if attempt_number is None:
+            return Response(
+                {'error': 'Maximum attempts reached'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-    # Create new attempt
-    attempt = QuizAttempt.objects.create(
-        quiz=quiz,
-        student=request.user,
-        attempt_number=existing_attempts + 1
-    )
+        # Create new attempt
+        attempt = QuizAttempt.objects.create(
+            quiz=quiz,
+            student=request.user,
+            attempt_number=attempt_number,
+            deadline=attempt_deadline(quiz, timezone.now())
+        )
+        freeze_attempt_layout(attempt)
 
     return Response(
         {
             'attempt_id': attempt.id,
             'message': 'Quiz attempt started',
-            'time_limit_minutes': quiz.time_limit_minutes
+            'time_limit_minutes': quiz.time_limit_minutes,
+            'deadline': attempt.deadline,
+            'questions': AttemptQuestionSerializer(attempt_questions(attempt), many=True).data
         },
         status=status.HTTP_201_CREATED
     )
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def quiz_attempt_questions(request, course_id, quiz_id, attempt_id):
+    """Questions of an attempt in the order, and with the answer order, it was given"""
+    attempt = get_object_or_404(
+        QuizAttempt,
+        id=attempt_id,
+        quiz_id=quiz_id,
+        quiz__course_id=course_id,
+        student=request.user
+    )
+    return Response({
+        'attempt_id': attempt.id,
+        'questions': AttemptQuestionSerializer(attempt_questions(attempt), many=True).data
+    })
+
+
+def _answers_from(validated_responses):
+    return {
+        response['question'].id: (
+            response['selected_answer'].id if response.get('selected_answer') else None,
+            response.get('text_answer', '')
+        )
+        for response in validated_responses
+    }
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def autosave_quiz_attempt(request, course_id, quiz_id, attempt_id):
+    """Save answers of an in-progress attempt, or fetch them to resume"""
+    attempt = get_object_or_404(
+        QuizAttempt,
+        id=attempt_id,
+        quiz_id=quiz_id,
+        quiz__course_id=course_id,
+        student=request.user,
+        is_completed=False
+    )
+
+    if expire_attempt(attempt):
+        return Response(
+            {'error': 'Time limit exceeded; your saved answers were submitted'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    if request.method == 'GET':
+        return Response({
+            'attempt_id': attempt.id,
+            'responses': [
+                {'question': question_id, 'selected_answer': selected_answer_id, 'text_answer': text_answer}
+                for question_id, (selected_answer_id, text_answer) in sorted(saved_answers(attempt).items())
+            ]
+        })
+
+    serializer = QuizAutosaveSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+
+    answers = _answers_from(serializer.validated_data['responses'])
+    if not set(answers) <= set(attempt_question_ids(attempt)):
+        return Response(
+            {'error': 'Questions must belong to this attempt'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        saved = save_answers(attempt, answers)
+    except AutosaveThrottled as e:
+        return Response(
+            {'error': str(e), 'retry_after': e.retry_after},
+            status=status.HTTP_429_TOO_MANY_REQUESTS,
+            headers={'Retry-After': str(e.retry_after)}
+        )
+    if not saved:
+        raise Http404
+    return Response({'saved': len(answers)}, status=status.HTTP_200_OK)
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def submit_quiz_attempt(request, course_id, quiz_id, attempt_id):
@@ -159,44 +257,40 @@ def submit_quiz_attempt(request, course_id, quiz_id, attempt_id):
         is_completed=False
     )
 
+    if expire_attempt(attempt):
+        return Response(
+            {'error': 'Time limit exceeded; your saved answers were submitted'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
     serializer = QuizSubmissionSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
 
-    with transaction.atomic():
-        # Process each response
-        for response_data in serializer.validated_data['responses']:
-            question = get_object_or_404(Question, id=response_data['question'].id, quiz=quiz)
-
-            # Create or update response
-            response, created = QuizResponse.objects.get_or_create(
-                attempt=attempt,
-                question=question,
-                defaults={
-                    'selected_answer': response_data.get('selected_answer'),
-                    'text_answer': response_data.get('text_answer', '')
-                }
-            )
-
-            if not created:
-                response.selected_answer = response_data.get('selected_answer')
-                response.text_answer = response_data.get('text_answer', '')
-                response.save()
+    submitted = _answers_from(serializer.validated_data.get('responses', []))
+    if not set(submitted) <= set(attempt_question_ids(attempt)):
+        raise Http404
 
-            # Check answer and assign points
-            response.check_answer()
-
-        # Mark attempt as completed
-        attempt.is_completed = True
-        attempt.completed_at = timezone.now()
-        attempt.save()
+    # Submitted answers win over autosaved ones
+    answers = saved_answers(attempt)
+    answers.update(submitted)
+    if not answers:
+        return Response(
+            {'error': 'At least one response is required'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
 
-        # Calculate final score
-        final_score = attempt.calculate_score()
+    with transaction.atomic():
+        completed = complete_attempt(attempt, answers)
+    if not completed:
+        return Response(
+            {'error': 'This attempt has already been submitted'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
 
     # Prepare response data
     response_data = {
         'message': 'Quiz submitted successfully',
-        'score': final_score,
+        'score': attempt.score,
         'passed': attempt.passed,
         'total_points_earned': attempt.total_points_earned,
         'total_points_possible': attempt.total_points_possible
@@ -265,3 +359,166 @@ class InstructorQuizAttemptListView(generics.ListAPIView):
             queryset = queryset.filter(quiz_id=quiz_id)
 
         return queryset
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def quiz_item_analysis(request, course_id, quiz_id):
+    """Question difficulty, discrimination and distractor statistics for a quiz"""
+    quiz = get_object_or_404(
+        Quiz,
+        id=quiz_id,
+        course_id=course_id,
+        course__instructor=request.user
+    )
+    return Response(get_item_analysis(quiz))
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def regrade_quiz_attempts(request, course_id, quiz_id):
+    """Regrade a quiz's completed attempts after its answer key changed"""
+    quiz = get_object_or_404(
+        Quiz,
+        id=quiz_id,
+        course_id=course_id,
+        course__instructor=request.user
+    )
+    dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true')
+    report = regrade_quiz(quiz, dry_run=dry_run)
+    report['dry_run'] = dry_run
+    return Response(report, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def import_question_bank(request, course_id, quiz_id):
+    """Add questions to a quiz from a JSON Lines or QTI-like XML question bank"""
+    quiz = get_object_or_404(
+        Quiz,
+        id=quiz_id,
+        course_id=course_id,
+        course__instructor=request.user
+    )
+
+    upload = request.FILES.get('file')
+    questions = request.data.get('questions')
+    if upload is None and not isinstance(questions, list):
+        return Response(
+            {'error': 'Provide a JSONL/XML file or a "questions" list'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        if upload is not None:
+            file_format = request.data.get('file_format') or guess_format(upload.name)
+            records = read_question_bank(upload, file_format)
+        else:
+            records = enumerate(questions, start=1)
+        imported = import_questions(quiz, records)
+    except IntegrityError:
+        return Response(
+            {'error': 'Another import into this quiz is in progress, please retry'},
+            status=status.HTTP_409_CONFLICT
+        )
+    except QuestionBankError as e:
+        return Response(
+            {'error': f'Could not import question bank: {str(e)}', 'errors': e.errors},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except UnicodeDecodeError as e:
+        return Response(
+            {'error': f'Could not import question bank: {str(e)}', 'errors': []},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    return Response(
+        {
+            'message': f'Imported {imported} question(s)',
+            'imported': imported,
+            'total_questions': quiz.questions.count()
+        },
+        status=status.HTTP_201_CREATED
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@renderer_classes(api_settings.DEFAULT_RENDERER_CLASSES + [NDJSONRenderer, QTIRenderer])
+def export_question_bank(request, course_id, quiz_id):
+    """Stream a quiz's questions as JSON Lines or, with format=qti, QTI-like XML"""
+    quiz = get_object_or_404(
+        Quiz,
+        id=quiz_id,
+        course_id=course_id,
+        course__instructor=request.user
+    )
+
+    if request.accepted_renderer.format == 'qti':
+        response = StreamingHttpResponse(iter_qti(quiz), content_type=QTIRenderer.media_type)
+        extension = 'xml'
+    else:
+        response = StreamingHttpResponse(iter_jsonl(quiz), content_type=NDJSONRenderer.media_type)
+        extension = 'jsonl'
+    response['Content-Disposition'] = f'attachment; filename="quiz_{quiz.id}_questions.{extension}"'
+    return response
+
+
+MAX_LEADERBOARD_PAGE_SIZE = 100
+
+
+def _leaderboard_response(request, course, scope, scope_id):
+    is_instructor = course.instructor_id == request.user.id
+    if not is_instructor and not course.enrollments.filter(student=request.user, is_active=True).exists():
+        return Response(
+            {'error': 'Must be enrolled in course to view the leaderboard'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    try:
+        offset = max(int(request.query_params.get('offset', 0)), 0)
+        limit = min(max(int(request.query_params.get('limit', 10)), 1), MAX_LEADERBOARD_PAGE_SIZE)
+    except ValueError:
+        return Response(
+            {'error': 'offset and limit must be integers'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    standing = leaderboard_standing(scope, scope_id, request.user.id, offset=offset, limit=limit)
+
+    rows = standing['results'] + ([standing['me']] if standing['me'] else [])
+    usernames = dict(
+        get_user_model().objects.filter(
+            id__in={row['student_id'] for row in rows}
+        ).values_list('id', 'username')
+    )
+    for row in rows:
+        row['username'] = usernames.get(row['student_id'])
+
+    return Response(
+        {
+            'count': standing['total'],
+            'offset': offset,
+            'limit': limit,
+            'results': standing['results'],
+            'me': standing['me']
+        },
+        status=status.HTTP_200_OK
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def quiz_leaderboard(request, course_id, quiz_id):
+    """Students ranked by their best score on a quiz, earliest first on ties"""
+    course = get_object_or_404(Course, id=course_id)
+    quiz = get_object_or_404(Quiz, id=quiz_id, course=course)
+    return _leaderboard_response(request, course, QUIZ, quiz.id)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def course_leaderboard(request, course_id):
+    """Students ranked by the sum of their best quiz scores in a course"""
+    course = get_object_or_404(Course, id=course_id)
+    return _leaderboard_response(request, course, COURSE, course.id)
@@ -20,7 +20,8 @@ if __name__ == "__main__":
         'users.tests',
         'courses.tests', 
         'quizzes.tests',
-        'certificates.tests'
+        'certificates.tests',
+        'mediafiles.tests'
     ]
     
     print("🚀 Running E-learning Platform Test Suite")
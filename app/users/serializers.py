@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
+from mediafiles.serializers import ImageVariantsField
 from .models import User
 
 
@@ -62,12 +63,13 @@ class UserLoginSerializer(serializers.Serializer):
 
 class UserProfileSerializer(serializers.ModelSerializer):
     """Serializer for user profile"""
+    profile_picture_variants = ImageVariantsField(source='profile_picture')
     
     class Meta:
         model = User
         fields = (
             'id', 'username', 'email', 'first_name', 'last_name',
-            'user_type', 'profile_picture', 'bio', 'date_of_birth',
+            'user_type', 'profile_picture', 'profile_picture_variants', 'bio', 'date_of_birth',
             'phone_number', 'expertise', 'years_of_experience',
             'date_joined', 'created_at', 'updated_at'
         )